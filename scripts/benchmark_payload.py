@@ -0,0 +1,86 @@
+"""Benchmark the cost of verifying and decoding a webhook delivery per payload size.
+
+`before` reproduces the former path (HMAC computed with `hmac.new`, then the body decoded
+again by `request.json()` with the stdlib `json` module), `after` is the current path (body
+read once, HMAC with `hmac.digest`, decoded with the fastest JSON backend installed).
+
+Usage:
+    python scripts/benchmark_payload.py
+"""
+
+import hashlib
+import hmac
+import json
+import timeit
+
+from fastgithub.webhook.payload import JSON_BACKEND, decode_payload
+from fastgithub.webhook.signature import SignatureVerificationSHA256
+
+SECRET = "mysecret"  # noqa: S105
+
+
+def push_payload(commits: int) -> bytes:
+    """Build a push payload with the given number of commits."""
+    commit = {
+        "id": "0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c",
+        "tree_id": "f9d2a07e9488b91af2641b26b9407fe22a451433",
+        "distinct": True,
+        "message": "Update README.md #fast\n\nSome longer description of the change.",
+        "timestamp": "2015-05-05T19:40:15-04:00",
+        "url": "https://github.com/baxterthehacker/public-repo/commit/0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c",
+        "author": {"name": "baxterthehacker", "email": "baxterthehacker@users.noreply.github.com"},
+        "committer": {
+            "name": "baxterthehacker",
+            "email": "baxterthehacker@users.noreply.github.com",
+        },
+        "added": [],
+        "removed": [],
+        "modified": ["README.md", "src/fastgithub/webhook/handler.py"],
+    }
+    payload = {
+        "ref": "refs/heads/changes",
+        "before": "9049f1265b7d61be4a8904a9a27120d2064dab3b",
+        "after": "0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c",
+        "commits": [commit] * commits,
+        "head_commit": commit,
+        "repository": {"full_name": "baxterthehacker/public-repo", "default_branch": "master"},
+    }
+    return json.dumps(payload).encode()
+
+
+def before(body: bytes, signature: str) -> None:
+    hash_alg, provided_signature = signature.split("=")
+    computed_signature = hmac.new(SECRET.encode(), body, hashlib.new(hash_alg).name).hexdigest()
+    if not hmac.compare_digest(provided_signature, computed_signature):
+        raise ValueError("Invalid signature")
+    json.loads(body)
+
+
+def after(verification: SignatureVerificationSHA256, body: bytes, signature: str) -> None:
+    if not verification._verify_signature(body, signature):
+        raise ValueError("Invalid signature")
+    decode_payload(body)
+
+
+def main() -> None:
+    verification = SignatureVerificationSHA256(SECRET)
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'commits':>8} {'size (KiB)':>11} {'before (µs)':>12} {'after (µs)':>11} speedup")
+    for commits in [1, 10, 100, 500, 2000]:
+        body = push_payload(commits)
+        signature = "sha256=" + hmac.new(SECRET.encode(), body, "sha256").hexdigest()
+        number = max(10, 20_000 // commits)
+        before_time = min(timeit.repeat(lambda: before(body, signature), number=number, repeat=5))
+        after_time = min(
+            timeit.repeat(lambda: after(verification, body, signature), number=number, repeat=5)
+        )
+        before_us = before_time / number * 1e6
+        after_us = after_time / number * 1e6
+        print(
+            f"{commits:>8} {len(body) / 1024:>11.1f} {before_us:>12.1f} {after_us:>11.1f}"
+            f" {before_us / after_us:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
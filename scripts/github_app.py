@@ -2,15 +2,28 @@ import os
 
 import uvicorn
 from fastapi import FastAPI
-from github import Auth, Github
+from github import Auth
 
 from fastgithub import GithubWebhookHandler, SignatureVerificationSHA256, webhook_router
+from fastgithub.helpers.client import create_github
+from fastgithub.helpers.installations import GithubAppInstallations
+from fastgithub.helpers.response_cache import MemoryResponseCache
 from fastgithub.recipes.github import AutoCreatePullRequest, LabelsFromCommits
 
 signature_verification = SignatureVerificationSHA256(secret=os.environ["GITHUB_WEBHOOK_SECRET"])  # noqa: S106
 webhook_handler = GithubWebhookHandler(signature_verification)
 
-github = Github(auth=Auth.Token(os.environ["GITHUB_TOKEN"]))
+if "GITHUB_APP_ID" in os.environ:
+    # a client per installation of the GitHub App, each with its own rate limit
+    github = GithubAppInstallations(
+        os.environ["GITHUB_APP_ID"],
+        os.environ["GITHUB_APP_PRIVATE_KEY"],
+        response_cache=MemoryResponseCache(),
+    )
+else:
+    github = create_github(
+        auth=Auth.Token(os.environ["GITHUB_TOKEN"]), response_cache=MemoryResponseCache()
+    )
 
 webhook_handler.plan([
     AutoCreatePullRequest(github),
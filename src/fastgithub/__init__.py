@@ -1,8 +1,24 @@
 """FastGitHub."""
 
 from .endpoint.webhook_router import webhook_router
-from .recipes import GithubRecipe, Recipe
+from .helpers.async_github import AsyncGithubClient
+from .metrics import WebhookMetrics
+from .recipes import AsyncGithubRecipe, GithubRecipe, Recipe
+from .webhook.broker import MemoryBroker, RedisBroker
+from .webhook.coalescing import EventCoalescer
+from .webhook.deduplication import (
+    MemoryDeliveryStore,
+    RedisDeliveryStore,
+    SQLiteDeliveryStore,
+)
+from .webhook.executor import RecipeExecutor
 from .webhook.handler import GithubWebhookHandler
+from .webhook.journal import SQLiteEventJournal
+from .webhook.lanes import LaneScheduler
+from .webhook.queue import DeliveryQueue
+from .webhook.results import RecipeResult, RecipeStatus
+from .webhook.retry import RetryPolicy
+from .webhook.scheduler import RateLimitScheduler
 from .webhook.signature import SignatureVerificationSHA256
 
 try:
@@ -0,0 +1,176 @@
+"""Accounting of the GitHub API calls of the recipes, per recipe run and per delivery.
+
+The clients of `fastgithub` (the connections of `create_github` and `AsyncGithubClient`)
+report each call to the account of the recipe running in the current context, which
+totals them, logs them, feeds the metrics and enforces the call budget of the recipe.
+"""
+
+import collections
+import contextlib
+import contextvars
+import logging
+import threading
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+from fastgithub.helpers.recipe import recipe_attribute
+
+if TYPE_CHECKING:
+    from fastgithub.metrics import WebhookMetrics
+    from fastgithub.webhook.delivery import Delivery
+
+logger = logging.getLogger(__name__)
+
+# the delivery processed in the current context, if any
+current_delivery: contextvars.ContextVar["Delivery | None"] = contextvars.ContextVar(
+    "fastgithub_current_delivery", default=None
+)
+# the account of the recipe running in the current context, if any
+_current_account: contextvars.ContextVar["ApiCallAccount | None"] = contextvars.ContextVar(
+    "fastgithub_current_account", default=None
+)
+
+
+class ApiBudgetExceededError(Exception):
+    """Raised when a recipe sends more GitHub API calls than its budget."""
+
+
+@dataclass(frozen=True, slots=True)
+class ApiCall:
+    """A GitHub API call sent by a recipe."""
+
+    method: str
+    url: str
+    status: int
+    duration: float
+    # the rate limit resource of the call, e.g. `core` or `graphql`
+    resource: str
+    # the quota consumed by the call, `304 Not Modified` responses are free
+    cost: int
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.method} {urlsplit(self.url).path}"
+
+    @classmethod
+    def from_response(
+        cls, method: str, url: str, status: int, duration: float, headers: Mapping[str, str]
+    ) -> "ApiCall":
+        # the headers of `requests` and `httpx` are case insensitive
+        resource = headers.get("x-ratelimit-resource") or "core"
+        return cls(method, url, status, duration, resource, int(status != 304))
+
+
+class ApiCallAccount:
+    """The GitHub API calls of a recipe run.
+
+    Args:
+        recipe (str): The name of the recipe.
+        delivery (Delivery | None): The delivery processed by the recipe, if known.
+        budget (int | None): The maximum number of calls of the run, unlimited if None.
+        metrics (WebhookMetrics | None): The metrics the calls are recorded to, if any.
+    """
+
+    def __init__(
+        self,
+        recipe: str,
+        delivery: "Delivery | None" = None,
+        budget: int | None = None,
+        metrics: "WebhookMetrics | None" = None,
+    ) -> None:
+        self.recipe = recipe
+        self.delivery = delivery
+        self.budget = budget
+        self.metrics = metrics
+        self.calls = 0
+        self.duration = 0.0
+        self.quota = 0
+        self.endpoints: collections.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """Raise before a call exceeding the budget of the run.
+
+        Raises:
+            ApiBudgetExceededError: If the run already sent `budget` calls.
+        """
+        if self.budget is not None and self.calls >= self.budget:
+            raise ApiBudgetExceededError(
+                f"{self.recipe} exceeded its budget of {self.budget} GitHub API calls!"
+            )
+
+    def record(self, call: ApiCall) -> None:
+        with self._lock:
+            self.calls += 1
+            self.duration += call.duration
+            self.quota += call.cost
+            self.endpoints[call.endpoint] += 1
+        if self.metrics is not None:
+            self.metrics.record_api_call(self.recipe, call)
+
+    def summary(self) -> dict[str, Any]:
+        """Return the totals of the run, e.g. for structured logs."""
+        delivery = self.delivery
+        return {
+            "recipe": self.recipe,
+            "delivery_id": None if delivery is None else delivery.delivery_id,
+            "event": None if delivery is None else delivery.event,
+            "target": None if delivery is None else delivery.target,
+            "calls": self.calls,
+            "duration": self.duration,
+            "quota": self.quota,
+            "endpoints": dict(self.endpoints),
+        }
+
+    def log(self) -> None:
+        """Log the totals of the run, in the `api_calls` attribute of the record."""
+        summary = self.summary()
+        logger.info(
+            "%s sent %d GitHub API calls (%d quota, %.3fs) for delivery %s",
+            self.recipe,
+            self.calls,
+            self.quota,
+            self.duration,
+            summary["delivery_id"],
+            extra={"api_calls": summary},
+        )
+
+
+@contextlib.contextmanager
+def account_api_calls(
+    recipe: str,
+    budget: int | None = None,
+    metrics: "WebhookMetrics | None" = None,
+) -> Iterator[ApiCallAccount]:
+    """Attribute the GitHub API calls sent in this context to a recipe run.
+
+    The delivery of the run is the delivery processed in the current context, if any.
+    """
+    account = ApiCallAccount(recipe, current_delivery.get(), budget, metrics)
+    token = _current_account.set(account)
+    try:
+        yield account
+    finally:
+        _current_account.reset(token)
+
+
+def before_api_call() -> None:
+    """Check the budget of the recipe running in the current context, before a call."""
+    if (account := _current_account.get()) is not None:
+        account.check()
+
+
+def record_api_call(
+    method: str, url: str, status: int, duration: float, headers: Mapping[str, str]
+) -> None:
+    """Record a call for the recipe running in the current context, if any."""
+    if (account := _current_account.get()) is not None:
+        account.record(ApiCall.from_response(method, url, status, duration, headers))
+
+
+def recipe_api_budget(recipe: Callable, default: int | None) -> int | None:
+    """Return the API call budget of a recipe, from its `api_budget` attribute or the default."""
+    budget = recipe_attribute(recipe, "api_budget")
+    return default if budget is None else budget
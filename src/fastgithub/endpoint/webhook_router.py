@@ -2,6 +2,7 @@ from collections.abc import Callable, Sequence
 from enum import Enum
 
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 
 from fastgithub.webhook.handler import GithubWebhookHandler
 
@@ -17,8 +18,9 @@ def webhook_router(
     summary: str | None = None,
     description: str | None = None,
     response_description: str = "Successful Response",
+    metrics_path: str | None = None,
 ):
-    router = APIRouter()
+    router = APIRouter(lifespan=handler.lifespan)
     router.add_api_route(
         path=path,
         endpoint=handler.handle,
@@ -30,4 +32,18 @@ def webhook_router(
         description=description,
         response_description=response_description,
     )
+    if metrics_path is not None:
+        if handler.metrics is None:
+            raise ValueError("`metrics_path` requires a handler with `metrics`!")
+        metrics = handler.metrics
+
+        def render_metrics() -> PlainTextResponse:
+            return PlainTextResponse(metrics.render(), media_type=metrics.content_type)
+
+        router.add_api_route(
+            path=metrics_path,
+            endpoint=render_metrics,
+            methods=["GET"],
+            include_in_schema=False,
+        )
     return router
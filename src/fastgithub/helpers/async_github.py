@@ -0,0 +1,280 @@
+import asyncio
+import importlib.util
+import time
+from typing import Any
+
+import httpx
+from github import GithubException, RateLimitExceededException
+
+from fastgithub.accounting import before_api_call, record_api_call
+from fastgithub.types import Payload
+
+from .github import Label, LabelMatcher, rate_limit_exceeded, rate_limit_exception
+from .response_cache import CachedResponse, ResponseCache, cache_key
+
+GITHUB_API_URL = "https://api.github.com"
+
+
+def _error_data(response: httpx.Response) -> Any:
+    """Return the body of an error response, e.g. the HTML page of a `502` from a proxy."""
+    if not response.content:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return {"message": response.text}
+
+
+class AsyncGithubClient:
+    """An asynchronous client of the GitHub REST API, on a pooled `httpx.AsyncClient`.
+
+    The connections are kept alive and reused by every request of the client, and HTTP/2 is
+    negotiated when the `h2` package is installed (`pip install httpx[http2]`). Errors are
+    raised as the `GithubException` of PyGithub, so that recipes handle both clients alike.
+
+    Args:
+        token (str | None): A personal access token or an installation token.
+        base_url (str): The URL of the GitHub REST API.
+        timeout (float): The timeout of a request, in seconds.
+        max_connections (int): The maximum number of concurrent connections.
+        max_keepalive_connections (int): The maximum number of idle connections kept alive.
+        http2 (bool | None): Whether to negotiate HTTP/2, by default if `h2` is installed.
+        per_page (int): The number of items per page of the paginated endpoints.
+        response_cache (ResponseCache | None): A cache of the responses, revalidated with
+            conditional requests which don't count against the rate limit.
+        cache_identity (str | None): The identity of the client in the `response_cache`, e.g.
+            `"installation:<id>"` for an installation token which rotates, by default its
+            token.
+        transport (httpx.AsyncBaseTransport | None): A custom transport, e.g. for tests.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        base_url: str = GITHUB_API_URL,
+        timeout: float = 15.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        http2: bool | None = None,
+        per_page: int = 100,
+        response_cache: ResponseCache | None = None,
+        cache_identity: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "fastgithub",
+        }
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+
+        self.per_page = per_page
+        self.response_cache = response_cache
+        self.cache_identity = cache_identity
+        self.rate_limiting = (-1, -1)
+        self.rate_limiting_resettime = 0
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            http2=http2,
+            transport=transport,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client
+
+    async def __aenter__(self) -> "AsyncGithubClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request, record the rate limit headers and raise for error statuses."""
+        request = self._client.build_request(method, url, **kwargs)
+        if self.response_cache is not None and method == "GET":
+            response = await self._send_conditional(request, self.response_cache)
+        else:
+            response = await self._send(request)
+
+        # only the `core` bucket is recorded, the `graphql` or `search` ones are separate
+        if "x-ratelimit-remaining" in response.headers and (
+            response.headers.get("x-ratelimit-resource", "core") == "core"
+        ):
+            self.rate_limiting = (
+                int(response.headers["x-ratelimit-remaining"]),
+                int(response.headers["x-ratelimit-limit"]),
+            )
+            self.rate_limiting_resettime = int(response.headers["x-ratelimit-reset"])
+
+        if response.is_error:
+            data = _error_data(response)
+            headers = dict(response.headers)
+            if response.status_code in (403, 429) and headers.get("x-ratelimit-remaining") == "0":
+                raise RateLimitExceededException(response.status_code, data, headers)
+            raise GithubException(response.status_code, data, headers)
+        return response
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        before_api_call()
+        start = time.perf_counter()
+        response = await self._client.send(request)
+        record_api_call(
+            request.method,
+            str(request.url),
+            response.status_code,
+            time.perf_counter() - start,
+            response.headers,
+        )
+        return response
+
+    async def _send_conditional(
+        self, request: httpx.Request, cache: ResponseCache
+    ) -> httpx.Response:
+        """Send a read with the validators of its cached response, if any."""
+        key = cache_key(str(request.url), request.headers, self.cache_identity)
+        if (cached := cache.get(key)) is not None:
+            request.headers.update(cached.conditional_headers())
+        response = await self._send(request)
+
+        if cached is not None and response.status_code == 304:
+            cached = cached.revalidated(response.headers)
+            cache.set(key, cached)
+            cache.record(hit=True)
+            return httpx.Response(
+                cached.status, headers=cached.headers, content=cached.body, request=request
+            )
+
+        cache.record(hit=False)
+        fresh = CachedResponse.from_response(
+            response.status_code, response.headers, response.content
+        )
+        if fresh is not None:
+            cache.set(key, fresh)
+        elif cached is not None:
+            cache.discard(key)
+        return response
+
+    async def get(self, url: str, **params: Any) -> Any:
+        return (await self.request("GET", url, params=params)).json()
+
+    async def post(self, url: str, json: Any) -> Any:
+        return (await self.request("POST", url, json=json)).json()
+
+    async def paginate(self, url: str, **params: Any) -> list[Any]:
+        """Return all the items of a paginated endpoint, following the `Link` headers."""
+        params.setdefault("per_page", self.per_page)
+        response = await self.request("GET", url, params=params)
+        items = response.json()
+        # the next page URLs already hold the query parameters
+        while next_url := response.links.get("next", {}).get("url"):
+            response = await self.request("GET", next_url)
+            items.extend(response.json())
+        return items
+
+    async def get_rate_limit(self) -> tuple[int, int, int]:
+        """Return the remaining requests, the limit and the reset time of the rate limit."""
+        remaining, limit = self.rate_limiting
+        if limit < 0 or self.rate_limiting_resettime <= time.time():
+            core = (await self.get("/rate_limit"))["resources"]["core"]
+            self.rate_limiting = (core["remaining"], core["limit"])
+            self.rate_limiting_resettime = core["reset"]
+            remaining, limit = self.rate_limiting
+        return remaining, limit, self.rate_limiting_resettime
+
+
+class AsyncGithubHelper:
+    """The asynchronous counterpart of `GithubHelper`, for a repository.
+
+    The independent calls of a recipe step are sent concurrently, e.g. the commits of a pull
+    request and the labels of the repository are fetched at the same time, then the missing
+    labels are created at the same time.
+    """
+
+    def __init__(
+        self, client: AsyncGithubClient, repo_fullname: str, rate_threshold: float = 0.5
+    ) -> None:
+        self.client = client
+        self.repo_fullname = repo_fullname
+        self.rate_threshold = rate_threshold
+        self.url = f"/repos/{repo_fullname}"
+
+    async def raise_for_rate_excess(self, threshold: float | None = None) -> None:
+        """Raise if the available rate limit is below a threshold, the helper's by default."""
+        threshold = self.rate_threshold if threshold is None else threshold
+        remaining, limit, reset = await self.client.get_rate_limit()
+        if rate_limit_exceeded(remaining, limit, threshold):
+            raise rate_limit_exception(remaining, limit, reset)
+
+    async def get_default_branch(self, payload: Payload | None = None) -> str:
+        """Return the default branch of the repository, from the payload when available."""
+        if payload is not None:
+            if default_branch := payload.get("repository", {}).get("default_branch"):
+                return default_branch
+        return (await self.client.get(self.url))["default_branch"]
+
+    async def get_pull(self, number: int) -> Payload:
+        return await self.client.get(f"{self.url}/pulls/{number}")
+
+    async def get_pull_commit_messages(self, number: int) -> list[str]:
+        commits = await self.client.paginate(f"{self.url}/pulls/{number}/commits")
+        return [commit["commit"]["message"] for commit in commits]
+
+    async def get_labels(self) -> dict[str, Payload]:
+        """Return the labels of the repository, by lowercase name."""
+        labels = await self.client.paginate(f"{self.url}/labels")
+        return {label["name"].lower(): label for label in labels}
+
+    async def _get_or_create_label(
+        self, label: Label, existing_labels: dict[str, Payload]
+    ) -> Payload:
+        if (existing_label := existing_labels.get(label.name.lower())) is not None:
+            return existing_label
+        try:
+            return await self.client.post(f"{self.url}/labels", json=label.model_dump())
+        except GithubException as ex:
+            # the label was created since the labels were fetched
+            if ex.status != 422:
+                raise ex
+            return await self.client.get(f"{self.url}/labels/{label.name}")
+
+    async def extract_labels_from_pr(
+        self, number: int, labels_config: dict[str, list[Label]] | LabelMatcher
+    ) -> set[str]:
+        """Extract labels from the commits of a PR and create labels in the repo if needed."""
+        if not isinstance(labels_config, LabelMatcher):
+            labels_config = LabelMatcher(labels_config)
+        messages, existing_labels = await asyncio.gather(
+            self.get_pull_commit_messages(number), self.get_labels()
+        )
+        labels: dict[str, Label] = {}
+        for message in messages:
+            for name, label in labels_config.match(message).items():
+                labels.setdefault(name, label)
+
+        created_labels = await asyncio.gather(
+            *(self._get_or_create_label(label, existing_labels) for label in labels.values())
+        )
+        return {label["name"] for label in created_labels}
+
+    async def add_labels_to_pr(self, pr: Payload, labels: set[str]) -> None:
+        """Add a set of labels to a PR, skipping the labels it already has."""
+        existing_labels = [label["name"] for label in pr.get("labels", [])]
+        new_labels = labels.difference(existing_labels)
+        if not new_labels:
+            return
+        await self.client.post(
+            f"{self.url}/issues/{pr['number']}/labels", json={"labels": sorted(new_labels)}
+        )
@@ -0,0 +1,226 @@
+"""A `Github` client tuned to be shared by the concurrent recipes of a webhook server."""
+
+import threading
+import time
+from importlib.metadata import version
+from typing import Any
+
+from github import Github
+from github.Requester import (
+    HTTPRequestsConnectionClass,
+    HTTPSRequestsConnectionClass,
+    RequestsResponse,
+)
+from requests.structures import CaseInsensitiveDict
+from urllib3.util import Retry
+
+from fastgithub.accounting import before_api_call, record_api_call
+
+from .github import RateStatus
+from .response_cache import CachedResponse, ResponseCache, cache_identity, cache_key
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_TIMEOUT = 15
+DEFAULT_PER_PAGE = 100
+
+# PyGithub has no public hook to set the connection class of a single client, so the private
+# attribute of `Requester` is replaced, and the attributes of the upstream connections are
+# read by `getresponse`: both are checked to fail loudly on a version which changes them
+CONNECTION_CLASS_ATTRIBUTE = "_Requester__connectionClass"
+CONNECTION_ATTRIBUTES = ("protocol", "host", "port", "timeout", "verify", "session")
+
+
+def default_retry() -> Retry:
+    """Retry the idempotent requests on connection errors and server errors, with backoff.
+
+    Rate limit errors are not retried here, they are raised to the recipes which shouldn't
+    block a worker until the rate limit window resets.
+    """
+    return Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+
+
+class _ThreadSafeConnectionMixin:
+    """Keep the pending request of a connection per thread.
+
+    The connections of PyGithub mimic `httplib`: `request` stores the request on the
+    connection and `getresponse` sends it, so two threads sharing the persistent connection
+    of a `Github` client may send each other's request. The pending request is stored in a
+    thread local instead, and the underlying `requests.Session` (which is safe to share)
+    keeps a pool of `pool_size` keep-alive connections for all the threads.
+
+    When a `response_cache` is set, the `GET` requests are sent with the validators of the
+    cached response, and a `304 Not Modified` response is answered from the cache. The
+    responses are cached by `cache_identity`, the installation of the client if any, so that
+    they outlive the rotation of its tokens. Each
+    request is accounted to the recipe running in the current context, if any (see
+    `fastgithub.accounting`), and its rate limit headers are observed by the `rate_status`
+    of the client, if set.
+    """
+
+    response_cache: ResponseCache | None = None
+    cache_identity: str | None = None
+    rate_status: RateStatus | None = None
+    protocol: str
+    host: str
+    port: int
+    timeout: int | None
+    verify: bool | str
+    session: Any
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        if missing := [name for name in CONNECTION_ATTRIBUTES if not hasattr(self, name)]:
+            raise RuntimeError(
+                f"The connections of PyGithub {version('pygithub')} have no {missing} "
+                f"attributes, this version is not supported by `{type(self).__name__}`!"
+            )
+        self._local = threading.local()
+
+    def request(
+        self, verb: str, url: str, input: Any, headers: dict[str, str], stream: bool = False
+    ) -> None:
+        self._local.request = (verb, url, input, headers, stream)
+
+    def getresponse(self) -> RequestsResponse:
+        verb, url, input, headers, stream = self._local.request
+        del self._local.request
+        url = f"{self.protocol}://{self.host}:{self.port}{url}"
+
+        cache = self.response_cache if verb == "GET" and not stream else None
+        key = cached = None
+        if cache is not None:
+            key = cache_key(url, headers, self.cache_identity)
+            if (cached := cache.get(key)) is not None:
+                headers = {**headers, **cached.conditional_headers()}
+
+        before_api_call()
+        start = time.perf_counter()
+        response = self.session.request(
+            verb,
+            url,
+            headers=headers,
+            data=input,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+            stream=stream,
+        )
+        record_api_call(
+            verb, url, response.status_code, time.perf_counter() - start, response.headers
+        )
+        if self.rate_status is not None:
+            self.rate_status.observe(response.headers)
+
+        if cache is not None:
+            if cached is not None and response.status_code == 304:
+                cached = cached.revalidated(response.headers)
+                response.status_code = cached.status
+                response.headers = CaseInsensitiveDict(cached.headers)
+                response._content = cached.body
+                cache.set(key, cached)  # type: ignore
+                cache.record(hit=True)
+            else:
+                cache.record(hit=False)
+                fresh = CachedResponse.from_response(
+                    response.status_code, response.headers, response.content
+                )
+                if fresh is not None:
+                    cache.set(key, fresh)  # type: ignore
+                elif cached is not None:
+                    cache.discard(key)  # type: ignore
+        return RequestsResponse(response)
+
+
+class ThreadSafeHTTPSConnection(_ThreadSafeConnectionMixin, HTTPSRequestsConnectionClass):
+    pass
+
+
+class ThreadSafeHTTPConnection(_ThreadSafeConnectionMixin, HTTPRequestsConnectionClass):
+    pass
+
+
+def set_connection_class(
+    github: Github,
+    https_class: type[HTTPSRequestsConnectionClass] = ThreadSafeHTTPSConnection,
+    http_class: type[HTTPRequestsConnectionClass] = ThreadSafeHTTPConnection,
+    response_cache: ResponseCache | None = None,
+    track_rate_limit: bool = False,
+) -> None:
+    """Replace the connection class of a `Github` client, e.g. for a thread safe one.
+
+    Args:
+        github (Github): The client.
+        https_class (type): The connection class of the `https` API URLs.
+        http_class (type): The connection class of the `http` API URLs.
+        response_cache (ResponseCache | None): A cache of the responses of the client, for
+            the connection classes of this module.
+        track_rate_limit (bool): Whether the connection classes of this module record the
+            `core` rate limit of the responses in the shared `RateStatus` of the client.
+
+    Raises:
+        RuntimeError: If the requester of the client has no connection class to replace,
+            i.e. the version of PyGithub isn't supported.
+    """
+    requester = github.requester
+    attrs: dict[str, Any] = {}
+    if response_cache is not None:
+        attrs["response_cache"] = response_cache
+        attrs["cache_identity"] = cache_identity(getattr(requester, "auth", None))
+    if track_rate_limit:
+        attrs["rate_status"] = RateStatus.shared(github)
+    if attrs:
+        https_class = type(https_class.__name__, (https_class,), attrs)
+        http_class = type(http_class.__name__, (http_class,), attrs)
+    connection_class = getattr(requester, CONNECTION_CLASS_ATTRIBUTE, None)
+    if not isinstance(connection_class, type):
+        raise RuntimeError(
+            f"The requester of PyGithub {version('pygithub')} has no "
+            f"`{CONNECTION_CLASS_ATTRIBUTE}`, its connection class can't be replaced!"
+        )
+    if issubclass(connection_class, HTTPSRequestsConnectionClass):
+        setattr(requester, CONNECTION_CLASS_ATTRIBUTE, https_class)
+    else:
+        setattr(requester, CONNECTION_CLASS_ATTRIBUTE, http_class)
+    requester.close()
+
+
+def create_github(
+    auth: Any = None,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    retry: int | Retry | None = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    per_page: int = DEFAULT_PER_PAGE,
+    response_cache: ResponseCache | None = None,
+    **kwargs: Any,
+) -> Github:
+    """Create a `Github` client whose connections are kept alive and shared by the threads.
+
+    Args:
+        auth: The authentication of PyGithub, e.g. `github.Auth.Token`.
+        pool_size (int): The number of keep-alive connections, at least the number of
+            threads sending requests concurrently (e.g. the executor workers).
+        retry (int | Retry | None): The retry policy of the connections, `default_retry()`
+            by default.
+        timeout (int): The timeout of a request, in seconds.
+        per_page (int): The number of items per page of the paginated endpoints, the
+            maximum allowed by GitHub by default to minimize the number of requests.
+        response_cache (ResponseCache | None): A cache of the responses, revalidated with
+            conditional requests which don't count against the rate limit.
+        **kwargs: The other arguments of `Github`.
+    """
+    github = Github(
+        auth=auth,
+        pool_size=pool_size,
+        retry=default_retry() if retry is None else retry,
+        timeout=timeout,
+        per_page=per_page,
+        **kwargs,
+    )
+    set_connection_class(github, response_cache=response_cache, track_rate_limit=True)
+    return github
@@ -1,12 +1,25 @@
+import collections
+import contextlib
+import contextvars
 import re
+import threading
+import time
+import weakref
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import ClassVar
 
 import github
 import github.Label
-from github import Github, RateLimitExceededException
+from github import Github, GithubException, RateLimitExceededException
 from github.PullRequest import PullRequest
 from github.RateLimitOverview import RateLimitOverview
+from github.Repository import Repository
+from github.Requester import Requester
 from pydantic import BaseModel
 
+from fastgithub.types import Payload
+
 
 class Label(BaseModel):
     """A data model for GitHub label."""
@@ -16,59 +29,441 @@ class Label(BaseModel):
     description: str
 
 
+class LabelMatcher:
+    """A compiled labels config, matching the `#tag` patterns of commit messages.
+
+    The patterns of the config are validated once, then a commit message is scanned once
+    for `#tag` tokens, whatever the number of patterns, and the labels of the matched
+    patterns are returned. A pattern matches whole tags only: `#bugfix` doesn't match `#bug`.
+    """
+
+    TAG_REGEX = re.compile(r"#[a-z][a-z1-9-]+(?![a-z1-9-])")
+
+    def __init__(self, labels_config: dict[str, list[Label]]) -> None:
+        for pattern in labels_config:
+            GithubHelper.validate_label_name(pattern, self.TAG_REGEX)
+        self._labels_config = labels_config
+
+    @property
+    def labels_config(self) -> dict[str, list[Label]]:
+        return self._labels_config
+
+    def match(self, message: str) -> dict[str, Label]:
+        """Return the labels matched by a commit message, by name."""
+        labels = {}
+        for tag in set(self.TAG_REGEX.findall(message)):
+            for label in self.labels_config.get(tag, ()):
+                labels.setdefault(label.name, label)
+        return labels
+
+
+PULL_REQUEST_LABELS_QUERY = """
+query (
+  $owner: String!, $name: String!, $number: Int!,
+  $withLabels: Boolean!, $labelsCursor: String,
+  $withCommits: Boolean!, $commitsCursor: String
+) {
+  repository(owner: $owner, name: $name) {
+    labels(first: 100, after: $labelsCursor) @include(if: $withLabels) {
+      nodes { id name }
+      pageInfo { hasNextPage endCursor }
+    }
+    pullRequest(number: $number) {
+      id
+      labels(first: 100) @include(if: $withLabels) { nodes { name } }
+      commits(first: 100, after: $commitsCursor) @include(if: $withCommits) {
+        nodes { commit { message } }
+        pageInfo { hasNextPage endCursor }
+      }
+    }
+  }
+}
+"""
+
+ADD_LABELS_MUTATION = """
+mutation ($labelableId: ID!, $labelIds: [ID!]!) {
+  addLabelsToLabelable(input: {labelableId: $labelableId, labelIds: $labelIds}) {
+    clientMutationId
+  }
+}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class PullRequestLabels:
+    """The labels of a pull request, the messages of its commits and the repository labels.
+
+    The labels of the repository are given as their name and node ID, by lowercase name.
+    """
+
+    id: str
+    labels: frozenset[str]
+    commit_messages: list[str]
+    repo_labels: dict[str, tuple[str, str]]
+
+
+# set while a recipe admitted again by the `RateLimitScheduler` runs
+rate_limit_admitted: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "fastgithub_rate_limit_admitted", default=False
+)
+
+
+def rate_limit_exceeded(remaining: int, limit: int, threshold: float) -> bool:
+    """Return if the available rate limit is below a threshold.
+
+    A recipe resumed by the `RateLimitScheduler` was already admitted against the remaining
+    quota, so only an exhausted quota exceeds its rate limit.
+    """
+    if limit <= 0 or remaining <= 0:
+        return True
+    return not rate_limit_admitted.get() and remaining / limit < threshold
+
+
+def lower_headers(headers: Mapping[str, str] | None) -> dict[str, str]:
+    """Return headers with lowercase names, e.g. the headers of a `GithubException`."""
+    return {key.lower(): value for key, value in (headers or {}).items()}
+
+
+def retry_after_delay(headers: Mapping[str, str] | None) -> float | None:
+    """Return the number of seconds of the `Retry-After` header (secondary rate limits)."""
+    with contextlib.suppress(KeyError, ValueError):
+        return max(0.0, float(lower_headers(headers)["retry-after"]))
+    return None
+
+
+def rate_limit_reset_time(headers: Mapping[str, str] | None) -> float | None:
+    """Return the Unix timestamp of the `X-RateLimit-Reset` header (primary rate limit)."""
+    with contextlib.suppress(KeyError, ValueError):
+        return float(lower_headers(headers)["x-ratelimit-reset"])
+    return None
+
+
+def rate_limit_exception(remaining: int, limit: int, reset: int) -> RateLimitExceededException:
+    """Return the exception of an exceeded rate limit, with the headers of GitHub."""
+    return RateLimitExceededException(
+        429,
+        {"limit": limit, "remaining": remaining, "reset": reset},
+        {
+            "x-ratelimit-limit": str(limit),
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(reset),
+        },
+    )
+
+
 class RateStatus:
-    """A class that handle GiHub API rate limit status."""
+    """A class that handle GiHub API rate limit status.
+
+    The status is taken from the `X-RateLimit-*` headers of the responses already received by
+    the `Github` client, those of the `core` bucket when the client was created by
+    `create_github`: its connections `observe` the bucket (`X-RateLimit-Resource`) of each
+    response. PyGithub itself only keeps the headers of the last response, so the status of
+    another client is the one of the last bucket seen, e.g. `graphql` after a GraphQL query.
+    The `/rate_limit` endpoint is only polled when these are stale: no
+    response received yet, rate limit window reset since, or headers unchanged for more than
+    `max_age` seconds (other clients may consume the same quota). Use `RateStatus.shared` to
+    get the status shared by every helper of a `Github` client.
+
+    The status only holds the requester of the client and a weak reference to the client, so
+    that the shared status of a client is collected with it.
+    """
 
-    def __init__(self, github: Github, threshold: float = 0.5) -> None:
-        self._github = github
+    _shared: ClassVar[weakref.WeakKeyDictionary[Github, "RateStatus"]] = (
+        weakref.WeakKeyDictionary()
+    )
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, github: Github, threshold: float = 0.5, max_age: float = 60.0) -> None:
+        self._github = weakref.ref(github)
+        self._requester = github.requester
         self.threshold = threshold
+        self.max_age = max_age
         self.status: RateLimitOverview | None = None
+        self._snapshot: tuple[int, int, int] | None = None
+        self._observed_at = 0.0
+        self._core: tuple[int, int, int] | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, github: Github) -> "RateStatus":
+        """Return the rate status shared by all the users of a `Github` client."""
+        with cls._shared_lock:
+            rate_status = cls._shared.get(github)
+            if rate_status is None:
+                rate_status = cls._shared[github] = cls(github)
+            return rate_status
+
+    @classmethod
+    def tracked(cls) -> list["RateStatus"]:
+        """Return the rate statuses shared by the `Github` clients still alive."""
+        with cls._shared_lock:
+            return list(cls._shared.values())
 
     @property
-    def github(self) -> Github:
-        return self._github
+    def github(self) -> Github | None:
+        """Return the client, None once it was garbage collected."""
+        return self._github()
+
+    @property
+    def requester(self) -> Requester:
+        return self._requester
+
+    @property
+    def remaining(self) -> int:
+        return self.refresh()[0]
+
+    @property
+    def limit(self) -> int:
+        return self.refresh()[1]
+
+    @property
+    def reset_time(self) -> int:
+        """Return the Unix timestamp at which the rate limit window resets."""
+        return self.refresh()[2]
 
     def reset(self) -> None:
         self.status = None
+        self._snapshot = None
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Record the rate limit headers of a response, if they are those of the `core` bucket.
+
+        Args:
+            headers (Mapping[str, str]): The headers of the response, case insensitive.
+        """
+        if headers.get("x-ratelimit-resource", "core") != "core":
+            return
+        try:
+            core = (
+                int(headers["x-ratelimit-remaining"]),
+                int(headers["x-ratelimit-limit"]),
+                int(headers["x-ratelimit-reset"]),
+            )
+        except (KeyError, ValueError):
+            return
+        self._core = core
 
     def update(self) -> RateLimitOverview:
-        self.status = self.github.get_rate_limit()
+        """Poll the `/rate_limit` endpoint."""
+        headers, data = self.requester.requestJsonAndCheck("GET", "/rate_limit")
+        self.status = RateLimitOverview(self.requester, headers, data)
+        core = self.status.resources.core
+        self._snapshot = (core.remaining, core.limit, int(core.reset.timestamp()))
+        self._observed_at = time.monotonic()
         return self.status
 
+    def _fresh_snapshot(self) -> tuple[int, int, int] | None:
+        """Return the last known rate limit, from the response headers, if still fresh."""
+        snapshot = self._core
+        if snapshot is None:
+            requester = self.requester
+            remaining, limit = requester.rate_limiting
+            snapshot = (remaining, limit, requester.rate_limiting_resettime)
+        now = time.monotonic()
+        if snapshot[1] >= 0 and snapshot != self._snapshot:
+            self._snapshot = snapshot
+            self._observed_at = now
+
+        if (
+            self._snapshot is None
+            or self._snapshot[2] <= time.time()
+            or now - self._observed_at > self.max_age
+        ):
+            return None
+        return self._snapshot
+
+    def observed(self) -> tuple[int, int, int] | None:
+        """Return the last known rate limit, without polling the `/rate_limit` endpoint."""
+        with self._lock:
+            self._fresh_snapshot()
+            return self._snapshot
+
+    def refresh(self) -> tuple[int, int, int]:
+        """Return the remaining requests, the limit and the reset time of the rate limit."""
+        with self._lock:
+            snapshot = self._fresh_snapshot()
+            if snapshot is None:
+                self.update()
+                snapshot = self._snapshot
+            return snapshot  # type: ignore
+
     def available(self) -> float:
         """Return the available percent of the rate limit."""
-        status = self.update()
-        return (
-            status.resources.core.remaining / status.resources.core.limit
-            if status.resources.core.limit > 0
-            else 0.0
-        )
-
-    def too_low(self) -> bool:
+        remaining, limit, _ = self.refresh()
+        return remaining / limit if limit > 0 else 0.0
+
+    def too_low(self, threshold: float | None = None) -> bool:
         """Return if the rate limit is too short."""
-        return self.available() < self.threshold
+        return self.available() < (self.threshold if threshold is None else threshold)
+
+
+class LabelCache:
+    """A cache of the labels of a repository, evicted after `ttl` seconds.
+
+    The cache is filled with a single paginated `get_labels()` call, then kept up to date
+    when labels are created through a `GithubHelper` or when `label` webhook events are
+    received. Label names are case insensitive on GitHub, so are the lookups.
+    """
+
+    def __init__(self, ttl: float = 300.0) -> None:
+        self.ttl = ttl
+        self._labels: dict[str, github.Label.Label] | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def expired(self) -> bool:
+        return self._labels is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, repo: Repository) -> dict[str, github.Label.Label]:
+        """Return the labels of the repository, fetching them if the cache expired."""
+        with self._lock:
+            if self._labels is None or self.expired:
+                self._labels = {label.name.lower(): label for label in repo.get_labels()}
+                self._loaded_at = time.monotonic()
+            return self._labels
+
+    def get(self, repo: Repository, name: str) -> github.Label.Label | None:
+        return self.load(repo).get(name.lower())
+
+    def add(self, label: github.Label.Label) -> None:
+        with self._lock:
+            if self._labels is not None:
+                self._labels[label.name.lower()] = label
+
+    def discard(self, name: str) -> None:
+        with self._lock:
+            if self._labels is not None:
+                self._labels.pop(name.lower(), None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._labels = None
+
+
+class PullRequestIndex:
+    """An index of the open pull requests of a repository by head branch, evicted after `ttl`.
+
+    The index is seeded lazily with a single paginated `get_pulls(state="open")` call, then
+    kept up to date with the `pull_request` webhook events. Only the pull requests whose head
+    branch belongs to the repository itself (not to a fork) are indexed.
+    """
+
+    def __init__(self, ttl: float = 3600.0) -> None:
+        self.ttl = ttl
+        self._pulls: dict[str, int] | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def expired(self) -> bool:
+        return self._pulls is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, repo: Repository) -> dict[str, int]:
+        """Return the open pull requests numbers by head branch, fetching them if expired."""
+        with self._lock:
+            if self._pulls is None or self.expired:
+                self._pulls = {
+                    pr.head.ref: pr.number
+                    for pr in repo.get_pulls(state="open")
+                    if pr.head.repo is not None and pr.head.repo.full_name == repo.full_name
+                }
+                self._loaded_at = time.monotonic()
+            return self._pulls
+
+    def get(self, repo: Repository, branch: str) -> int | None:
+        return self.load(repo).get(branch)
+
+    def add(self, branch: str, number: int) -> None:
+        with self._lock:
+            if self._pulls is not None:
+                self._pulls[branch] = number
+
+    def discard(self, branch: str) -> None:
+        with self._lock:
+            if self._pulls is not None:
+                self._pulls.pop(branch, None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._pulls = None
 
 
 class GithubHelper:
     LABEL_REGEX = re.compile(r"#([a-z][a-z1-9-]+)([^a-z1-9-]|$)")
 
-    def __init__(self, github: Github, repo_fullname: str, rate_threshold: float = 0.5) -> None:
-        self._github = github
-        self._rate_status = RateStatus(github, rate_threshold)
+    def __init__(
+        self,
+        github: Github,
+        repo_fullname: str,
+        rate_threshold: float = 0.5,
+        label_cache: LabelCache | None = None,
+        pull_request_index: PullRequestIndex | None = None,
+    ) -> None:
+        # only the requester is held, so that the helpers of a registry don't keep its client
+        self._requester = github.requester
+        self._rate_status = RateStatus.shared(github)
+        self.rate_threshold = rate_threshold
+        self.label_cache = label_cache or LabelCache()
+        self.pull_request_index = pull_request_index or PullRequestIndex()
+        self.repo_fullname = repo_fullname
         self.repo = github.get_repo(repo_fullname, lazy=True)
 
     @property
     def rate_status(self) -> RateStatus:
         return self._rate_status
 
-    def raise_for_rate_excess(self) -> None:
-        if self.rate_status.too_low():
-            status: RateLimitOverview = self.rate_status.status  # type: ignore
-            raise RateLimitExceededException(
-                429,
-                status.resources.core.raw_data,
-                status.resources.core.raw_headers,  # type: ignore
-            )
+    def raise_for_rate_excess(self, threshold: float | None = None) -> None:
+        """Raise if the available rate limit is below a threshold, the helper's by default."""
+        remaining, limit, reset = self.rate_status.refresh()
+        if rate_limit_exceeded(
+            remaining, limit, self.rate_threshold if threshold is None else threshold
+        ):
+            raise rate_limit_exception(remaining, limit, reset)
+
+    def get_default_branch(self, payload: Payload | None = None) -> str:
+        """Return the default branch of the repository, from the payload when available."""
+        if payload is not None:
+            if default_branch := payload.get("repository", {}).get("default_branch"):
+                return default_branch
+        return self.repo.default_branch
+
+    def get_head_commit_message(self, ref: str, payload: Payload | None = None) -> str:
+        """Return the message of the head commit of a ref, from the payload when available."""
+        if payload is not None:
+            if message := (payload.get("head_commit") or {}).get("message"):
+                return message
+        return self.repo.get_commits(sha=ref)[0].commit.message
+
+    def get_open_pull_request(self, branch: str) -> int | None:
+        """Return the number of the open pull request of a head branch, if any."""
+        return self.pull_request_index.get(self.repo, branch)
+
+    def refresh_open_pull_request(self, branch: str) -> int | None:
+        """Fetch the open pull request of a head branch and record it in the index.
+
+        Used when the index is known to be stale, e.g. when GitHub refuses to create a pull
+        request that already exists. The entry of the branch is discarded if there is none.
+        """
+        owner = self.repo_fullname.split("/", 1)[0]
+        pulls = self.repo.get_pulls(state="open", head=f"{owner}:{branch}")
+        number = next((pr.number for pr in pulls), None)
+        if number is None:
+            self.pull_request_index.discard(branch)
+        else:
+            self.pull_request_index.add(branch, number)
+        return number
+
+    def update_pull_request_index(self, payload: Payload) -> None:
+        """Update the open pull requests index from a `pull_request` webhook event."""
+        pr = payload["pull_request"]
+        head_repo = pr["head"].get("repo") or {}
+        if head_repo.get("full_name") != payload["repository"]["full_name"]:
+            return
+        if payload.get("action") in ("opened", "reopened"):
+            self.pull_request_index.add(pr["head"]["ref"], pr["number"])
+        elif payload.get("action") == "closed":
+            self.pull_request_index.discard(pr["head"]["ref"])
 
     def _get_or_create_label(
         self,
@@ -76,51 +471,143 @@ class GithubHelper:
         color: str = "ff66cc",
         description: str = "Created by FastGitHub",
     ) -> github.Label.Label:
-        """Fetch an existing label or create it."""
-        try:
-            label = self.repo.get_label(name)
-        except github.UnknownObjectException:
-            label = None
+        """Fetch an existing label from the cache or create it."""
+        label = self.label_cache.get(self.repo, name)
+        if label is not None:
+            return label
+        return self._create_label(name, color, description)
 
-        if not label:
+    def _create_label(
+        self,
+        name: str,
+        color: str = "ff66cc",
+        description: str = "Created by FastGitHub",
+    ) -> github.Label.Label:
+        """Create a label missing from the repository and add it to the cache."""
+        try:
             label = self.repo.create_label(
                 name=name,
                 color=color,
                 description=description,
             )
+        except GithubException as ex:
+            # the label was created since it was found missing
+            if ex.status != 422:
+                raise ex
+            label = self.repo.get_label(name)
+        self.label_cache.add(label)
         return label
 
+    def update_label_cache(self, payload: Payload) -> None:
+        """Update the label cache from a `label` webhook event."""
+        action = payload.get("action")
+        label = github.Label.Label(self._requester, {}, payload["label"], completed=True)
+        if action == "deleted":
+            self.label_cache.discard(label.name)
+        elif action in ("created", "edited"):
+            if previous_name := payload.get("changes", {}).get("name", {}).get("from"):
+                self.label_cache.discard(previous_name)
+            self.label_cache.add(label)
+
     @staticmethod
     def validate_label_name(name: str, pattern: re.Pattern) -> None:
         """Validate the name of a label given a regex pattern."""
         if not pattern.fullmatch(name):
-            raise ValueError(
-                f"The pattern `{name}` don't follow the regex {GithubHelper.LABEL_REGEX.pattern}!"
-            )
+            raise ValueError(f"The pattern `{name}` don't follow the regex {pattern.pattern}!")
+
+    def _create_labels(self, labels: dict[str, Label]) -> set[str]:
+        return {self._get_or_create_label(**label.model_dump()).name for label in labels.values()}
 
     def extract_labels_from_commit(
-        self, message: str, labels_config: dict[str, list[Label]]
+        self, message: str, labels_config: dict[str, list[Label]] | LabelMatcher
     ) -> set[str]:
         """Extract labels from a commit message and create labels in the repo if needed."""
-        labels = set()
-        for pattern, labels_ in labels_config.items():
-            self.__class__.validate_label_name(pattern, GithubHelper.LABEL_REGEX)
-            if pattern in message:
-                for label_ in labels_:
-                    label_ = self._get_or_create_label(**label_.model_dump())
-                    labels.update([label_.name])
-        return labels
+        if not isinstance(labels_config, LabelMatcher):
+            labels_config = LabelMatcher(labels_config)
+        return self._create_labels(labels_config.match(message))
 
     def extract_labels_from_pr(
-        self, pr: PullRequest, labels_config: dict[str, list[Label]]
+        self, pr: PullRequest, labels_config: dict[str, list[Label]] | LabelMatcher
     ) -> set[str]:
         """Extract labels from a PR and create labels in the repo if needed."""
-        labels = set()
-        commit_messages = [c.commit.message for c in pr.get_commits()]
-        for message in commit_messages:
-            labels = labels.union(self.extract_labels_from_commit(message, labels_config))
+        if not isinstance(labels_config, LabelMatcher):
+            labels_config = LabelMatcher(labels_config)
+        labels = {}
+        for commit in pr.get_commits():
+            for name, label in labels_config.match(commit.commit.message).items():
+                labels.setdefault(name, label)
+        return self._create_labels(labels)
+
+    def get_pull_request_labels(self, number: int) -> PullRequestLabels:
+        """Fetch the labels and the commit messages of a PR and the repository labels.
+
+        A single GraphQL query fetches 100 commits and 100 repository labels, the next pages
+        are fetched by the following queries, only for the connections that have one.
+        """
+        owner, name = self.repo_fullname.split("/")
+        variables = {
+            "owner": owner,
+            "name": name,
+            "number": number,
+            "withLabels": True,
+            "labelsCursor": None,
+            "withCommits": True,
+            "commitsCursor": None,
+        }
+        pr_id, pr_labels, messages, repo_labels = "", frozenset(), [], {}
+        while variables["withLabels"] or variables["withCommits"]:
+            _, data = self._requester.graphql_query(PULL_REQUEST_LABELS_QUERY, variables)
+            repository = data["data"]["repository"]
+            pr = repository["pullRequest"]
+            pr_id = pr["id"]
+            if variables["withLabels"]:
+                if variables["labelsCursor"] is None:
+                    pr_labels = frozenset(label["name"] for label in pr["labels"]["nodes"])
+                for label in repository["labels"]["nodes"]:
+                    repo_labels[label["name"].lower()] = (label["name"], label["id"])
+                page_info = repository["labels"]["pageInfo"]
+                variables["withLabels"] = page_info["hasNextPage"]
+                variables["labelsCursor"] = page_info["endCursor"]
+            if variables["withCommits"]:
+                messages.extend(node["commit"]["message"] for node in pr["commits"]["nodes"])
+                page_info = pr["commits"]["pageInfo"]
+                variables["withCommits"] = page_info["hasNextPage"]
+                variables["commitsCursor"] = page_info["endCursor"]
+        return PullRequestLabels(pr_id, pr_labels, messages, repo_labels)
+
+    def extract_labels_from_messages(
+        self,
+        messages: list[str],
+        labels_config: dict[str, list[Label]] | LabelMatcher,
+        repo_labels: dict[str, tuple[str, str]] | None = None,
+    ) -> dict[str, str]:
+        """Extract labels from commit messages and create labels in the repo if needed.
+
+        Returns:
+            dict[str, str]: The node IDs of the labels, by name.
+        """
+        if not isinstance(labels_config, LabelMatcher):
+            labels_config = LabelMatcher(labels_config)
+        repo_labels = repo_labels or {}
+        labels: dict[str, str] = {}
+        for message in messages:
+            for name, label in labels_config.match(message).items():
+                if name in labels:
+                    continue
+                if (repo_label := repo_labels.get(name.lower())) is None:
+                    # the repository labels show the label is missing, no need for the cache
+                    created_label = self._create_label(**label.model_dump())
+                    repo_label = (created_label.name, created_label.node_id)
+                labels[repo_label[0]] = repo_label[1]
         return labels
 
+    def add_labels_to_labelable(self, labelable_id: str, label_ids: list[str]) -> None:
+        """Add labels to a PR (or an issue) by node ID, with a single GraphQL mutation."""
+        if label_ids:
+            self._requester.graphql_query(
+                ADD_LABELS_MUTATION, {"labelableId": labelable_id, "labelIds": label_ids}
+            )
+
     @staticmethod
     def add_labels_to_pr(pr: PullRequest, labels: set[str]):
         """Add a set of labels to a PR associated with a branch"""
@@ -129,3 +616,98 @@ class GithubHelper:
         if not new_labels:
             return
         pr.add_to_labels(*new_labels)
+
+
+class GithubHelperRegistry:
+    """A LRU registry of the `GithubHelper` of each repository, reused between deliveries.
+
+    The helper of a repository holds the `Repository` object (whose metadata, e.g. the
+    default branch, is fetched once), the label cache, the open pull requests index and the
+    rate status of the client, so that a steady flow of deliveries doesn't fetch them again.
+    The least recently used helpers are evicted beyond `maxsize` repositories. Use
+    `GithubHelperRegistry.shared` to get the registry shared by the recipes of a `Github`
+    client. The registry only holds a weak reference to its client, so that the shared
+    registry of a client is collected with it.
+
+    Args:
+        github (Github): The client of the helpers.
+        maxsize (int): The maximum number of repositories.
+        rate_threshold (float): The rate threshold of the helpers.
+        labels_ttl (float): The number of seconds the labels of a repository are cached.
+        pulls_ttl (float): The number of seconds the open pull requests index is cached.
+    """
+
+    _shared: ClassVar[weakref.WeakKeyDictionary[Github, "GithubHelperRegistry"]] = (
+        weakref.WeakKeyDictionary()
+    )
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        github: Github,
+        maxsize: int = 128,
+        rate_threshold: float = 0.5,
+        labels_ttl: float = 300.0,
+        pulls_ttl: float = 3600.0,
+    ) -> None:
+        self._github = weakref.ref(github)
+        self.maxsize = maxsize
+        self.rate_threshold = rate_threshold
+        self.labels_ttl = labels_ttl
+        self.pulls_ttl = pulls_ttl
+        self._helpers: collections.OrderedDict[str, GithubHelper] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, github: Github) -> "GithubHelperRegistry":
+        """Return the registry shared by all the recipes of a `Github` client."""
+        with cls._shared_lock:
+            registry = cls._shared.get(github)
+            if registry is None:
+                registry = cls._shared[github] = cls(github)
+            return registry
+
+    @property
+    def github(self) -> Github:
+        """Return the client of the helpers.
+
+        Raises:
+            ReferenceError: If the client was garbage collected.
+        """
+        if (github := self._github()) is None:
+            raise ReferenceError("The client of the registry was garbage collected!")
+        return github
+
+    def __len__(self) -> int:
+        return len(self._helpers)
+
+    def __contains__(self, repo_fullname: str) -> bool:
+        return repo_fullname in self._helpers
+
+    def get(self, repo_fullname: str) -> GithubHelper:
+        """Return the helper of a repository, creating it if needed."""
+        with self._lock:
+            helper = self._helpers.get(repo_fullname)
+            if helper is not None:
+                self._helpers.move_to_end(repo_fullname)
+                return helper
+
+            helper = self._helpers[repo_fullname] = GithubHelper(
+                self.github,
+                repo_fullname,
+                rate_threshold=self.rate_threshold,
+                label_cache=LabelCache(self.labels_ttl),
+                pull_request_index=PullRequestIndex(self.pulls_ttl),
+            )
+            if len(self._helpers) > self.maxsize:
+                self._helpers.popitem(last=False)
+            return helper
+
+    def discard(self, repo_fullname: str) -> None:
+        """Forget the helper of a repository, e.g. when it is renamed or deleted."""
+        with self._lock:
+            self._helpers.pop(repo_fullname, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._helpers.clear()
@@ -0,0 +1,131 @@
+"""The clients of the installations of a GitHub App."""
+
+import collections
+import threading
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from github import Auth, Github
+from github.InstallationAuthorization import InstallationAuthorization
+from github.Requester import Requester
+
+from fastgithub.types import Payload
+
+from .client import create_github
+
+
+class InstallationTokenAuth(Auth.AppInstallationAuth):
+    """The authentication of an installation, with a token shared by the concurrent requests.
+
+    The installation access token is minted once, even when concurrent requests need it, and
+    refreshed `refresh_margin` seconds before it expires (tokens are valid for an hour), so
+    that no request is sent with an expired token.
+    """
+
+    def __init__(
+        self,
+        app_auth: Auth.AppAuth,
+        installation_id: int,
+        refresh_margin: float = 300.0,
+        token_permissions: dict[str, str] | None = None,
+        requester: Requester | None = None,
+    ) -> None:
+        self.refresh_margin = refresh_margin
+        self._authorization: InstallationAuthorization | None = None
+        self._lock = threading.Lock()
+        super().__init__(app_auth, installation_id, token_permissions, requester)
+
+    @property
+    def expires_at(self) -> datetime | None:
+        return None if self._authorization is None else self._authorization.expires_at
+
+    def _expires_soon(self) -> bool:
+        refresh_at = self.expires_at - timedelta(seconds=self.refresh_margin)  # type: ignore
+        return refresh_at <= datetime.now(UTC)
+
+    @property
+    def token(self) -> str:
+        with self._lock:
+            if self._authorization is None or self._expires_soon():
+                self._authorization = self._get_installation_authorization()
+            return self._authorization.token
+
+
+class GithubAppInstallations:
+    """The `Github` clients of the installations of a GitHub App, one per installation.
+
+    Each installation of the App (e.g. each organization) has its own rate limit, so each one
+    gets its own client, authenticated with an installation access token, and its own rate
+    status and helpers. The installation of a delivery is read from its payload, so that
+    a recipe given a `GithubAppInstallations` uses the client of the right installation.
+    The least recently used clients are closed beyond `maxsize` installations.
+
+    Args:
+        app_id (int | str): The ID of the GitHub App.
+        private_key (str): The private key of the GitHub App, in PEM format.
+        refresh_margin (float): The number of seconds before their expiration the tokens are
+            refreshed.
+        maxsize (int): The maximum number of installation clients.
+        **github_kwargs: The arguments of the clients, see `create_github`.
+    """
+
+    def __init__(
+        self,
+        app_id: int | str,
+        private_key: str,
+        refresh_margin: float = 300.0,
+        maxsize: int = 1024,
+        **github_kwargs: Any,
+    ) -> None:
+        self.app_auth = Auth.AppAuth(app_id, private_key)
+        self.refresh_margin = refresh_margin
+        self.maxsize = maxsize
+        self.github_kwargs = github_kwargs
+        self._clients: collections.OrderedDict[int, Github] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, installation_id: int) -> bool:
+        return installation_id in self._clients
+
+    @staticmethod
+    def installation_id(payload: Payload) -> int:
+        """Return the ID of the installation which sent a delivery.
+
+        Raises:
+            ValueError: If the delivery wasn't sent by an installation of a GitHub App.
+        """
+        installation_id = (payload.get("installation") or {}).get("id")
+        if not isinstance(installation_id, int):
+            raise ValueError("The payload doesn't come from an installation of a GitHub App!")
+        return installation_id
+
+    def get(self, installation_id: int) -> Github:
+        """Return the client of an installation, creating it if needed."""
+        with self._lock:
+            github = self._clients.get(installation_id)
+            if github is not None:
+                self._clients.move_to_end(installation_id)
+                return github
+
+            auth = InstallationTokenAuth(
+                self.app_auth, installation_id, refresh_margin=self.refresh_margin
+            )
+            github = self._clients[installation_id] = create_github(
+                auth=auth, **self.github_kwargs
+            )
+            if len(self._clients) > self.maxsize:
+                _, evicted = self._clients.popitem(last=False)
+                evicted.close()
+            return github
+
+    def for_payload(self, payload: Payload) -> Github:
+        """Return the client of the installation which sent a delivery."""
+        return self.get(self.installation_id(payload))
+
+    def close(self) -> None:
+        with self._lock:
+            while self._clients:
+                self._clients.popitem()[1].close()
@@ -0,0 +1,18 @@
+"""The attributes configuring the handling of a recipe, e.g. its timeout or its priority."""
+
+from collections.abc import Callable
+from typing import Any
+
+
+def recipe_attribute(recipe: Callable, name: str, default: Any = None) -> Any:
+    """Return an attribute of a recipe, the one of its `Recipe` for a bound method.
+
+    The handlers of a `Recipe` are its bound methods, configured by the attributes of the
+    recipe itself, while a function recipe is configured by its own attributes.
+
+    Args:
+        recipe (Callable): The recipe, a function or a bound method of a `Recipe`.
+        name (str): The name of the attribute, e.g. `timeout`.
+        default (Any): The value returned when the recipe has no such attribute.
+    """
+    return getattr(getattr(recipe, "__self__", recipe), name, default)
@@ -0,0 +1,248 @@
+"""Caches of GitHub API responses, revalidated with conditional requests.
+
+GitHub doesn't count the `304 Not Modified` responses against the rate limit, so a read
+sent with the `ETag` (`If-None-Match`) or the `Last-Modified` date (`If-Modified-Since`) of
+the cached response costs no quota when the resource didn't change.
+"""
+
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+
+# the response headers that depend on the request or on the transfer, not on the resource
+_VOLATILE_HEADERS = frozenset({
+    "date",
+    "x-github-request-id",
+    "content-length",
+    "content-encoding",
+    "transfer-encoding",
+})
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    """A cached response of the GitHub API, with its validators."""
+
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    @property
+    def etag(self) -> str | None:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> str | None:
+        return self.headers.get("last-modified")
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+    @classmethod
+    def from_response(
+        cls, status: int, headers: Mapping[str, str], body: bytes
+    ) -> "CachedResponse | None":
+        """Return the response to cache, or None if it has no validator."""
+        headers = {
+            key.lower(): value
+            for key, value in headers.items()
+            if key.lower() not in _VOLATILE_HEADERS
+        }
+        if status != 200 or ("etag" not in headers and "last-modified" not in headers):
+            return None
+        return cls(status, headers, body)
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Return the headers revalidating this response."""
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def revalidated(self, headers: Mapping[str, str]) -> "CachedResponse":
+        """Return the response updated with the headers of a `304 Not Modified` response."""
+        fresh_headers = {
+            key.lower(): value
+            for key, value in headers.items()
+            if key.lower() not in _VOLATILE_HEADERS
+        }
+        return CachedResponse(self.status, {**self.headers, **fresh_headers}, self.body)
+
+
+def cache_key(url: str, headers: Mapping[str, str], identity: str | None = None) -> str:
+    """Return the cache key of a request.
+
+    The responses depend on the client (e.g. private repositories) and on the media type
+    requested, so both are part of the key. The client is given by its `identity`, e.g. its
+    installation, since the installation tokens rotate every hour and would make the cached
+    responses unreachable; without identity the credentials are used, hashed, not stored.
+    """
+    lower_headers = {key.lower(): value for key, value in headers.items()}
+    if identity is None:
+        identity = lower_headers.get("authorization", "")
+    vary = f"{identity}\n{lower_headers.get('accept', '')}"
+    return f"{hashlib.sha256(vary.encode()).hexdigest()[:16]} {url}"
+
+
+def cache_identity(auth: object) -> str | None:
+    """Return the identity of the client of an authentication, its installation if any."""
+    installation_id = getattr(auth, "installation_id", None)
+    return None if installation_id is None else f"installation:{installation_id}"
+
+
+class ResponseCache(ABC):
+    """A cache of GitHub API responses, by request."""
+
+    def __init__(self) -> None:
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        """Return the number of reads served from the cache (`304 Not Modified`)."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Return the number of reads whose response was sent by GitHub."""
+        return self._misses
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+    @abstractmethod
+    def get(self, key: str) -> CachedResponse | None:
+        """Return the cached response of a request, if any."""
+
+    @abstractmethod
+    def set(self, key: str, response: CachedResponse) -> None:
+        """Cache the response of a request."""
+
+    @abstractmethod
+    def discard(self, key: str) -> None:
+        """Forget the response of a request."""
+
+
+class MemoryResponseCache(ResponseCache):
+    """An in-memory cache of responses, bounded in total size.
+
+    Args:
+        maxsize (int): The maximum size of the cached responses in bytes, the least recently
+            used are evicted first.
+    """
+
+    def __init__(self, maxsize: int = 64 * 1024 * 1024) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+        self._size = 0
+        self._responses: collections.OrderedDict[str, CachedResponse] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        if response.size > self.maxsize:
+            return
+        with self._lock:
+            if (previous := self._responses.pop(key, None)) is not None:
+                self._size -= previous.size
+            self._responses[key] = response
+            self._size += response.size
+            while self._size > self.maxsize:
+                _, evicted = self._responses.popitem(last=False)
+                self._size -= evicted.size
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if (response := self._responses.pop(key, None)) is not None:
+                self._size -= response.size
+
+
+class SQLiteResponseCache(ResponseCache):
+    """A cache of responses in a SQLite database, kept across restarts.
+
+    Args:
+        path (str | Path): The path of the database file.
+        maxsize (int): The maximum number of cached responses, the least recently used are
+            evicted first.
+    """
+
+    def __init__(self, path: str | Path, maxsize: int = 100_000) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, status INTEGER "
+                "NOT NULL, headers TEXT NOT NULL, body BLOB NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT status, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        status, headers, body = row
+        return CachedResponse(status, json.loads(headers), body)
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, status, headers, body, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response.status, json.dumps(response.headers), response.body, time.time()),
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def discard(self, key: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
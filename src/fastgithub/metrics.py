@@ -0,0 +1,333 @@
+"""Metrics of the webhook pipeline, exposed in the Prometheus text format.
+
+The metrics are collected by `prometheus_client`, installed with the `metrics` extra: mount
+them with the `metrics_path` of `webhook_router` and scrape each worker of the server. The
+GitHub API requests are attributed to the recipes by `fastgithub.accounting`.
+"""
+
+import contextlib
+from collections.abc import Callable, Iterator
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+from github.Requester import Requester
+
+from fastgithub.accounting import ApiCall
+from fastgithub.helpers.github import RateStatus
+
+if TYPE_CHECKING:
+    from prometheus_client import CollectorRegistry
+    from prometheus_client.metrics_core import Metric
+
+    from fastgithub.webhook.journal import SQLiteEventJournal
+    from fastgithub.webhook.queue import DeliveryQueue
+    from fastgithub.webhook.scheduler import RateLimitScheduler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+# the events documented by GitHub, the `X-GitHub-Event` header of an unverified delivery
+# can't be trusted to bound the labels of the metrics
+GITHUB_EVENTS = frozenset({
+    "branch_protection_configuration",
+    "branch_protection_rule",
+    "check_run",
+    "check_suite",
+    "code_scanning_alert",
+    "commit_comment",
+    "create",
+    "custom_property",
+    "custom_property_values",
+    "delete",
+    "dependabot_alert",
+    "deploy_key",
+    "deployment",
+    "deployment_protection_rule",
+    "deployment_review",
+    "deployment_status",
+    "discussion",
+    "discussion_comment",
+    "fork",
+    "github_app_authorization",
+    "gollum",
+    "installation",
+    "installation_repositories",
+    "installation_target",
+    "issue_comment",
+    "issues",
+    "label",
+    "marketplace_purchase",
+    "member",
+    "membership",
+    "merge_group",
+    "meta",
+    "milestone",
+    "org_block",
+    "organization",
+    "package",
+    "page_build",
+    "personal_access_token_request",
+    "ping",
+    "project",
+    "project_card",
+    "project_column",
+    "projects_v2",
+    "projects_v2_item",
+    "projects_v2_status_update",
+    "public",
+    "pull_request",
+    "pull_request_review",
+    "pull_request_review_comment",
+    "pull_request_review_thread",
+    "push",
+    "registry_package",
+    "release",
+    "repository",
+    "repository_advisory",
+    "repository_dispatch",
+    "repository_import",
+    "repository_ruleset",
+    "repository_vulnerability_alert",
+    "secret_scanning_alert",
+    "secret_scanning_alert_location",
+    "secret_scanning_scan",
+    "security_advisory",
+    "security_and_analysis",
+    "sponsorship",
+    "star",
+    "status",
+    "sub_issues",
+    "team",
+    "team_add",
+    "watch",
+    "workflow_dispatch",
+    "workflow_job",
+    "workflow_run",
+})
+OTHER = "other"
+MAX_ACTIONS = 256
+
+
+def _prometheus_client() -> ModuleType:
+    try:
+        import prometheus_client
+    except ModuleNotFoundError as ex:
+        raise ImportError(
+            "The metrics require the `prometheus-client` package: pip install fastgithub[metrics]"
+        ) from ex
+    return prometheus_client
+
+
+def recipe_name(recipe: Callable) -> str:
+    """Return the name of a recipe, the class of a `Recipe` or the name of a function."""
+    owner = getattr(recipe, "__self__", None)
+    if owner is not None:
+        return type(owner).__name__
+    return getattr(recipe, "__name__", None) or type(recipe).__name__
+
+
+def _client_label(requester: Requester) -> str:
+    auth = getattr(requester, "auth", None)
+    installation_id = getattr(auth, "installation_id", None)
+    return "default" if installation_id is None else str(installation_id)
+
+
+def _stats(component: Any) -> Any:
+    # a component that can't be read must not fail the scrape of the other metrics
+    if component is None:
+        return None
+    try:
+        return component.stats()
+    except Exception:
+        return None
+
+
+class PipelineCollector:
+    """Collect the state of the components of a handler and the rate limits at scrape time."""
+
+    def __init__(self) -> None:
+        self.queue: DeliveryQueue | None = None
+        self.scheduler: RateLimitScheduler | None = None
+        self.journal: SQLiteEventJournal | None = None
+
+    def describe(self) -> list["Metric"]:
+        # the collected metrics depend on the tracked components
+        return []
+
+    def collect(self) -> Iterator["Metric"]:
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        remaining = GaugeMetricFamily(
+            "fastgithub_github_rate_limit_remaining",
+            "The remaining GitHub API requests of the clients, as last observed.",
+            labels=("client",),
+        )
+        for rate_status in RateStatus.tracked():
+            with contextlib.suppress(Exception):
+                if (snapshot := rate_status.observed()) is not None:
+                    remaining.add_metric((_client_label(rate_status.requester),), snapshot[0])
+        yield remaining
+
+        if (stats := _stats(self.queue)) is not None:
+            yield GaugeMetricFamily(
+                "fastgithub_queue_depth",
+                "The number of deliveries waiting in the queue.",
+                value=stats.depth,
+            )
+            yield GaugeMetricFamily(
+                "fastgithub_queue_lag_seconds",
+                "The time the last delivery processed waited in the queue.",
+                value=stats.lag,
+            )
+            if (lane_depths := getattr(stats, "lane_depths", None)) is not None:
+                lanes = GaugeMetricFamily(
+                    "fastgithub_lane_depth",
+                    "The number of deliveries waiting in each lane of a `LaneScheduler`.",
+                    labels=("lane",),
+                )
+                for lane, depth in enumerate(lane_depths):
+                    lanes.add_metric((str(lane),), depth)
+                yield lanes
+
+        if (stats := _stats(self.scheduler)) is not None:
+            yield GaugeMetricFamily(
+                "fastgithub_scheduler_parked_recipes",
+                "The number of recipes parked until the rate limit allows them.",
+                value=stats.parked,
+            )
+            yield CounterMetricFamily(
+                "fastgithub_scheduler_dropped_recipes",
+                "The number of recipes dropped because the scheduler was full.",
+                value=stats.dropped,
+            )
+
+        if (stats := _stats(self.journal)) is not None:
+            yield GaugeMetricFamily(
+                "fastgithub_journal_pending_writes",
+                "The number of journal writes waiting to be committed.",
+                value=stats.pending,
+            )
+
+
+class WebhookMetrics:
+    """The metrics of a webhook handler.
+
+    The handler tracks its queue, scheduler and journal with `track`: their state is read when
+    the metrics are scraped. The events outside of `GITHUB_EVENTS` are counted as `other`, and
+    the actions beyond the first `MAX_ACTIONS` as well, so that forged deliveries can't grow
+    the metrics without bound.
+
+    Requires the `prometheus-client` package (`pip install fastgithub[metrics]`).
+
+    Args:
+        registry (CollectorRegistry | None): The registry of the metrics, a new one by default.
+    """
+
+    def __init__(self, registry: "CollectorRegistry | None" = None) -> None:
+        prometheus_client = _prometheus_client()
+        self.registry = registry or prometheus_client.CollectorRegistry()
+        # the text format rendered by `generate_latest`
+        self.content_type = getattr(
+            prometheus_client, "CONTENT_TYPE_PLAIN_0_0_4", prometheus_client.CONTENT_TYPE_LATEST
+        )
+        self._generate = prometheus_client.generate_latest
+        self._actions: set[str] = set()
+        registry = self.registry
+        self.deliveries = prometheus_client.Counter(
+            "fastgithub_deliveries",
+            "The number of deliveries received.",
+            ("event", "action"),
+            registry=registry,
+        )
+        self.signature_seconds = prometheus_client.Histogram(
+            "fastgithub_signature_verification_seconds",
+            "The time spent verifying the signatures of the deliveries.",
+            buckets=FAST_BUCKETS,
+            registry=registry,
+        )
+        self.decode_seconds = prometheus_client.Histogram(
+            "fastgithub_payload_decode_seconds",
+            "The time spent decoding the payloads of the deliveries.",
+            buckets=FAST_BUCKETS,
+            registry=registry,
+        )
+        self.routing_seconds = prometheus_client.Histogram(
+            "fastgithub_routing_seconds",
+            "The time spent matching the recipes of the deliveries.",
+            buckets=FAST_BUCKETS,
+            registry=registry,
+        )
+        self.recipe_seconds = prometheus_client.Histogram(
+            "fastgithub_recipe_duration_seconds",
+            "The duration of the recipe runs.",
+            ("recipe", "status"),
+            buckets=DEFAULT_BUCKETS,
+            registry=registry,
+        )
+        self.recipe_errors = prometheus_client.Counter(
+            "fastgithub_recipe_errors",
+            "The number of recipe runs that raised an error.",
+            ("recipe", "error"),
+            registry=registry,
+        )
+        self.api_calls = prometheus_client.Counter(
+            "fastgithub_github_api_calls",
+            "The number of GitHub API requests sent by the recipes.",
+            ("recipe", "status"),
+            registry=registry,
+        )
+        self.api_call_seconds = prometheus_client.Histogram(
+            "fastgithub_github_api_call_duration_seconds",
+            "The duration of the GitHub API requests sent by the recipes.",
+            ("recipe",),
+            buckets=DEFAULT_BUCKETS,
+            registry=registry,
+        )
+        self.api_quota = prometheus_client.Counter(
+            "fastgithub_github_api_quota_used",
+            "The rate limit quota used by the GitHub API requests of the recipes.",
+            ("recipe", "resource"),
+            registry=registry,
+        )
+        self.collector = PipelineCollector()
+        registry.register(self.collector)
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text format."""
+        return self._generate(self.registry).decode()
+
+    def track(
+        self,
+        queue: "DeliveryQueue | None" = None,
+        scheduler: "RateLimitScheduler | None" = None,
+        journal: "SQLiteEventJournal | None" = None,
+    ) -> None:
+        """Track the components of a handler, read when the metrics are scraped."""
+        self.collector.queue = queue
+        self.collector.scheduler = scheduler
+        self.collector.journal = journal
+
+    def record_delivery(self, event: str, action: str | None) -> None:
+        """Count a delivery, with its event and action bounded to a known set of values."""
+        if event not in GITHUB_EVENTS:
+            event, action = OTHER, ""
+        action = action or ""
+        if action and action not in self._actions:
+            if len(self._actions) >= MAX_ACTIONS:
+                action = OTHER
+            else:
+                self._actions.add(action)
+        self.deliveries.labels(event=event, action=action).inc()
+
+    def record_recipe(self, recipe: str, status: str, duration: float, error: str | None) -> None:
+        """Record a recipe run, with the type of its error if it failed."""
+        self.recipe_seconds.labels(recipe=recipe, status=status).observe(duration)
+        if error is not None:
+            self.recipe_errors.labels(recipe=recipe, error=error).inc()
+
+    def record_api_call(self, recipe: str, call: ApiCall) -> None:
+        """Record a GitHub API request sent by a recipe, see `fastgithub.accounting`."""
+        self.api_calls.labels(recipe=recipe, status=call.status).inc()
+        self.api_call_seconds.labels(recipe=recipe).observe(call.duration)
+        if call.cost:
+            self.api_quota.labels(recipe=recipe, resource=call.resource).inc(call.cost)
@@ -1,3 +1,3 @@
 """A package that handles hook operations."""
 
-from ._base import GithubRecipe, Recipe
+from ._base import AsyncGithubRecipe, GithubRecipe, Recipe
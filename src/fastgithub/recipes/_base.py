@@ -5,13 +5,61 @@ from collections.abc import Callable
 
 from github import Github
 
+from fastgithub.helpers.async_github import AsyncGithubClient
+from fastgithub.helpers.github import GithubHelper, GithubHelperRegistry
+from fastgithub.helpers.installations import GithubAppInstallations
+from fastgithub.types import Payload
+from fastgithub.webhook.retry import RetryPolicy
+
 
 class Recipe(ABC):
+    # the recipes with a higher priority are resumed first when a rate limit resets
+    priority: int = 0
+    # the retry policy of the recipe, the retry policy of the handler if None
+    retry_policy: RetryPolicy | None = None
+    # the timeout of the recipe in seconds, the recipe timeout of the handler if None
+    timeout: float | None = None
+    # the maximum number of GitHub API calls per run, the API budget of the handler if None
+    api_budget: int | None = None
+
     @property
     def events(self) -> dict[str, Callable]:
         return {}
 
 
 class GithubRecipe(Recipe):
-    def __init__(self, github: Github) -> None:
+    # the rate threshold below which the recipe is deferred, the threshold of the helper if
+    # None: a lower threshold keeps important recipes running longer when the quota runs low
+    rate_threshold: float | None = None
+
+    def __init__(
+        self,
+        github: Github | GithubAppInstallations,
+        helpers: GithubHelperRegistry | None = None,
+    ) -> None:
         self.github = github
+        self.helpers = helpers
+
+    def helper(self, payload: Payload) -> GithubHelper:
+        """Return the helper of the repository of a delivery, shared with the other recipes.
+
+        With the installations of a GitHub App, the helper uses the client of the
+        installation which sent the delivery.
+        """
+        if self.helpers is not None:
+            registry = self.helpers
+        elif isinstance(self.github, GithubAppInstallations):
+            registry = GithubHelperRegistry.shared(self.github.for_payload(payload))
+        else:
+            registry = GithubHelperRegistry.shared(self.github)
+        return registry.get(payload["repository"]["full_name"])
+
+
+class AsyncGithubRecipe(Recipe):
+    """A recipe whose handlers are coroutines using an asynchronous GitHub client."""
+
+    # see `GithubRecipe.rate_threshold`
+    rate_threshold: float | None = None
+
+    def __init__(self, client: AsyncGithubClient) -> None:
+        self.client = client
@@ -1,16 +1,33 @@
 from collections.abc import Callable
 
+from github import Github
 from github.GithubException import GithubException
 
-from fastgithub.helpers.github import GithubHelper
+from fastgithub.helpers.github import GithubHelperRegistry
+from fastgithub.helpers.installations import GithubAppInstallations
 from fastgithub.recipes._base import GithubRecipe
 from fastgithub.types import Payload
 
 
 class AutoCreatePullRequest(GithubRecipe):
+    def __init__(
+        self,
+        github: Github | GithubAppInstallations,
+        helpers: GithubHelperRegistry | None = None,
+    ) -> None:
+        super().__init__(github, helpers)
+
     @property
     def events(self) -> dict[str, Callable]:
-        return {"push": self._process_push}
+        return {
+            "push": self._process_push,
+            "pull_request.opened": self._process_pull_request,
+            "pull_request.reopened": self._process_pull_request,
+            "pull_request.closed": self._process_pull_request,
+        }
+
+    def _process_pull_request(self, payload: Payload):
+        self.helper(payload).update_pull_request_index(payload)
 
     def _process_push(
         self,
@@ -20,14 +37,25 @@ class AutoCreatePullRequest(GithubRecipe):
         body: str = "Created by FastGitHub",
         as_draft: bool = True,
     ):
-        gh = GithubHelper(self.github, repo_fullname=payload["repository"]["full_name"])
-        gh.raise_for_rate_excess()
-
-        base_branch = base_branch or gh.repo.default_branch
         head_branch = payload["ref"]
-        _title = title or gh.repo.get_commits(sha=head_branch)[0].commit.message
+        # tags and deleted branches can't be the head of a PR
+        if not head_branch.startswith("refs/heads/") or payload.get("deleted"):
+            return
+
+        gh = self.helper(payload)
+        branch = head_branch.removeprefix("refs/heads/")
+        default_branch = gh.get_default_branch(payload)
+        base_branch = base_branch or default_branch
+        if branch in (default_branch, base_branch):
+            return
+
+        gh.raise_for_rate_excess(self.rate_threshold)
+        if gh.get_open_pull_request(branch) is not None:
+            return
+
+        _title = title or gh.get_head_commit_message(head_branch, payload)
         try:
-            gh.repo.create_pull(
+            pr = gh.repo.create_pull(
                 base=base_branch,
                 head=head_branch,
                 title=_title,
@@ -37,3 +65,7 @@ class AutoCreatePullRequest(GithubRecipe):
         except GithubException as ex:
             if ex.status != 422:
                 raise ex
+            # the PR exists but the index missed it, or there's nothing to merge
+            gh.refresh_open_pull_request(branch)
+        else:
+            gh.pull_request_index.add(branch, pr.number)
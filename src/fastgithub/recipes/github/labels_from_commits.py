@@ -2,28 +2,88 @@ from collections.abc import Callable
 
 from github import Github
 
-from fastgithub.helpers.github import GithubHelper, Label
-from fastgithub.recipes._base import GithubRecipe
+from fastgithub.helpers.async_github import AsyncGithubClient, AsyncGithubHelper
+from fastgithub.helpers.github import GithubHelperRegistry, Label, LabelMatcher
+from fastgithub.helpers.installations import GithubAppInstallations
+from fastgithub.recipes._base import AsyncGithubRecipe, GithubRecipe
 from fastgithub.types import Payload
 
 from ._config import LABEL_CONFIG
 
 
 class LabelsFromCommits(GithubRecipe):
+    """Add labels to a PR from the `#tags` of its commit messages.
+
+    With `use_graphql`, the labels of the PR, the messages of its commits and the labels of
+    the repository are fetched with a single GraphQL query (per 100 commits), and the labels
+    are added with a single mutation, instead of paginated REST calls.
+    """
+
     def __init__(
-        self, github: Github, labels_config: dict[str, list[Label]] = LABEL_CONFIG
+        self,
+        github: Github | GithubAppInstallations,
+        labels_config: dict[str, list[Label]] = LABEL_CONFIG,
+        helpers: GithubHelperRegistry | None = None,
+        use_graphql: bool = False,
     ) -> None:
-        super().__init__(github)
+        super().__init__(github, helpers)
         self.labels_config = labels_config
+        self.label_matcher = LabelMatcher(labels_config)
+        self.use_graphql = use_graphql
 
     @property
     def events(self) -> dict[str, Callable]:
-        return {"pull_request": self._process_push}
+        return {
+            "pull_request.opened": self._process_push,
+            "pull_request.reopened": self._process_push,
+            "pull_request.synchronize": self._process_push,
+            "label": self._process_label,
+        }
+
+    def _process_label(self, payload: Payload):
+        self.helper(payload).update_label_cache(payload)
 
     def _process_push(self, payload: Payload):
-        gh = GithubHelper(self.github, payload["repository"]["full_name"])
-        gh.raise_for_rate_excess()
+        gh = self.helper(payload)
+        gh.raise_for_rate_excess(self.rate_threshold)
+
+        if self.use_graphql:
+            pr_labels = gh.get_pull_request_labels(payload["number"])
+            labels = gh.extract_labels_from_messages(
+                pr_labels.commit_messages, self.label_matcher, pr_labels.repo_labels
+            )
+            gh.add_labels_to_labelable(
+                pr_labels.id,
+                [label_id for name, label_id in labels.items() if name not in pr_labels.labels],
+            )
+            return
 
         pr = gh.repo.get_pull(payload["number"])
-        if labels := gh.extract_labels_from_pr(pr, self.labels_config):
+        if labels := gh.extract_labels_from_pr(pr, self.label_matcher):
             gh.add_labels_to_pr(pr, labels)
+
+
+class AsyncLabelsFromCommits(AsyncGithubRecipe):
+    """The asynchronous counterpart of `LabelsFromCommits`, awaited on the event loop."""
+
+    def __init__(
+        self, client: AsyncGithubClient, labels_config: dict[str, list[Label]] = LABEL_CONFIG
+    ) -> None:
+        super().__init__(client)
+        self.labels_config = labels_config
+        self.label_matcher = LabelMatcher(labels_config)
+
+    @property
+    def events(self) -> dict[str, Callable]:
+        return {
+            "pull_request.opened": self._process_push,
+            "pull_request.reopened": self._process_push,
+            "pull_request.synchronize": self._process_push,
+        }
+
+    async def _process_push(self, payload: Payload):
+        gh = AsyncGithubHelper(self.client, payload["repository"]["full_name"])
+        await gh.raise_for_rate_excess(self.rate_threshold)
+
+        if labels := await gh.extract_labels_from_pr(payload["number"], self.label_matcher):
+            await gh.add_labels_to_pr(payload["pull_request"], labels)
@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import json
+import os
+import socket
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from .delivery import Delivery
+from .payload import decode_payload
+from .redis import redis_client
+
+
+class BrokerError(Exception):
+    """A broker failed to publish, consume or acknowledge a delivery, e.g. it is unreachable."""
+
+
+def encode_delivery(delivery: Delivery) -> bytes:
+    """Encode a delivery as a message of a broker."""
+    return json.dumps({
+        "event": delivery.event,
+        "payload": delivery.payload,
+        "delivery_id": delivery.delivery_id,
+        "received_at": delivery.received_at,
+    }).encode()
+
+
+def decode_delivery(data: bytes) -> Delivery:
+    """Decode a delivery from a message of a broker."""
+    message = decode_payload(data)
+    return Delivery(
+        message["event"], message["payload"], message["delivery_id"], message["received_at"]
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class BrokerMessage:
+    """A delivery consumed from a broker, to acknowledge once processed."""
+
+    delivery: Delivery
+    receipt: bytes | None = None
+
+
+class Broker(ABC):
+    """A queue of deliveries between the HTTP front ends and the recipe workers.
+
+    The front ends publish the deliveries, the workers consume them, process them and
+    acknowledge them. A delivery consumed but not acknowledged (e.g. its worker crashed) is
+    delivered again when the worker restarts, when the broker supports it.
+    """
+
+    async def start(self) -> None:
+        """Prepare the broker before the deliveries are published or consumed."""
+
+    @abstractmethod
+    async def publish(self, delivery: Delivery) -> None:
+        """Publish a delivery.
+
+        Raises:
+            asyncio.QueueFull: If the broker doesn't accept more deliveries.
+            BrokerError: If the broker fails, e.g. it can't be reached.
+        """
+
+    @abstractmethod
+    async def consume(self, timeout: float) -> BrokerMessage | None:
+        """Wait at most `timeout` seconds for a delivery, None if there is none.
+
+        Raises:
+            BrokerError: If the broker fails, e.g. it can't be reached.
+        """
+
+    @abstractmethod
+    async def ack(self, message: BrokerMessage) -> None:
+        """Acknowledge a processed delivery, so that it is not delivered again.
+
+        Raises:
+            BrokerError: If the broker fails, e.g. it can't be reached.
+        """
+
+    @abstractmethod
+    async def size(self) -> int:
+        """Return the number of pending deliveries."""
+
+    async def close(self) -> None:
+        """Release the resources of the broker."""
+
+
+class MemoryBroker(Broker):
+    """An in-process broker, the deliveries are lost when the process stops.
+
+    Args:
+        maxsize (int): The maximum number of pending deliveries, 0 for no limit.
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        self.maxsize = maxsize
+        self._queue: asyncio.Queue[Delivery] = asyncio.Queue(maxsize)
+
+    async def publish(self, delivery: Delivery) -> None:
+        self._queue.put_nowait(delivery)
+
+    async def consume(self, timeout: float) -> BrokerMessage | None:
+        try:
+            return BrokerMessage(await asyncio.wait_for(self._queue.get(), timeout))
+        except TimeoutError:
+            return None
+
+    async def ack(self, message: BrokerMessage) -> None:
+        self._queue.task_done()
+
+    async def size(self) -> int:
+        return self._queue.qsize()
+
+
+@contextlib.contextmanager
+def _redis_errors() -> Iterator[None]:
+    """Raise the errors of Redis (e.g. `OOM` or `READONLY` replies) as `BrokerError`."""
+    from redis.exceptions import RedisError
+
+    try:
+        yield
+    except RedisError as ex:
+        raise BrokerError(f"Redis broker error: {ex}") from ex
+
+
+class RedisBroker(Broker):
+    """A broker on a Redis list, shared by the workers and the nodes of a deployment.
+
+    The front ends push the deliveries to the `<name>:deliveries` list, each consumer moves
+    them atomically to its own `<name>:processing:<consumer>` list while it processes them
+    (`BLMOVE`), and removes them once acknowledged. When a consumer starts, the deliveries
+    left in its processing list by a previous run are moved back to the pending ones, so the
+    name of a consumer must be stable across restarts to recover its deliveries.
+
+    Requires the `redis` package (`pip install fastgithub[redis]`).
+
+    Args:
+        url (str): The URL of the Redis server, e.g. `redis://localhost:6379/0`.
+        name (str): The prefix of the keys of the broker.
+        consumer (str | None): The name of this consumer, the host and the process ID by
+            default.
+        maxsize (int): The maximum number of pending deliveries, 0 for no limit.
+        **client_kwargs: The arguments of the `redis.asyncio.Redis` client, e.g. `ssl_ca_certs`.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        name: str = "fastgithub",
+        consumer: str | None = None,
+        maxsize: int = 0,
+        **client_kwargs: Any,
+    ) -> None:
+        self.url = url
+        self.name = name
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}"
+        self.maxsize = maxsize
+        # a connection blocked by `BLMOVE` can't send other commands, the client takes a
+        # connection of its pool for each concurrent command
+        self.client = redis_client(url, **client_kwargs)
+
+    @property
+    def pending_key(self) -> str:
+        return f"{self.name}:deliveries"
+
+    @property
+    def processing_key(self) -> str:
+        return f"{self.name}:processing:{self.consumer}"
+
+    async def start(self) -> None:
+        """Move the deliveries not acknowledged by a previous run back to the pending ones."""
+        with _redis_errors():
+            while await self.client.lmove(self.processing_key, self.pending_key, "LEFT", "RIGHT"):
+                pass
+
+    async def publish(self, delivery: Delivery) -> None:
+        data = encode_delivery(delivery)
+        with _redis_errors():
+            size = await self.client.lpush(self.pending_key, data)
+            if self.maxsize and size > self.maxsize:
+                await self.client.lrem(self.pending_key, 1, data)
+                raise asyncio.QueueFull
+
+    async def consume(self, timeout: float) -> BrokerMessage | None:
+        with _redis_errors():
+            data = await self.client.blmove(
+                self.pending_key,
+                self.processing_key,
+                timeout,  # type: ignore
+                "RIGHT",
+                "LEFT",
+            )
+        if data is None:
+            return None
+        return BrokerMessage(decode_delivery(data), data)
+
+    async def ack(self, message: BrokerMessage) -> None:
+        with _redis_errors():
+            await self.client.lrem(self.processing_key, 1, message.receipt)  # type: ignore
+
+    async def size(self) -> int:
+        with _redis_errors():
+            return await self.client.llen(self.pending_key)
+
+    async def close(self) -> None:
+        await self.client.aclose()
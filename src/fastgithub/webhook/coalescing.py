@@ -0,0 +1,136 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from dataclasses import dataclass
+
+from .delivery import Delivery
+
+CoalescingKey = Callable[[Delivery], Hashable | None]
+
+
+@dataclass(frozen=True, slots=True)
+class CoalescerStats:
+    """A snapshot of the state of an event coalescer."""
+
+    pending: int
+    submitted: int
+    dispatched: int
+    coalesced: int
+
+
+class EventCoalescer:
+    """Coalesce the bursts of deliveries about the same pull request or branch.
+
+    The first delivery of a key opens a window of `window` seconds, the deliveries with the
+    same key received during the window replace the pending one, and only the latest
+    delivery is dispatched when the window closes. By default, the key of a delivery is its
+    event, its action and its target (the repository and the ref or the pull request), and
+    only the events whose latest payload supersedes the previous ones are coalesced.
+
+    Args:
+        window (float): The number of seconds a delivery waits for newer deliveries.
+        events (Sequence[str]): The events to coalesce, either an event name (`push`) or an
+            event name qualified by an action (`pull_request.synchronize`).
+        key (CoalescingKey | None): A function returning the key of a delivery, or None if
+            the delivery must not be coalesced. Overrides `events`.
+    """
+
+    def __init__(
+        self,
+        window: float = 2.0,
+        events: Sequence[str] = ("push", "pull_request.synchronize"),
+        key: CoalescingKey | None = None,
+    ) -> None:
+        if window <= 0:
+            raise ValueError("`window` must be a positive number!")
+        self.window = window
+        self.events = frozenset(events)
+        self._key = key or self.default_key
+        self._dispatch: Callable[[Delivery], Awaitable] | None = None
+        self._discard: Callable[[Delivery], None] | None = None
+        self._pending: dict[Hashable, Delivery] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._submitted = 0
+        self._dispatched = 0
+
+    @property
+    def running(self) -> bool:
+        return self._dispatch is not None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def default_key(self, delivery: Delivery) -> Hashable | None:
+        """Return the event, action and target of a delivery of the coalesced events."""
+        if delivery.event not in self.events and (
+            delivery.action is None or f"{delivery.event}.{delivery.action}" not in self.events
+        ):
+            return None
+        target = delivery.target
+        if target is None:
+            return None
+        return (delivery.event, delivery.action, target)
+
+    def submit(self, delivery: Delivery) -> bool:
+        """Hold a delivery until its window closes.
+
+        Returns:
+            bool: False if the delivery can't be coalesced and must be dispatched right away.
+        """
+        if not self.running:
+            return False
+        key = self._key(delivery)
+        if key is None:
+            return False
+
+        self._submitted += 1
+        if key not in self._pending:
+            self._timers[key] = asyncio.get_running_loop().call_later(
+                self.window, self._flush_key, key
+            )
+        elif self._discard is not None:
+            self._discard(self._pending[key])
+        self._pending[key] = delivery
+        return True
+
+    async def start(
+        self,
+        dispatch: Callable[[Delivery], Awaitable],
+        discard: Callable[[Delivery], None] | None = None,
+    ) -> None:
+        """Start coalescing, the latest delivery of each window is given to `dispatch`.
+
+        The deliveries superseded by a newer one are given to `discard`, if any.
+        """
+        self._dispatch = dispatch
+        self._discard = discard
+
+    async def stop(self) -> None:
+        """Dispatch the pending deliveries right away and wait for their dispatch."""
+        if not self.running:
+            return
+        for key, timer in list(self._timers.items()):
+            timer.cancel()
+            self._flush_key(key)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._dispatch = None
+        self._discard = None
+
+    def _flush_key(self, key: Hashable) -> None:
+        self._timers.pop(key, None)
+        delivery = self._pending.pop(key, None)
+        if delivery is None or self._dispatch is None:
+            return
+        self._dispatched += 1
+        task = asyncio.ensure_future(self._dispatch(delivery))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> CoalescerStats:
+        """Return the metrics of the coalescer."""
+        return CoalescerStats(
+            pending=len(self._pending),
+            submitted=self._submitted,
+            dispatched=self._dispatched,
+            coalesced=self._submitted - self._dispatched - len(self._pending),
+        )
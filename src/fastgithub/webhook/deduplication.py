@@ -0,0 +1,174 @@
+import asyncio
+import collections
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from .redis import redis_client
+
+
+class DeliveryStore(ABC):
+    """A store of the recently received delivery IDs (the `X-GitHub-Delivery` header).
+
+    Args:
+        ttl (float): The number of seconds a delivery ID is remembered.
+    """
+
+    def __init__(self, ttl: float = 3600.0) -> None:
+        self.ttl = ttl
+        self._duplicates = 0
+
+    @property
+    def duplicates(self) -> int:
+        """Return the number of duplicated deliveries detected by the store."""
+        return self._duplicates
+
+    async def is_duplicate(self, delivery_id: str) -> bool:
+        """Record a delivery ID and return if it was already recorded."""
+        if await self._add(delivery_id):
+            return False
+        self._duplicates += 1
+        return True
+
+    @abstractmethod
+    async def _add(self, delivery_id: str) -> bool:
+        """Record a delivery ID, return False if it was already recorded."""
+
+    @abstractmethod
+    async def discard(self, delivery_id: str) -> None:
+        """Forget a delivery ID, so that a redelivery is processed again."""
+
+
+class MemoryDeliveryStore(DeliveryStore):
+    """An in-memory store of delivery IDs, bounded in size and in time.
+
+    Args:
+        maxsize (int): The maximum number of delivery IDs, the oldest are evicted first.
+        ttl (float): The number of seconds a delivery ID is remembered.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0) -> None:
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self._deliveries: collections.OrderedDict[str, float] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._deliveries)
+
+    async def _add(self, delivery_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._deliveries:
+                oldest_id, expires_at = next(iter(self._deliveries.items()))
+                if expires_at > now and len(self._deliveries) < self.maxsize:
+                    break
+                del self._deliveries[oldest_id]
+
+            if delivery_id in self._deliveries:
+                return False
+            self._deliveries[delivery_id] = now + self.ttl
+            return True
+
+    async def discard(self, delivery_id: str) -> None:
+        with self._lock:
+            self._deliveries.pop(delivery_id, None)
+
+
+class SQLiteDeliveryStore(DeliveryStore):
+    """A store of delivery IDs in a SQLite database, that can be shared by several workers.
+
+    The writes wait for the locks of the other workers, so they run in a thread, off the
+    event loop.
+
+    Args:
+        path (str | Path): The path of the database file.
+        ttl (float): The number of seconds a delivery ID is remembered.
+    """
+
+    def __init__(self, path: str | Path, ttl: float = 3600.0) -> None:
+        super().__init__(ttl)
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS deliveries "
+                "(delivery_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS deliveries_expires_at ON deliveries (expires_at)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM deliveries WHERE expires_at > ?", (time.time(),)
+            ).fetchone()
+        return count
+
+    async def _add(self, delivery_id: str) -> bool:
+        return await asyncio.to_thread(self._insert, delivery_id)
+
+    async def discard(self, delivery_id: str) -> None:
+        await asyncio.to_thread(self._delete, delivery_id)
+
+    def _insert(self, delivery_id: str) -> bool:
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM deliveries WHERE expires_at <= ?", (now,))
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO deliveries (delivery_id, expires_at) VALUES (?, ?)",
+                (delivery_id, now + self.ttl),
+            )
+        return cursor.rowcount == 1
+
+    def _delete(self, delivery_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM deliveries WHERE delivery_id = ?", (delivery_id,)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class RedisDeliveryStore(DeliveryStore):
+    """A store of delivery IDs in Redis, shared by the workers and the nodes of a deployment.
+
+    Requires the `redis` package (`pip install fastgithub[redis]`).
+
+    Args:
+        url (str): The URL of the Redis server, e.g. `redis://localhost:6379/0`.
+        ttl (float): The number of seconds a delivery ID is remembered.
+        prefix (str): The prefix of the keys of the delivery IDs.
+        **client_kwargs: The arguments of the `redis.asyncio.Redis` client.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        ttl: float = 3600.0,
+        prefix: str = "fastgithub:delivery:",
+        **client_kwargs: Any,
+    ) -> None:
+        super().__init__(ttl)
+        self.prefix = prefix
+        self.client = redis_client(url, **client_kwargs)
+
+    async def _add(self, delivery_id: str) -> bool:
+        reply = await self.client.set(
+            f"{self.prefix}{delivery_id}", 1, nx=True, px=int(self.ttl * 1000)
+        )
+        return reply is not None
+
+    async def discard(self, delivery_id: str) -> None:
+        await self.client.delete(f"{self.prefix}{delivery_id}")
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,44 @@
+import time
+from dataclasses import dataclass, field
+
+from fastgithub.types import Payload
+
+
+@dataclass(slots=True)
+class Delivery:
+    """A GitHub webhook delivery, as received by the handler."""
+
+    event: str
+    payload: Payload
+    delivery_id: str | None = None
+    received_at: float = field(default_factory=time.time)
+    # the ID of the delivery in the event journal, if journaled
+    journal_id: int | None = None
+
+    @property
+    def action(self) -> str | None:
+        action = self.payload.get("action")
+        return action if isinstance(action, str) else None
+
+    @property
+    def target(self) -> str | None:
+        """Return the repository ref (or pull request) the delivery is about, if any.
+
+        The pull requests of a branch of the repository share the target of the pushes to
+        this branch, e.g. `owner/repo:refs/heads/feature`, the pull requests from a fork are
+        identified by their number, e.g. `owner/repo#42`.
+        """
+        repo_fullname = (self.payload.get("repository") or {}).get("full_name")
+        if repo_fullname is None:
+            return None
+
+        if pr := self.payload.get("pull_request"):
+            head = pr.get("head") or {}
+            if (head.get("repo") or {}).get("full_name") == repo_fullname and head.get("ref"):
+                return f"{repo_fullname}:refs/heads/{head['ref']}"
+            return f"{repo_fullname}#{pr['number']}"
+        if ref := self.payload.get("ref"):
+            if not ref.startswith("refs/"):
+                ref = f"refs/heads/{ref}"
+            return f"{repo_fullname}:{ref}"
+        return None
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+from fastgithub.types import Payload
+
+# the workers of the synchronous recipes run within the slot of a delivery, still running
+_slot_workers: contextvars.ContextVar[list[asyncio.Future] | None] = contextvars.ContextVar(
+    "fastgithub_slot_workers", default=None
+)
+
+
+def is_coroutine_recipe(recipe: Callable) -> bool:
+    """Return if a recipe is a coroutine function (or an object with an async `__call__`)."""
+    return inspect.iscoroutinefunction(recipe) or inspect.iscoroutinefunction(
+        getattr(recipe, "__call__", None)
+    )
+
+
+class RecipeExecutor:
+    """Run recipes off the event loop with a bounded concurrency.
+
+    Coroutine recipes are awaited natively on the event loop, synchronous recipes are
+    submitted to a pool (a thread pool by default). The number of deliveries processed at
+    the same time by a handler can be limited with `max_concurrency`: a worker can't be
+    interrupted, so the slot of a delivery whose recipe timed out is only released once the
+    worker of the recipe finished.
+
+    The recipes run by a thread pool get the context of their delivery, the recipes run by a
+    `ProcessPoolExecutor` don't (contexts can't be pickled): their GitHub API calls aren't
+    accounted (see `fastgithub.accounting`), nor admitted by a `RateLimitScheduler`.
+
+    Args:
+        pool (Executor | None): The executor used to run synchronous recipes.
+        max_workers (int | None): The number of workers of the default thread pool.
+        max_concurrency (int | None): The maximum number of deliveries processed concurrently.
+    """
+
+    def __init__(
+        self,
+        pool: Executor | None = None,
+        max_workers: int | None = None,
+        max_concurrency: int | None = None,
+    ) -> None:
+        if pool is not None and max_workers is not None:
+            raise ValueError("`max_workers` can't be set when a `pool` is provided!")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("`max_concurrency` must be a positive integer!")
+
+        self._owns_pool = pool is None
+        self._pool = pool or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fastgithub"
+        )
+        self._max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    @property
+    def pool(self) -> Executor:
+        return self._pool
+
+    @property
+    def max_concurrency(self) -> int | None:
+        return self._max_concurrency
+
+    @property
+    def propagates_context(self) -> bool:
+        """Return if the synchronous recipes run in the context of their delivery."""
+        return not isinstance(self.pool, ProcessPoolExecutor)
+
+    @contextlib.asynccontextmanager
+    async def limit(self) -> AsyncIterator[None]:
+        """Wait for a free slot before processing a delivery."""
+        semaphore = self._semaphore
+        if semaphore is None:
+            yield
+            return
+        await semaphore.acquire()
+        workers: list[asyncio.Future] = []
+        token = _slot_workers.set(workers)
+        try:
+            yield
+        finally:
+            _slot_workers.reset(token)
+            self._release(semaphore, workers)
+
+    @staticmethod
+    def _release(semaphore: asyncio.Semaphore, workers: list[asyncio.Future]) -> None:
+        if running := [worker for worker in workers if not worker.done()]:
+            waiter = asyncio.gather(*running, return_exceptions=True)
+            waiter.add_done_callback(lambda _: semaphore.release())
+        else:
+            semaphore.release()
+
+    async def run(self, recipe: Callable, payload: Payload) -> Any:
+        """Run a recipe with the given payload."""
+        if is_coroutine_recipe(recipe):
+            return await recipe(payload)
+
+        if self.propagates_context:
+            func = functools.partial(contextvars.copy_context().run, recipe, payload)
+        else:
+            # contexts can't be pickled, the recipe has to be sent as is
+            func = functools.partial(recipe, payload)
+        worker = asyncio.get_running_loop().run_in_executor(self.pool, func)
+        try:
+            # a cancelled run (e.g. a timeout) can't stop its worker, which keeps running
+            return await asyncio.shield(worker)
+        except asyncio.CancelledError:
+            if not worker.done():
+                worker.add_done_callback(_retrieve)
+                if (workers := _slot_workers.get()) is not None:
+                    workers.append(worker)
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shutdown the pool if it was created by the executor."""
+        if self._owns_pool:
+            self._pool.shutdown(wait=wait)
+
+
+def _retrieve(worker: asyncio.Future) -> None:
+    # the result of an abandoned worker is dropped, without a "never retrieved" warning
+    if not worker.cancelled():
+        worker.exception()
@@ -1,26 +1,102 @@
+import asyncio
 import collections
-import fnmatch
-import itertools
-from collections.abc import Callable, Sequence
-from typing import overload
+import contextlib
+import dataclasses
+import inspect
+import time
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Any, overload
 
 from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from github import RateLimitExceededException
 
+from fastgithub.accounting import account_api_calls, current_delivery, recipe_api_budget
+from fastgithub.metrics import WebhookMetrics, recipe_name
 from fastgithub.recipes import Recipe
 from fastgithub.types import Payload
 
+from .broker import Broker, BrokerError, BrokerMessage
+from .coalescing import EventCoalescer
+from .deduplication import DeliveryStore
+from .delivery import Delivery
+from .executor import RecipeExecutor
+from .journal import SQLiteEventJournal
+from .payload import decode_payload
+from .queue import DeliveryQueue
+from .results import RecipeResult, RecipeStatus, recipe_timeout
+from .retry import RetryPolicy, recipe_retry_policy
+from .routing import EventRouter
+from .scheduler import RateLimitScheduler
 from .signature import SignatureVerification
 
+# the number of seconds a broker consumer waits for a delivery before checking for shutdown
+BROKER_POLL_INTERVAL = 1.0
+# the number of seconds the replay waits for a full queue or an unavailable broker
+REPLAY_RETRY_INTERVAL = 0.5
+
 
 class GithubWebhookHandler:
-    def __init__(self, signature_verification: SignatureVerification | None) -> None:
+    def __init__(
+        self,
+        signature_verification: SignatureVerification | None,
+        executor: RecipeExecutor | None = None,
+        queue: DeliveryQueue | None = None,
+        deduplication: DeliveryStore | None = None,
+        coalescer: EventCoalescer | None = None,
+        scheduler: RateLimitScheduler | None = None,
+        retry_policy: RetryPolicy | None = None,
+        recipe_timeout: float | None = None,
+        journal: SQLiteEventJournal | None = None,
+        broker: Broker | None = None,
+        broker_workers: int = 4,
+        metrics: WebhookMetrics | None = None,
+        api_budget: int | None = None,
+    ) -> None:
+        if queue is not None and broker is not None:
+            raise ValueError("`queue` and `broker` can't be both provided!")
+        if broker_workers < 0:
+            raise ValueError("`broker_workers` must be a non-negative integer!")
+        if (
+            executor is not None
+            and not executor.propagates_context
+            and (scheduler is not None or api_budget is not None)
+        ):
+            raise ValueError(
+                "`scheduler` and `api_budget` require an `executor` propagating the context "
+                "of the deliveries, not a `ProcessPoolExecutor`!"
+            )
         self._signature_verification = signature_verification
-        self._webhooks = collections.defaultdict(list)
+        self._executor = executor
+        self._queue = queue
+        self._deduplication = deduplication
+        self._coalescer = coalescer
+        self._scheduler = scheduler
+        self._retry_policy = retry_policy
+        self._recipe_timeout = recipe_timeout
+        self._journal = journal
+        self._replay: asyncio.Task | None = None
+        # the runs and deferred reruns of the recipes of each journaled delivery in progress
+        self._unfinished: collections.Counter[int] = collections.Counter()
+        self._broker = broker
+        self._broker_workers = broker_workers
+        self._consumers: list[asyncio.Task] = []
+        self._consuming = False
+        self._metrics = metrics
+        if metrics is not None:
+            metrics.track(queue=queue, scheduler=scheduler, journal=journal)
+        self._api_budget = api_budget
+        self._retries: set[asyncio.Task] = set()
+        self._router = EventRouter()
         self._recipes = []
 
+    @property
+    def router(self) -> EventRouter:
+        return self._router
+
     @property
     def webhooks(self) -> dict[str, list[Callable]]:
-        return self._webhooks
+        return self.router.routes
 
     @property
     def recipes(self) -> list[Callable]:
@@ -30,33 +106,262 @@ class GithubWebhookHandler:
     def signature_verification(self) -> SignatureVerification | None:
         return self._signature_verification
 
+    @property
+    def executor(self) -> RecipeExecutor | None:
+        return self._executor
+
+    @property
+    def queue(self) -> DeliveryQueue | None:
+        return self._queue
+
+    @property
+    def deduplication(self) -> DeliveryStore | None:
+        return self._deduplication
+
+    @property
+    def coalescer(self) -> EventCoalescer | None:
+        return self._coalescer
+
+    @property
+    def scheduler(self) -> RateLimitScheduler | None:
+        return self._scheduler
+
+    @property
+    def retry_policy(self) -> RetryPolicy | None:
+        return self._retry_policy
+
+    @property
+    def recipe_timeout(self) -> float | None:
+        return self._recipe_timeout
+
+    @property
+    def journal(self) -> SQLiteEventJournal | None:
+        return self._journal
+
+    @property
+    def broker(self) -> Broker | None:
+        return self._broker
+
+    @property
+    def broker_workers(self) -> int:
+        return self._broker_workers
+
+    @property
+    def metrics(self) -> WebhookMetrics | None:
+        return self._metrics
+
+    @property
+    def api_budget(self) -> int | None:
+        return self._api_budget
+
+    @property
+    def pending_retries(self) -> int:
+        return len(self._retries)
+
     @property
     def safe_mode(self) -> bool:
         return bool(self.signature_verification)
 
+    async def startup(self) -> None:
+        """Start the background tasks of the queue, the coalescer and the scheduler, if any.
+
+        The unfinished deliveries of the journal, if any, are replayed in the background.
+        """
+        if self.journal is not None:
+            await self.journal.start()
+        if self.scheduler is not None:
+            await self.scheduler.start(self._rerun_recipe)
+        if self.queue is not None:
+            await self.queue.start(self._process_delivery)
+        if self.broker is not None:
+            await self.broker.start()
+            self._consuming = True
+            self._consumers = [
+                asyncio.create_task(self._consume_broker(), name=f"fastgithub-broker-{i}")
+                for i in range(self.broker_workers)
+            ]
+        if self.coalescer is not None:
+            await self.coalescer.start(self._dispatch, self._complete)
+        if self.journal is not None:
+            self._replay = asyncio.create_task(
+                self._replay_journal(self.journal.unfinished()), name="fastgithub-replay"
+            )
+
+    async def shutdown(self) -> None:
+        """Flush the coalescer, drain the queue, stop the deferred recipes and the executor."""
+        if self._replay is not None:
+            self._replay.cancel()
+            await asyncio.gather(self._replay, return_exceptions=True)
+            self._replay = None
+        if self.coalescer is not None:
+            await self.coalescer.stop()
+        if self.queue is not None:
+            await self.queue.stop()
+        if self.broker is not None:
+            # the consumers finish their current delivery, or wait for a delivery no longer
+            # than `BROKER_POLL_INTERVAL` seconds
+            self._consuming = False
+            await asyncio.gather(*self._consumers, return_exceptions=True)
+            self._consumers = []
+            await self.broker.close()
+        if self.scheduler is not None:
+            await self.scheduler.stop()
+        # the recipes failing while the queue and the broker drain schedule retries too
+        while self._retries:
+            for task in self._retries:
+                task.cancel()
+            await asyncio.gather(*self._retries, return_exceptions=True)
+        if self.journal is not None:
+            await self.journal.stop()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app: Any) -> AsyncIterator[None]:
+        """A FastAPI lifespan that starts and shutdowns the handler."""
+        await self.startup()
+        try:
+            yield
+        finally:
+            await self.shutdown()
+
     async def handle(self, request: Request):
         """Handle incoming webhook events from GitHub."""
+        body = await request.body()
         if self.safe_mode:
-            await self.signature_verification.verify(request)  # type: ignore
+            with self._timer("signature_seconds"):
+                await self.signature_verification.verify(request, body)  # type: ignore
 
         event = request.headers.get("X-GitHub-Event")
-        data = await request.json()
+        try:
+            with self._timer("decode_seconds"):
+                data = decode_payload(body)
+        except ValueError as ex:
+            raise HTTPException(status_code=400, detail=str(ex)) from None
+
+        if event is None:
+            raise HTTPException(status_code=422, detail="No event provided!")
+
+        delivery = Delivery(event, data, request.headers.get("X-GitHub-Delivery"))
+        if self.metrics is not None:
+            self.metrics.record_delivery(event, delivery.action)
+        if await self._is_duplicate(delivery):
+            return {"status": "duplicate"}
+
+        if self.journal is not None:
+            try:
+                await self.journal.append(delivery, body)
+            except Exception:
+                # the delivery is not acknowledged, so its redelivery must not be a duplicate
+                await self._forget(delivery)
+                raise
 
-        if event is not None:
-            status = await self.process_event(event, data)
-            if status:
+        if self.coalescer is not None and self.coalescer.submit(delivery):
+            return JSONResponse({"status": "accepted"}, status_code=202)
+
+        if await self._dispatch(delivery):
+            if self._processes_inline:
                 return {"status": "success"}
+            return JSONResponse({"status": "accepted"}, status_code=202)
+        if self.queue is not None:
+            raise HTTPException(status_code=503, detail="Delivery queue is full!")
+        if self.broker is not None:
+            raise HTTPException(status_code=503, detail="Delivery broker is unavailable!")
+        raise HTTPException(status_code=400, detail=f"Error during {event} event!")
+
+    @property
+    def _processes_inline(self) -> bool:
+        return self.queue is None and self.broker is None
+
+    async def _dispatch(self, delivery: Delivery) -> bool:
+        """Enqueue or publish a delivery, or process it right away without a queue nor broker.
+
+        A delivery that the queue or the broker doesn't accept is forgotten by the
+        de-duplication, so that its redelivery is processed, and stays unfinished in the
+        journal, so that it is replayed on the next startup.
+
+        Returns:
+            bool: False if the delivery was not accepted, or failed when processed right away.
+        """
+        if self._processes_inline:
+            return await self._process_delivery(delivery)
+        try:
+            if self.queue is not None:
+                self.queue.put(delivery)
             else:
-                raise HTTPException(status_code=400, detail="Error during {event} event!")
-        raise HTTPException(status_code=422, detail="No event provided!")
+                await self.broker.publish(delivery)  # type: ignore
+        except (asyncio.QueueFull, BrokerError, ConnectionError):
+            await self._forget(delivery)
+            return False
+        if self.broker is not None:
+            # the broker is responsible for the delivery from now on
+            self._complete(delivery)
+        return True
+
+    async def _consume_broker(self) -> None:
+        while self._consuming:
+            try:
+                message = await self.broker.consume(BROKER_POLL_INTERVAL)  # type: ignore
+            except Exception:
+                await asyncio.sleep(BROKER_POLL_INTERVAL)
+                continue
+            if message is not None:
+                await self._process_message(message)
+
+    async def _process_message(self, message: BrokerMessage) -> None:
+        await self._process_delivery(message.delivery)
+        # a delivery not acknowledged is delivered again, at least once in total
+        with contextlib.suppress(Exception):
+            await self.broker.ack(message)  # type: ignore
+
+    async def _replay_journal(self, deliveries: Sequence[Delivery]) -> None:
+        """Process again the deliveries journaled but not completed before a restart."""
+        for delivery in deliveries:
+            while not await self._dispatch(delivery) and not self._processes_inline:
+                if self.queue is not None and not self.queue.running:
+                    return
+                await asyncio.sleep(REPLAY_RETRY_INTERVAL)
+
+    def _timer(self, histogram: str) -> contextlib.AbstractContextManager:
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return getattr(self.metrics, histogram).time()
+
+    async def _is_duplicate(self, delivery: Delivery) -> bool:
+        if self.deduplication is None or delivery.delivery_id is None:
+            return False
+        return await self.deduplication.is_duplicate(delivery.delivery_id)
 
-    def _infer_event_recipes(self, event: str) -> list[Callable]:
-        webhook_recipes = [
-            webhook_recipes
-            for webhook_event, webhook_recipes in self.webhooks.items()
-            if fnmatch.fnmatch(event, webhook_event)
-        ]
-        return list(itertools.chain.from_iterable(webhook_recipes))
+    def _complete(self, delivery: Delivery) -> None:
+        """Record that a delivery was processed (or given up), so that it is not replayed."""
+        if self.journal is not None:
+            self.journal.complete(delivery)
+
+    def _hold(self, delivery: Delivery | None) -> None:
+        """Keep a journaled delivery unfinished while its recipes run or are deferred."""
+        if self.journal is not None and delivery is not None and delivery.journal_id is not None:
+            self._unfinished[delivery.journal_id] += 1
+
+    def _release(self, delivery: Delivery | None) -> None:
+        """Complete a journaled delivery once its recipes and their deferred reruns are done.
+
+        The deferred reruns cancelled or dropped on shutdown never release their delivery, so
+        that it is replayed on the next startup.
+        """
+        if self.journal is None or delivery is None or delivery.journal_id is None:
+            return
+        self._unfinished[delivery.journal_id] -= 1
+        if self._unfinished[delivery.journal_id] <= 0:
+            del self._unfinished[delivery.journal_id]
+            self._complete(delivery)
+
+    async def _forget(self, delivery: Delivery) -> None:
+        """Forget a delivery that was not processed, so that a redelivery is processed."""
+        if self.deduplication is not None and delivery.delivery_id is not None:
+            await self.deduplication.discard(delivery.delivery_id)
+
+    def _infer_event_recipes(self, event: str, action: str | None = None) -> Sequence[Callable]:
+        return self.router.match(event, action)
 
     async def process_event(self, event: str, payload: Payload) -> bool:
         """Process the GitHub event. Override this method to handle specific events.
@@ -68,15 +373,146 @@ class GithubWebhookHandler:
         Returns:
             bool: True if the process handle well, otherwise False.
         """
+        if self.executor is None:
+            return await self._process_recipes(event, payload)
+        async with self.executor.limit():
+            return await self._process_recipes(event, payload)
+
+    async def _process_delivery(self, delivery: Delivery) -> bool:
+        self._hold(delivery)
+        token = current_delivery.set(delivery)
+        try:
+            status = await self.process_event(delivery.event, delivery.payload)
+        finally:
+            current_delivery.reset(token)
+        self._release(delivery)
+        if not status:
+            await self._forget(delivery)
+        return status
+
+    async def _process_recipes(self, event: str, payload: Payload) -> bool:
         try:
-            webhook_recipes = self._infer_event_recipes(event)
-            for recipe in webhook_recipes:
-                recipe(payload)
+            results = await self.run_recipes(event, payload)
         except:  # noqa: E722
             return False
         else:
+            return all(result.ok for result in results)
+
+    async def run_recipes(self, event: str, payload: Payload) -> list[RecipeResult]:
+        """Run the recipes matching an event concurrently, each one isolated from the others.
+
+        A recipe failing or timing out doesn't stop the other recipes of the delivery, so the
+        latency of a delivery is the one of its slowest recipe. Synchronous recipes only run
+        concurrently when the handler has an executor.
+
+        Args:
+            event (str): The type of GitHub event (e.g., 'push', 'pull_request').
+            payload (Payload): The payload of the event.
+
+        Returns:
+            list[RecipeResult]: The result of each recipe, in the order of the recipes.
+        """
+        action = payload.get("action")
+        with self._timer("routing_seconds"):
+            webhook_recipes = self._infer_event_recipes(
+                event, action if isinstance(action, str) else None
+            )
+        async with asyncio.TaskGroup() as group:
+            tasks = [
+                group.create_task(self._run_isolated(recipe, payload))
+                for recipe in webhook_recipes
+            ]
+        return [task.result() for task in tasks]
+
+    async def _run_isolated(
+        self, recipe: Callable, payload: Payload, attempt: int = 1
+    ) -> RecipeResult:
+        """Run a recipe within its timeout, deferring it if it fails with a deferrable error."""
+        name = recipe_name(recipe)
+        budget = recipe_api_budget(recipe, self.api_budget)
+        with account_api_calls(name, budget, self.metrics) as account:
+            result = await self._run_timed(recipe, payload, attempt)
+        result = dataclasses.replace(result, api_calls=account.calls)
+        if account.calls:
+            account.log()
+        if self.metrics is not None:
+            error = None if result.error is None else type(result.error).__name__
+            self.metrics.record_recipe(name, result.status, result.duration, error)
+        return result
+
+    async def _run_timed(self, recipe: Callable, payload: Payload, attempt: int) -> RecipeResult:
+        start = time.perf_counter()
+        scope = asyncio.timeout(recipe_timeout(recipe, self.recipe_timeout))
+        try:
+            async with scope:
+                await self._run_recipe(recipe, payload)
+        except Exception as ex:
+            if scope.expired():
+                # a synchronous recipe keeps running in its worker, it must not be rerun
+                status = RecipeStatus.TIMEOUT
+            elif self._defer_recipe(recipe, payload, ex, attempt):
+                status = RecipeStatus.DEFERRED
+            else:
+                status = RecipeStatus.FAILURE
+            return RecipeResult(recipe, status, time.perf_counter() - start, ex)
+        return RecipeResult(recipe, RecipeStatus.SUCCESS, time.perf_counter() - start)
+
+    async def _run_recipe(self, recipe: Callable, payload: Payload) -> None:
+        """Run a recipe inline, or through the executor when one is provided."""
+        if self.executor is not None:
+            await self.executor.run(recipe, payload)
+            return
+
+        result = recipe(payload)
+        if inspect.isawaitable(result):
+            await result
+
+    def _defer_recipe(
+        self, recipe: Callable, payload: Payload, exception: Exception, attempt: int = 1
+    ) -> bool:
+        """Park a rate limited recipe, or retry a recipe failing with a transient error.
+
+        Returns:
+            bool: False if the recipe is neither parked nor retried, so that it fails.
+        """
+        if (
+            isinstance(exception, RateLimitExceededException)
+            and self.scheduler is not None
+            and self.scheduler.park(recipe, payload, exception)
+        ):
+            self._hold(current_delivery.get())
             return True
 
+        policy = recipe_retry_policy(recipe, self.retry_policy)
+        if policy is None or not policy.should_retry(exception, attempt):
+            return False
+        task = asyncio.create_task(
+            self._retry_recipe(recipe, payload, attempt + 1, policy.delay(attempt, exception))
+        )
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+        self._hold(current_delivery.get())
+        return True
+
+    async def _retry_recipe(
+        self, recipe: Callable, payload: Payload, attempt: int, delay: float
+    ) -> None:
+        await asyncio.sleep(delay)
+        await self._rerun_recipe(recipe, payload, attempt)
+
+    async def _rerun_recipe(
+        self, recipe: Callable, payload: Payload, attempt: int = 1
+    ) -> RecipeResult:
+        """Run a deferred recipe in the background, deferring it again if it fails again."""
+        if self.executor is None:
+            result = await self._run_isolated(recipe, payload, attempt)
+        else:
+            async with self.executor.limit():
+                result = await self._run_isolated(recipe, payload, attempt)
+        # a recipe deferred again holds its delivery again
+        self._release(current_delivery.get())
+        return result
+
     @overload
     def listen(self, event: str) -> Callable: ...
 
@@ -96,7 +532,7 @@ class GithubWebhookHandler:
                 raise ValueError(
                     f"{self.listen.__name__} works only with functions, use {self.plan.__name__} with {Recipe.__name__}!"  # noqa: E501
                 )
-            self.webhooks[event].extend(recipes)
+            self.router.add(event, recipes)
             self.recipes.extend(recipes)
 
     def plan(self, recipes: Sequence[Recipe]) -> None:
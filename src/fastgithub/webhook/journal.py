@@ -0,0 +1,228 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from .delivery import Delivery
+from .payload import decode_payload
+
+
+@dataclass(frozen=True, slots=True)
+class JournalStats:
+    """A snapshot of the state of an event journal."""
+
+    appended: int
+    completed: int
+    commits: int
+    pending: int
+
+
+class SQLiteEventJournal:
+    """An append-only journal of the deliveries in a SQLite database, replayed after a crash.
+
+    The handler journals each delivery before acknowledging it and records its completion
+    once its recipes ran, so that the deliveries in flight when the process stopped are
+    replayed on the next startup. The writes of the concurrent deliveries are grouped in a
+    single transaction (group commit): a delivery waits at most `flush_interval` seconds for
+    the next commit, and the cost of a commit (an `fsync` with `synchronous="FULL"`) is
+    shared by up to `batch_size` deliveries.
+
+    Args:
+        path (str | Path): The path of the database file.
+        batch_size (int): The maximum number of writes per transaction.
+        flush_interval (float): The number of seconds the writes are grouped before a commit.
+        synchronous (str): The `synchronous` mode of SQLite, `FULL` to survive a power loss,
+            `NORMAL` to only survive a crash of the process.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        batch_size: int = 1000,
+        flush_interval: float = 0.002,
+        synchronous: str = "FULL",
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("`batch_size` must be a positive integer!")
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Unknown `synchronous` mode: {synchronous}!")
+
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._appends: list[tuple[Delivery, bytes, asyncio.Future]] = []
+        self._completions: list[int] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._appended = 0
+        self._completed = 0
+        self._commits = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(f"PRAGMA synchronous={synchronous.upper()}")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "event TEXT NOT NULL, payload BLOB NOT NULL, delivery_id TEXT, "
+                "received_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS completions (event_id INTEGER PRIMARY KEY)"
+            )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        """Return the number of unfinished deliveries."""
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM events WHERE id NOT IN (SELECT event_id FROM completions)"
+            ).fetchone()
+        return count
+
+    async def append(self, delivery: Delivery, body: bytes | None = None) -> int:
+        """Journal a delivery and wait until it is committed.
+
+        Args:
+            delivery (Delivery): The delivery, its `journal_id` is set once committed.
+            body (bytes | None): The raw body of the delivery, to avoid encoding its payload.
+
+        Returns:
+            int: The ID of the delivery in the journal.
+        """
+        if not self.running or self._stopping:
+            raise RuntimeError("The journal is not started!")
+        if body is None:
+            body = json.dumps(delivery.payload).encode()
+        future = asyncio.get_running_loop().create_future()
+        self._appends.append((delivery, body, future))
+        self._wakeup.set()
+        delivery.journal_id = await future
+        return delivery.journal_id
+
+    def complete(self, delivery: Delivery) -> None:
+        """Record the completion of a journaled delivery, with the next commit."""
+        if delivery.journal_id is None:
+            return
+        self._completions.append(delivery.journal_id)
+        if self.running:
+            self._wakeup.set()
+        else:
+            self._write([], self._take_completions())
+
+    def unfinished(self) -> list[Delivery]:
+        """Return the journaled deliveries that were not completed, oldest first."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, event, payload, delivery_id, received_at FROM events "
+                "WHERE id NOT IN (SELECT event_id FROM completions) ORDER BY id"
+            ).fetchall()
+        return [
+            Delivery(event, decode_payload(payload), delivery_id, received_at, journal_id)
+            for journal_id, event, payload, delivery_id, received_at in rows
+        ]
+
+    def compact(self) -> int:
+        """Delete the completed deliveries and truncate the write-ahead log.
+
+        Returns:
+            int: The number of deleted deliveries.
+        """
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.execute(
+                    "DELETE FROM events WHERE id IN (SELECT event_id FROM completions)"
+                )
+                self._connection.execute("DELETE FROM completions")
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return cursor.rowcount
+
+    async def start(self) -> None:
+        """Start committing the journaled deliveries in the background."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._commit_forever(), name="fastgithub-journal")
+
+    async def stop(self) -> None:
+        """Commit the pending writes and stop."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+            self._stopping = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    async def _commit_forever(self) -> None:
+        while not self._stopping:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if (
+                not self._stopping
+                and self.flush_interval > 0
+                and len(self._appends) < self.batch_size
+            ):
+                await asyncio.sleep(self.flush_interval)
+            while self._appends or self._completions:
+                await self._commit()
+
+    async def _commit(self) -> None:
+        appends = self._appends[: self.batch_size]
+        del self._appends[: self.batch_size]
+        completions = self._take_completions()
+        try:
+            journal_ids = await asyncio.to_thread(
+                self._write, [(delivery, body) for delivery, body, _ in appends], completions
+            )
+        except Exception as ex:
+            for *_, future in appends:
+                if not future.done():
+                    future.set_exception(ex)
+            return
+        for (*_, future), journal_id in zip(appends, journal_ids, strict=True):
+            if not future.done():
+                future.set_result(journal_id)
+
+    def _take_completions(self) -> list[int]:
+        completions, self._completions = self._completions, []
+        return completions
+
+    def _write(self, appends: list[tuple[Delivery, bytes]], completions: list[int]) -> list[int]:
+        journal_ids = []
+        with self._lock, self._connection:
+            for delivery, body in appends:
+                cursor = self._connection.execute(
+                    "INSERT INTO events (event, payload, delivery_id, received_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (delivery.event, body, delivery.delivery_id, delivery.received_at),
+                )
+                journal_ids.append(cursor.lastrowid)
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO completions (event_id) VALUES (?)",
+                [(journal_id,) for journal_id in completions],
+            )
+        self._appended += len(appends)
+        self._completed += len(completions)
+        self._commits += 1
+        return journal_ids
+
+    def stats(self) -> JournalStats:
+        """Return the metrics of the journal."""
+        return JournalStats(
+            appended=self._appended,
+            completed=self._completed,
+            commits=self._commits,
+            pending=len(self._appends) + len(self._completions),
+        )
@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import time
+import zlib
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, fields
+
+from .delivery import Delivery
+from .queue import DeliveryQueue, QueueStats
+
+LaneKey = Callable[[Delivery], str | None]
+
+
+def default_lane_key(delivery: Delivery) -> str | None:
+    """Return the target of a delivery (the ref or the pull request), or its repository."""
+    return delivery.target or (delivery.payload.get("repository") or {}).get("full_name")
+
+
+@dataclass(frozen=True, slots=True)
+class LaneStats(QueueStats):
+    """A snapshot of the state of a lane scheduler, with the depth of each lane."""
+
+    lane_depths: tuple[int, ...]
+
+
+class LaneScheduler(DeliveryQueue):
+    """A delivery queue processing the deliveries with the same key in order.
+
+    Each delivery is hashed to one of `lanes` lanes by its key, by default its target: the
+    pushes to a branch and the pull requests of this branch share a lane, as well as the
+    events of a pull request from a fork. The deliveries of a lane are processed one after
+    the other, in the order they were received, while the lanes are processed concurrently,
+    so that the recipes of a pull request never race each other. The deliveries without a
+    key are spread over the lanes.
+
+    The order is kept within a process: the deliveries retried or parked by the handler, or
+    consumed by other processes, are not ordered.
+
+    Args:
+        lanes (int): The number of lanes, the maximum number of deliveries processed
+            concurrently.
+        maxsize (int): The maximum number of pending deliveries in all the lanes, `put` fails
+            beyond it.
+        drain_timeout (float | None): The maximum time to wait for pending deliveries on stop.
+        key (LaneKey | None): A function returning the key of a delivery, or None if the
+            delivery can be processed in any lane.
+    """
+
+    def __init__(
+        self,
+        lanes: int = 16,
+        maxsize: int = 1000,
+        drain_timeout: float | None = 30.0,
+        key: LaneKey | None = None,
+    ) -> None:
+        super().__init__(maxsize=maxsize, workers=lanes, drain_timeout=drain_timeout)
+        self.key = key or default_lane_key
+        self._lanes: list[asyncio.Queue[tuple[float, Delivery]]] = [
+            asyncio.Queue() for _ in range(lanes)
+        ]
+        self._round_robin = itertools.count()
+
+    @property
+    def lanes(self) -> int:
+        return self.workers
+
+    def __len__(self) -> int:
+        return sum(lane.qsize() for lane in self._lanes)
+
+    def lane(self, delivery: Delivery) -> int:
+        """Return the index of the lane of a delivery."""
+        key = self.key(delivery)
+        if key is None:
+            return next(self._round_robin) % self.lanes
+        return zlib.crc32(key.encode()) % self.lanes
+
+    def put(self, delivery: Delivery) -> None:
+        """Enqueue a delivery in its lane without waiting.
+
+        Raises:
+            asyncio.QueueFull: If the queue is full or doesn't accept deliveries anymore.
+        """
+        if self._closed or len(self) >= self.maxsize:
+            self._rejected += 1
+            raise asyncio.QueueFull
+        self._lanes[self.lane(delivery)].put_nowait((time.monotonic(), delivery))
+        self._enqueued += 1
+
+    async def start(self, process: Callable[[Delivery], Awaitable[bool]]) -> None:
+        """Start a consumer task per lane, each delivery is given to `process`."""
+        if self.running:
+            return
+        self._closed = False
+        self._tasks = [
+            asyncio.create_task(self._consume(lane, process), name=f"fastgithub-lane-{i}")
+            for i, lane in enumerate(self._lanes)
+        ]
+
+    async def _join(self) -> None:
+        await asyncio.gather(*(lane.join() for lane in self._lanes))
+
+    def stats(self) -> LaneStats:
+        """Return the metrics of the queue and the depth of each lane."""
+        stats = super().stats()
+        return LaneStats(
+            **{field.name: getattr(stats, field.name) for field in fields(stats)},
+            lane_depths=tuple(lane.qsize() for lane in self._lanes),
+        )
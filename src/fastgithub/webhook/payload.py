@@ -0,0 +1,44 @@
+"""Decoding of webhook payloads, using the fastest JSON backend available."""
+
+import json
+from collections.abc import Callable
+
+from fastgithub.types import Payload
+
+_loads: Callable[[bytes], Payload]
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ModuleNotFoundError:
+    try:
+        import msgspec
+
+        _loads = msgspec.json.Decoder().decode
+        JSON_BACKEND = "msgspec"
+    except ModuleNotFoundError:
+        _loads = json.loads
+        JSON_BACKEND = "json"
+
+
+def decode_payload(body: bytes) -> Payload:
+    """Decode the raw body of a webhook delivery.
+
+    Args:
+        body (bytes): The raw request payload.
+
+    Returns:
+        Payload: The decoded payload.
+
+    Raises:
+        ValueError: If the body is not a JSON object.
+    """
+    try:
+        payload = _loads(body)
+    except Exception as ex:
+        raise ValueError(f"Invalid JSON payload: {ex}") from ex
+    if not isinstance(payload, dict):
+        raise ValueError("The payload must be a JSON object!")
+    return payload
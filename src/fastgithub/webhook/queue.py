@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from .delivery import Delivery
+
+
+@dataclass(frozen=True, slots=True)
+class QueueStats:
+    """A snapshot of the state of a delivery queue."""
+
+    depth: int
+    maxsize: int
+    workers: int
+    enqueued: int
+    processed: int
+    failed: int
+    rejected: int
+    lag: float
+    max_lag: float
+
+
+class DeliveryQueue:
+    """A bounded queue of deliveries drained by a pool of consumer tasks.
+
+    Args:
+        maxsize (int): The maximum number of pending deliveries, `put` fails beyond it.
+        workers (int): The number of consumer tasks.
+        drain_timeout (float | None): The maximum time to wait for pending deliveries on stop.
+    """
+
+    def __init__(
+        self, maxsize: int = 1000, workers: int = 4, drain_timeout: float | None = 30.0
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("`maxsize` must be a positive integer!")
+        if workers < 1:
+            raise ValueError("`workers` must be a positive integer!")
+
+        self._maxsize = maxsize
+        self._workers = workers
+        self.drain_timeout = drain_timeout
+        self._queue: asyncio.Queue[tuple[float, Delivery]] = asyncio.Queue(maxsize)
+        self._tasks: list[asyncio.Task] = []
+        self._closed = True
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._lag = 0.0
+        self._max_lag = 0.0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, delivery: Delivery) -> None:
+        """Enqueue a delivery without waiting.
+
+        Raises:
+            asyncio.QueueFull: If the queue is full or doesn't accept deliveries anymore.
+        """
+        if self._closed:
+            self._rejected += 1
+            raise asyncio.QueueFull
+        try:
+            self._queue.put_nowait((time.monotonic(), delivery))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise
+        self._enqueued += 1
+
+    async def start(self, process: Callable[[Delivery], Awaitable[bool]]) -> None:
+        """Start the consumer tasks, each delivery is given to `process`."""
+        if self.running:
+            return
+        self._closed = False
+        self._tasks = [
+            asyncio.create_task(
+                self._consume(self._queue, process), name=f"fastgithub-consumer-{i}"
+            )
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop accepting deliveries, drain the pending ones and stop the consumer tasks."""
+        self._closed = True
+        if not self.running:
+            return
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._join(), timeout=self.drain_timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _join(self) -> None:
+        await self._queue.join()
+
+    async def _consume(
+        self,
+        queue: asyncio.Queue[tuple[float, Delivery]],
+        process: Callable[[Delivery], Awaitable[bool]],
+    ) -> None:
+        while True:
+            enqueued_at, delivery = await queue.get()
+            self._lag = time.monotonic() - enqueued_at
+            self._max_lag = max(self._max_lag, self._lag)
+            try:
+                status = await process(delivery)
+            except Exception:
+                status = False
+            finally:
+                queue.task_done()
+            self._processed += 1
+            if not status:
+                self._failed += 1
+
+    def stats(self) -> QueueStats:
+        """Return the metrics of the queue."""
+        return QueueStats(
+            depth=len(self),
+            maxsize=self.maxsize,
+            workers=self.workers,
+            enqueued=self._enqueued,
+            processed=self._processed,
+            failed=self._failed,
+            rejected=self._rejected,
+            lag=self._lag,
+            max_lag=self._max_lag,
+        )
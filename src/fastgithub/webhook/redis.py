@@ -0,0 +1,26 @@
+"""The Redis clients of the shared brokers and stores, from the optional `redis` package."""
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+def redis_client(url: str, **kwargs: Any) -> "Redis":
+    """Create an asynchronous client of a Redis server, with a pool of connections.
+
+    Args:
+        url (str): The URL of the server, e.g. `redis://localhost:6379/0`, or `rediss://` for
+            TLS, with the credentials of the server if any.
+        **kwargs: The other arguments of `redis.asyncio.Redis.from_url`.
+
+    Raises:
+        ImportError: If the `redis` package is not installed.
+    """
+    try:
+        from redis.asyncio import Redis
+    except ModuleNotFoundError as ex:
+        raise ImportError(
+            "The Redis backends require the `redis` package: pip install fastgithub[redis]"
+        ) from ex
+    return Redis.from_url(url, **kwargs)
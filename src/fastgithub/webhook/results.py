@@ -0,0 +1,36 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import StrEnum
+
+from fastgithub.helpers.recipe import recipe_attribute
+
+
+class RecipeStatus(StrEnum):
+    SUCCESS = "success"
+    FAILURE = "failure"
+    TIMEOUT = "timeout"
+    # the recipe failed but was parked by the scheduler or retried in the background
+    DEFERRED = "deferred"
+
+
+@dataclass(frozen=True, slots=True)
+class RecipeResult:
+    """The outcome of a recipe run for a delivery."""
+
+    recipe: Callable
+    status: RecipeStatus
+    duration: float
+    error: BaseException | None = None
+    # the number of GitHub API calls sent by the recipe
+    api_calls: int = 0
+
+    @property
+    def ok(self) -> bool:
+        """Return if the recipe didn't fail the delivery."""
+        return self.status in (RecipeStatus.SUCCESS, RecipeStatus.DEFERRED)
+
+
+def recipe_timeout(recipe: Callable, default: float | None) -> float | None:
+    """Return the timeout of a recipe, from its `timeout` attribute or the default."""
+    timeout = recipe_attribute(recipe, "timeout")
+    return default if timeout is None else timeout
@@ -0,0 +1,108 @@
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import httpx
+import requests
+from github import GithubException, RateLimitExceededException
+
+from fastgithub.helpers.github import lower_headers, rate_limit_reset_time, retry_after_delay
+from fastgithub.helpers.recipe import recipe_attribute
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    requests.ConnectionError,
+    requests.Timeout,
+    httpx.TransportError,
+)
+
+
+def _header(exception: GithubException, name: str) -> str | None:
+    return lower_headers(exception.headers).get(name)
+
+
+def is_secondary_rate_limit(exception: GithubException) -> bool:
+    """Return if an error is a secondary rate limit (too many concurrent or write requests)."""
+    if exception.status not in (403, 429):
+        return False
+    message = exception.data.get("message", "") if isinstance(exception.data, dict) else ""
+    return _header(exception, "retry-after") is not None or "secondary rate limit" in message
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """A policy retrying the recipes failing with transient errors, with exponential backoff.
+
+    Connection errors, timeouts, server errors (5xx), `429` responses and rate limits are
+    retryable, the other errors (e.g. a `422` validation error) are permanent. The n-th retry
+    waits `base_delay * multiplier ** (n - 1)` seconds, at most `max_delay`, minus a random
+    `jitter` fraction so that the retries of concurrent failures are spread, and at least the
+    `Retry-After` (or the rate limit reset) given by GitHub.
+
+    Args:
+        max_attempts (int): The maximum number of attempts, including the first one.
+        base_delay (float): The number of seconds before the first retry.
+        multiplier (float): The factor of the delay between two retries.
+        max_delay (float): The maximum number of seconds between two attempts.
+        jitter (float): The maximum fraction of the delay randomly removed, between 0 and 1.
+    """
+
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    multiplier: float = 2.0
+    max_delay: float = 300.0
+    jitter: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError("`max_attempts` must be a positive integer!")
+        if not 0 <= self.jitter <= 1:
+            raise ValueError("`jitter` must be between 0 and 1!")
+
+    def is_retryable(self, exception: BaseException) -> bool:
+        """Return if an error is transient, so that the recipe may succeed if retried."""
+        if isinstance(exception, TRANSIENT_ERRORS):
+            return True
+        if isinstance(exception, GithubException):
+            return (
+                isinstance(exception, RateLimitExceededException)
+                or exception.status in RETRYABLE_STATUSES
+                or is_secondary_rate_limit(exception)
+            )
+        return False
+
+    def should_retry(self, exception: BaseException, attempt: int) -> bool:
+        """Return if a recipe failing at its `attempt`-th attempt must be retried."""
+        return attempt < self.max_attempts and self.is_retryable(exception)
+
+    def delay(self, attempt: int, exception: BaseException | None = None) -> float:
+        """Return the number of seconds to wait after the `attempt`-th attempt."""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        delay *= 1 - self.jitter * random.random()  # noqa: S311
+        return max(delay, self.retry_after(exception))
+
+    @staticmethod
+    def retry_after(exception: BaseException | None) -> float:
+        """Return the minimum number of seconds to wait given by GitHub, if any."""
+        if not isinstance(exception, GithubException):
+            return 0.0
+        headers = lower_headers(exception.headers)
+        if (delay := retry_after_delay(headers)) is not None:
+            return delay
+        # a rate limit raised below the threshold of a helper (e.g. by `raise_for_rate_excess`)
+        # still has remaining requests, but its retries must wait for the reset all the same
+        if (
+            isinstance(exception, RateLimitExceededException)
+            or headers.get("x-ratelimit-remaining") == "0"
+        ) and (reset := rate_limit_reset_time(headers)) is not None:
+            return max(0.0, reset - time.time())
+        return 0.0
+
+
+def recipe_retry_policy(recipe: Callable, default: RetryPolicy | None) -> RetryPolicy | None:
+    """Return the retry policy of a recipe, from its `retry_policy` attribute or the default."""
+    policy = recipe_attribute(recipe, "retry_policy")
+    return default if policy is None else policy
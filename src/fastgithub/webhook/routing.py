@@ -0,0 +1,74 @@
+import collections
+import fnmatch
+import re
+from collections.abc import Callable, Sequence
+
+
+def _is_wildcard(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+class EventRouter:
+    """A routing table from event patterns to recipes.
+
+    A pattern is either an event name (`pull_request`), which matches every action of the
+    event, or an event name qualified by an action (`pull_request.opened`), which matches
+    only the deliveries with this `action` field.
+
+    Patterns are compiled once at registration: exact event names only need an equality
+    check and wildcard patterns (`fnmatch` style) get a compiled regex. The recipes matching
+    a concrete event (and action) are memoized, so routing an event is a single dict lookup
+    once the event has been seen. The memo is invalidated when recipes are registered.
+
+    Args:
+        maxsize (int): The maximum number of memoized event names.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._routes: dict[str, list[Callable]] = collections.defaultdict(list)
+        self._wildcards: dict[str, re.Pattern] = {}
+        self._cache: dict[tuple[str, str | None], tuple[Callable, ...]] = {}
+
+    @property
+    def routes(self) -> dict[str, list[Callable]]:
+        return self._routes
+
+    def add(self, pattern: str, recipes: Sequence[Callable]) -> None:
+        """Register recipes for an event pattern."""
+        if _is_wildcard(pattern) and pattern not in self._wildcards:
+            self._wildcards[pattern] = re.compile(fnmatch.translate(pattern))
+        self._routes[pattern].extend(recipes)
+        self._cache.clear()
+
+    def _matches(self, pattern: str, event: str) -> bool:
+        if pattern == event:
+            return True
+        regex = self._wildcards.get(pattern)
+        return regex is not None and regex.match(event) is not None
+
+    def match(self, event: str, action: str | None = None) -> tuple[Callable, ...]:
+        """Return the recipes of an event, in the order their patterns were registered.
+
+        Args:
+            event (str): The type of GitHub event (e.g., 'push', 'pull_request').
+            action (str | None): The `action` field of the payload, if any.
+        """
+        key = (event, action)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        qualified_event = f"{event}.{action}" if action else None
+        recipes = tuple(
+            recipe
+            for pattern, pattern_recipes in self._routes.items()
+            if self._matches(pattern, event)
+            or (qualified_event is not None and self._matches(pattern, qualified_event))
+            for recipe in pattern_recipes
+        )
+        if len(self._cache) >= self.maxsize:
+            self._cache.clear()
+        self._cache[key] = recipes
+        return recipes
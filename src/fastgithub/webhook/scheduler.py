@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastgithub.helpers.github import rate_limit_admitted, rate_limit_reset_time, retry_after_delay
+from fastgithub.helpers.recipe import recipe_attribute
+from fastgithub.types import Payload
+
+
+def recipe_priority(recipe: Callable) -> int:
+    """Return the priority of a recipe, from its `Recipe` (or function) `priority` attribute."""
+    return recipe_attribute(recipe, "priority", 0)
+
+
+def rate_limit_reset(headers: Mapping[str, str] | None, default_delay: float) -> float:
+    """Return the Unix timestamp at which a rate limited request can be sent again.
+
+    The `Retry-After` header (secondary rate limits) is preferred to the `X-RateLimit-Reset`
+    header (primary rate limit), `default_delay` seconds are waited without any of them.
+    """
+    if (delay := retry_after_delay(headers)) is not None:
+        return time.time() + delay
+    if (reset := rate_limit_reset_time(headers)) is not None:
+        return reset
+    return time.time() + default_delay
+
+
+@dataclass(order=True, slots=True)
+class ParkedRecipe:
+    """A rate limited recipe waiting to be resumed, ordered by priority then arrival."""
+
+    priority: int
+    sequence: int
+    recipe: Callable = field(compare=False)
+    payload: Payload = field(compare=False)
+    # the context of the rate limited run (e.g. the delivery processed), restored on resume
+    context: contextvars.Context = field(compare=False, default_factory=contextvars.copy_context)
+
+
+@dataclass(frozen=True, slots=True)
+class SchedulerStats:
+    """A snapshot of the state of a rate limit scheduler."""
+
+    parked: int
+    resumed: int
+    dropped: int
+    next_resume_at: float | None
+
+
+async def _admit(resume: Callable[[Callable, Payload], Awaitable], parked: ParkedRecipe) -> Any:
+    """Resume a parked recipe, admitted below the rate threshold of its helpers."""
+    rate_limit_admitted.set(True)
+    return await resume(parked.recipe, parked.payload)
+
+
+class RateLimitScheduler:
+    """Park the recipes that exceed the rate limit and admit them again within the quota.
+
+    A recipe raising a `RateLimitExceededException` (e.g. from
+    `GithubHelper.raise_for_rate_excess`) is parked instead of failing its delivery. The
+    parked recipes are resumed one at a time, the most important first (see
+    `Recipe.priority`), paced by the quota given by the headers of the exceptions: the
+    remaining requests are spread over the time left until the rate limit resets, and a
+    resumed recipe delays the next one by the number of API calls it sent. A resumed recipe
+    is admitted below the rate threshold of its helpers, it is only parked again once the
+    quota is exhausted, in which case the next recipes wait for the reset.
+
+    Args:
+        maxsize (int): The maximum number of parked recipes, the next ones are dropped.
+        resume_interval (float): The number of seconds between two resumed recipes when the
+            exceptions don't give the remaining quota.
+        default_delay (float): The number of seconds a recipe is parked when the exception
+            doesn't give a reset time.
+        window (float): The number of seconds of a rate limit window, after a reset.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        resume_interval: float = 0.5,
+        default_delay: float = 60.0,
+        window: float = 3600.0,
+    ) -> None:
+        self.maxsize = maxsize
+        self.resume_interval = resume_interval
+        self.default_delay = default_delay
+        self.window = window
+        self._parked: list[ParkedRecipe] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._resumed = 0
+        self._dropped = 0
+        # the quota last given by the exceptions, unknown until an exception gives it
+        self._remaining: int | None = None
+        self._limit = 0
+        self._reset_at = 0.0
+        self._not_before = 0.0
+        self._next_resume_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._parked)
+
+    def park(self, recipe: Callable, payload: Payload, exception: Exception) -> bool:
+        """Park a rate limited recipe until the quota allows it again.
+
+        Returns:
+            bool: False if the recipe can't be parked and must fail.
+        """
+        if not self.running or len(self._parked) >= self.maxsize:
+            self._dropped += 1
+            return False
+        self._observe(getattr(exception, "headers", None))
+        heapq.heappush(
+            self._parked,
+            ParkedRecipe(-recipe_priority(recipe), next(self._sequence), recipe, payload),
+        )
+        self._wakeup.set()
+        return True
+
+    async def start(self, resume: Callable[[Callable, Payload], Awaitable]) -> None:
+        """Start resuming the parked recipes with `resume`.
+
+        `resume` may return the `RecipeResult` of the run, whose `api_calls` are spent from
+        the quota.
+        """
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._resume(resume), name="fastgithub-scheduler")
+
+    async def stop(self) -> None:
+        """Stop resuming the parked recipes, the pending ones are dropped."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._dropped += len(self._parked)
+        self._parked.clear()
+
+    def _observe(self, headers: Mapping[str, str] | None) -> None:
+        """Update the quota from the headers of a rate limit exception."""
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        try:
+            remaining = int(headers["x-ratelimit-remaining"])
+            limit = int(headers["x-ratelimit-limit"])
+            reset_at = float(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            # without the quota, the recipes wait for the reset time
+            self._not_before = max(self._not_before, rate_limit_reset(headers, self.default_delay))
+            return
+        self._remaining, self._limit, self._reset_at = remaining, limit, reset_at
+        if "retry-after" in headers:
+            # a secondary rate limit holds every request of the client
+            self._not_before = max(self._not_before, rate_limit_reset(headers, self.default_delay))
+
+    def _resume_delay(self) -> float:
+        """Return the number of seconds before the next parked recipe can be resumed."""
+        now = time.time()
+        if self._remaining is not None and self._reset_at <= now:
+            self._remaining, self._reset_at = self._limit, now + self.window
+        resume_at = max(self._not_before, self._next_resume_at)
+        if self._remaining is not None and self._remaining <= 0:
+            resume_at = max(resume_at, self._reset_at)
+        return resume_at - now
+
+    def _spend(self, calls: int, started_at: float) -> None:
+        """Spend the calls of a resumed recipe and pace the next one accordingly."""
+        if self._remaining is None or self._remaining <= 0:
+            self._next_resume_at = started_at + self.resume_interval
+            return
+        interval = calls * max(0.0, self._reset_at - started_at) / self._remaining
+        self._remaining = max(0, self._remaining - calls)
+        self._next_resume_at = started_at + interval
+
+    async def _resume(self, resume: Callable[[Callable, Payload], Awaitable]) -> None:
+        while True:
+            if not self._parked:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._resume_delay()
+            if delay > 0:
+                self._wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                continue
+
+            parked = heapq.heappop(self._parked)
+            self._resumed += 1
+            started_at = time.time()
+            result = None
+            with contextlib.suppress(Exception):
+                result = await asyncio.create_task(_admit(resume, parked), context=parked.context)
+            self._spend(max(1, getattr(result, "api_calls", 0)), started_at)
+
+    def stats(self) -> SchedulerStats:
+        """Return the metrics of the scheduler."""
+        return SchedulerStats(
+            parked=len(self._parked),
+            resumed=self._resumed,
+            dropped=self._dropped,
+            next_resume_at=time.time() + max(0.0, self._resume_delay()) if self._parked else None,
+        )
@@ -1,4 +1,3 @@
-import hashlib
 import hmac
 from abc import ABC
 
@@ -10,6 +9,7 @@ class SignatureVerification(ABC):
 
     def __init__(self, secret: str) -> None:
         self._secret = secret
+        self._key = secret.encode()
 
     @property
     def secret(self) -> str:
@@ -25,21 +25,27 @@ class SignatureVerification(ABC):
         Returns:
             bool: True if the signature is valid, otherwise False.
         """
-        hash_alg, provided_signature = signature.split("=")
-        computed_signature = hmac.new(
-            self.secret.encode(),
-            payload,
-            hashlib.new(hash_alg).name,
-        ).hexdigest()
+        hash_alg, _, provided_signature = signature.partition("=")
+        try:
+            computed_signature = hmac.digest(self._key, payload, hash_alg).hex()
+        except ValueError:
+            return False
 
         return hmac.compare_digest(provided_signature, computed_signature)
 
-    async def verify(self, request: Request):
+    async def verify(self, request: Request, payload: bytes | None = None):
+        """Verify the signature of a request.
+
+        Args:
+            request (Request): The incoming request.
+            payload (bytes | None): The raw request payload, read from the request if not given.
+        """
         signature = request.headers.get(self.signature_header)
         if not signature:
             raise HTTPException(status_code=400, detail="Signature is missing")
 
-        payload = await request.body()
+        if payload is None:
+            payload = await request.body()
 
         if not self._verify_signature(payload, signature):
             raise HTTPException(status_code=403, detail="Invalid signature")
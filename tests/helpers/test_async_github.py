@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from github import GithubException, RateLimitExceededException
+
+from fastgithub import AsyncGithubClient, RetryPolicy
+from fastgithub.helpers.async_github import AsyncGithubHelper
+from fastgithub.helpers.response_cache import MemoryResponseCache
+from fastgithub.recipes.github import AsyncLabelsFromCommits
+from fastgithub.recipes.github._config import LABEL_CONFIG
+
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-remaining": "4000",
+    "x-ratelimit-limit": "5000",
+    "x-ratelimit-reset": str(int(time.time()) + 3600),
+}
+
+
+class FakeGithub:
+    """A GitHub API serving a pull request with paginated commits and labels."""
+
+    def __init__(self) -> None:
+        self.labels = [{"name": "AutoMerge", "color": "e5ee15", "description": ""}]
+        self.requests: list[httpx.Request] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        path, page = request.url.path, request.url.params.get("page", "1")
+        if path == "/repos/owner/repo/pulls/1/commits":
+            headers = dict(RATE_LIMIT_HEADERS)
+            if page == "1":
+                headers["link"] = (
+                    '<https://api.github.com/repos/owner/repo/pulls/1/commits?page=2>; rel="next"'  # noqa: E501
+                )
+                return httpx.Response(
+                    200, json=[{"commit": {"message": "#fast"}}], headers=headers
+                )
+            return httpx.Response(200, json=[{"commit": {"message": "#nodraft"}}], headers=headers)
+        if path == "/repos/owner/repo/labels" and request.method == "GET":
+            return httpx.Response(200, json=self.labels, headers=RATE_LIMIT_HEADERS)
+        if path == "/repos/owner/repo/labels" and request.method == "POST":
+            return httpx.Response(201, content=request.content, headers=RATE_LIMIT_HEADERS)
+        if path == "/repos/owner/repo/issues/1/labels":
+            return httpx.Response(200, json=[], headers=RATE_LIMIT_HEADERS)
+        if path == "/rate_limit":
+            reset = int(RATE_LIMIT_HEADERS["x-ratelimit-reset"])
+            return httpx.Response(
+                200, json={"resources": {"core": {"remaining": 10, "limit": 5000, "reset": reset}}}
+            )
+        return httpx.Response(404, json={"message": "Not Found"}, headers=RATE_LIMIT_HEADERS)
+
+
+@pytest.fixture
+def fake_github() -> FakeGithub:
+    return FakeGithub()
+
+
+@pytest.fixture
+def client(fake_github: FakeGithub) -> AsyncGithubClient:
+    return AsyncGithubClient("token", transport=httpx.MockTransport(fake_github))
+
+
+async def test_paginate_follows_link_headers(client: AsyncGithubClient):
+    commits = await client.paginate("/repos/owner/repo/pulls/1/commits")
+    assert [commit["commit"]["message"] for commit in commits] == ["#fast", "#nodraft"]
+    assert client.rate_limiting == (4000, 5000)
+
+
+async def test_only_the_core_rate_limit_is_recorded():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/graphql":
+            graphql = {**RATE_LIMIT_HEADERS, "x-ratelimit-remaining": "4990"}
+            return httpx.Response(
+                200, json={}, headers={**graphql, "x-ratelimit-resource": "graphql"}
+            )
+        return httpx.Response(
+            200, json={}, headers={**RATE_LIMIT_HEADERS, "x-ratelimit-resource": "core"}
+        )
+
+    client = AsyncGithubClient(transport=httpx.MockTransport(handler))
+    await client.get("/repos/owner/repo")
+    await client.post("/graphql", json={"query": "{}"})
+    assert client.rate_limiting == (4000, 5000)
+    await client.aclose()
+
+
+async def test_errors_are_raised_as_github_exceptions(client: AsyncGithubClient):
+    with pytest.raises(GithubException) as ex:
+        await client.get("/repos/owner/unknown")
+    assert ex.value.status == 404
+
+
+async def test_html_error_pages_are_raised_as_retryable_github_exceptions():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(502, html="<html><body>Bad Gateway</body></html>")
+
+    client = AsyncGithubClient(transport=httpx.MockTransport(handler))
+    with pytest.raises(GithubException) as exc_info:
+        await client.get("/repos/owner/repo")
+    assert exc_info.value.status == 502
+    assert "Bad Gateway" in exc_info.value.data["message"]  # type: ignore
+    assert RetryPolicy().is_retryable(exc_info.value)
+    await client.aclose()
+
+
+async def test_rate_limit_is_polled_without_response_headers(client: AsyncGithubClient):
+    helper = AsyncGithubHelper(client, "owner/repo")
+    with pytest.raises(RateLimitExceededException):
+        await helper.raise_for_rate_excess()
+
+
+async def test_commits_and_labels_are_fetched_concurrently(
+    client: AsyncGithubClient, fake_github: FakeGithub
+):
+    helper = AsyncGithubHelper(client, "owner/repo")
+    labels = await helper.extract_labels_from_pr(1, LABEL_CONFIG)
+
+    assert labels == {"nodraft", "AutoMerge", "autoapprove"}
+    assert fake_github.max_in_flight == 2
+    created = [r for r in fake_github.requests if r.method == "POST"]
+    assert len(created) == 2  # `automerge` already exists
+
+
+async def test_async_recipe_labels_the_pull_request(
+    client: AsyncGithubClient, fake_github: FakeGithub
+):
+    recipe = AsyncLabelsFromCommits(client)
+    client.rate_limiting = (4000, 5000)
+    client.rate_limiting_resettime = int(time.time()) + 3600
+    payload = {
+        "number": 1,
+        "pull_request": {"number": 1, "labels": [{"name": "nodraft"}, {"name": "AutoMerge"}]},
+        "repository": {"full_name": "owner/repo"},
+    }
+    await recipe.events["pull_request.synchronize"](payload)
+
+    request = fake_github.requests[-1]
+    assert request.url.path == "/repos/owner/repo/issues/1/labels"
+    assert request.content == b'{"labels":["autoapprove"]}'
+    await client.aclose()
+
+
+async def test_reads_are_revalidated_with_the_response_cache():
+    conditional_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            conditional_requests.append(request)
+            return httpx.Response(304, headers={"ETag": '"v1"', **RATE_LIMIT_HEADERS})
+        return httpx.Response(
+            200, json={"default_branch": "main"}, headers={"ETag": '"v1"', **RATE_LIMIT_HEADERS}
+        )
+
+    cache = MemoryResponseCache()
+    client = AsyncGithubClient(response_cache=cache, transport=httpx.MockTransport(handler))
+    helper = AsyncGithubHelper(client, "owner/repo")
+    assert await helper.get_default_branch() == "main"
+    assert await helper.get_default_branch() == "main"
+
+    assert len(conditional_requests) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    await client.aclose()
+
+
+async def test_responses_are_cached_across_the_tokens_of_an_installation():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"', **RATE_LIMIT_HEADERS})
+        return httpx.Response(
+            200, json={"default_branch": "main"}, headers={"ETag": '"v1"', **RATE_LIMIT_HEADERS}
+        )
+
+    cache = MemoryResponseCache()
+    for token in ("token-1", "token-2"):
+        async with AsyncGithubClient(
+            token,
+            response_cache=cache,
+            cache_identity="installation:42",
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            assert await AsyncGithubHelper(client, "owner/repo").get_default_branch() == "main"
+
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+from github import Auth, Github
+from requests.structures import CaseInsensitiveDict
+
+from fastgithub.accounting import ApiBudgetExceededError, account_api_calls
+from fastgithub.helpers.client import (
+    CONNECTION_ATTRIBUTES,
+    CONNECTION_CLASS_ATTRIBUTE,
+    ThreadSafeHTTPConnection,
+    ThreadSafeHTTPSConnection,
+    create_github,
+    set_connection_class,
+)
+from fastgithub.helpers.github import RateStatus
+from fastgithub.helpers.response_cache import MemoryResponseCache
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    conditional_requests = 0
+
+    def do_GET(self):
+        login = self.path.rsplit("/", 1)[-1]
+        etag = f'"{login}"'
+        if self.headers.get("If-None-Match") == etag:
+            EchoHandler.conditional_requests += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("X-RateLimit-Remaining", "4999")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps({"login": login}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("X-RateLimit-Remaining", "5000")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_create_github_uses_thread_safe_connections(server_url):
+    github = create_github(base_url=server_url, pool_size=8)
+    assert issubclass(github.requester._Requester__connectionClass, ThreadSafeHTTPConnection)
+    assert github.per_page == 100
+
+    def login(i: int) -> str:
+        _, data = github.requester.requestJsonAndCheck("GET", f"/users/user{i}")
+        return data["login"]
+
+    with ThreadPoolExecutor(8) as pool:
+        logins = list(pool.map(login, range(64)))
+    assert logins == [f"user{i}" for i in range(64)]
+    github.close()
+
+
+def test_reads_are_revalidated_with_the_response_cache(server_url):
+    cache = MemoryResponseCache()
+    github = create_github(base_url=server_url, response_cache=cache)
+    EchoHandler.conditional_requests = 0
+
+    for _ in range(3):
+        headers, data = github.requester.requestJsonAndCheck("GET", "/users/octocat")
+        assert data["login"] == "octocat"
+    assert headers["x-ratelimit-remaining"] == "4999"
+    assert EchoHandler.conditional_requests == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+    github.close()
+
+
+def test_requests_are_accounted_to_the_current_recipe(server_url):
+    github = create_github(base_url=server_url, response_cache=MemoryResponseCache())
+
+    with account_api_calls("LabelsFromCommits", budget=3) as account:
+        github.requester.requestJsonAndCheck("GET", "/users/octocat")
+        github.requester.requestJsonAndCheck("GET", "/users/octocat")
+        github.requester.requestJsonAndCheck("GET", "/users/monalisa")
+        with pytest.raises(ApiBudgetExceededError):
+            github.requester.requestJsonAndCheck("GET", "/users/hubot")
+
+    assert account.calls == 3
+    assert account.quota == 2  # the revalidation of octocat is free
+    assert account.endpoints == {"GET /users/octocat": 2, "GET /users/monalisa": 1}
+    github.requester.requestJsonAndCheck("GET", "/users/hubot")  # out of the recipe
+    assert account.calls == 3
+    github.close()
+
+
+def test_connection_class_of_the_requester_is_replaced():
+    # fails if PyGithub renames the private attribute replaced by `set_connection_class`
+    github = Github()
+    assert isinstance(getattr(github.requester, CONNECTION_CLASS_ATTRIBUTE), type)
+    set_connection_class(github)
+    assert getattr(github.requester, CONNECTION_CLASS_ATTRIBUTE) is ThreadSafeHTTPSConnection
+    connection = ThreadSafeHTTPSConnection("api.github.com", 443)
+    assert all(hasattr(connection, name) for name in CONNECTION_ATTRIBUTES)
+
+
+def test_unsupported_requester_fails_loudly():
+    github = MagicMock(spec=["requester"])
+    github.requester = object()
+    with pytest.raises(RuntimeError):
+        set_connection_class(github)
+
+
+def test_responses_are_cached_by_installation():
+    auth = Auth.AppInstallationAuth(Auth.AppAuth(1, "private-key"), 42)
+    github = create_github(auth=auth, response_cache=MemoryResponseCache())
+    connection_class = getattr(github.requester, CONNECTION_CLASS_ATTRIBUTE)
+    assert connection_class.cache_identity == "installation:42"
+
+
+def test_core_rate_limit_is_observed_by_the_shared_rate_status():
+    github = create_github()
+    connection_class = getattr(github.requester, CONNECTION_CLASS_ATTRIBUTE)
+    rate_status = RateStatus.shared(github)
+    assert connection_class.rate_status is rate_status
+
+    reset = int(time.time()) + 3600
+    headers = {"X-RateLimit-Limit": "5000", "X-RateLimit-Reset": str(reset)}
+    rate_status.observe(CaseInsensitiveDict({**headers, "X-RateLimit-Remaining": "4000"}))
+    # PyGithub keeps the headers of the last response, here a GraphQL query
+    github.requester.rate_limiting = (4990, 5000)
+    github.requester.rate_limiting_resettime = reset
+    graphql = {**headers, "X-RateLimit-Remaining": "4990", "X-RateLimit-Resource": "graphql"}
+    rate_status.observe(CaseInsensitiveDict(graphql))
+    assert rate_status.refresh() == (4000, 5000, reset)
@@ -0,0 +1,441 @@
+import contextvars
+import gc
+import time
+import weakref
+from unittest.mock import MagicMock
+
+import pytest
+from github import Github, GithubException, RateLimitExceededException
+
+from fastgithub.helpers.github import (
+    GithubHelper,
+    GithubHelperRegistry,
+    LabelCache,
+    LabelMatcher,
+    RateStatus,
+    rate_limit_admitted,
+    rate_limit_reset_time,
+    retry_after_delay,
+)
+from fastgithub.recipes.github._config import LABEL_CONFIG
+
+
+@pytest.fixture
+def github():
+    """A `Github` client that already received responses with rate limit headers."""
+    github = MagicMock()
+    github.requester.rate_limiting = (4000, 5000)
+    github.requester.rate_limiting_resettime = int(time.time()) + 3600
+    return github
+
+
+def _rate_limit(remaining: int, limit: int = 5000):
+    """The response of the `/rate_limit` endpoint."""
+    core = {"limit": limit, "remaining": remaining, "reset": int(time.time()) + 3600, "used": 0}
+    return {}, {"resources": {"core": core}, "rate": core}
+
+
+def test_rate_status_uses_response_headers(github):
+    rate_status = RateStatus(github)
+    assert rate_status.available() == 0.8
+    assert rate_status.too_low() is False
+    github.requester.requestJsonAndCheck.assert_not_called()
+
+
+def test_rate_status_polls_when_no_response_was_received(github):
+    github.requester.rate_limiting = (-1, -1)
+    github.requester.rate_limiting_resettime = 0
+    github.requester.requestJsonAndCheck.return_value = _rate_limit(1000)
+
+    rate_status = RateStatus(github)
+    assert rate_status.available() == 0.2
+    assert rate_status.too_low() is True
+    github.requester.requestJsonAndCheck.assert_called_once()
+
+
+def test_rate_status_polls_when_window_was_reset(github):
+    github.requester.rate_limiting_resettime = int(time.time()) - 1
+    github.requester.requestJsonAndCheck.return_value = _rate_limit(5000)
+
+    assert RateStatus(github).available() == 1.0
+    github.requester.requestJsonAndCheck.assert_called_once()
+
+
+def test_rate_status_polls_when_headers_are_stale(github):
+    github.requester.requestJsonAndCheck.return_value = _rate_limit(3000)
+    rate_status = RateStatus(github, max_age=0.0)
+
+    assert rate_status.available() == 0.8
+    github.requester.requestJsonAndCheck.assert_not_called()
+    time.sleep(0.001)
+    assert rate_status.available() == 0.6
+    github.requester.requestJsonAndCheck.assert_called_once()
+
+
+def test_rate_status_is_shared_by_github_client(github):
+    assert RateStatus.shared(github) is RateStatus.shared(github)
+    assert RateStatus.shared(github) is not RateStatus.shared(MagicMock())
+    assert GithubHelper(github, "owner/repo").rate_status is RateStatus.shared(github)
+
+
+def test_rate_status_is_collected_with_its_client():
+    client = Github()
+    rate_status = RateStatus.shared(client)
+    client_ref = weakref.ref(client)
+    del client
+    gc.collect()
+    assert client_ref() is None
+    assert rate_status.github is None
+    assert rate_status not in RateStatus.tracked()
+
+
+def test_rate_limit_headers_are_parsed_case_insensitively():
+    headers = {"Retry-After": "30", "X-RateLimit-Reset": "2000000000"}
+    assert retry_after_delay(headers) == 30.0
+    assert rate_limit_reset_time(headers) == 2_000_000_000
+    assert retry_after_delay({"retry-after": "soon"}) is None
+    assert rate_limit_reset_time(None) is None
+
+
+def test_raise_for_rate_excess(github):
+    gh = GithubHelper(github, "owner/repo", rate_threshold=0.9)
+    with pytest.raises(RateLimitExceededException) as exc_info:
+        gh.raise_for_rate_excess()
+    assert exc_info.value.headers["x-ratelimit-remaining"] == "4000"  # type: ignore
+
+    GithubHelper(github, "owner/repo", rate_threshold=0.5).raise_for_rate_excess()
+    gh.raise_for_rate_excess(threshold=0.5)
+    github.requester.requestJsonAndCheck.assert_not_called()
+
+
+def test_admitted_recipes_run_below_the_threshold(github):
+    gh = GithubHelper(github, "owner/repo", rate_threshold=0.9)
+    context = contextvars.copy_context()
+    context.run(rate_limit_admitted.set, True)
+    context.run(gh.raise_for_rate_excess)
+
+    github.requester.rate_limiting = (0, 5000)
+    with pytest.raises(RateLimitExceededException):
+        context.run(gh.raise_for_rate_excess)
+
+
+def _label(name: str):
+    label = MagicMock()
+    label.name = name
+    return label
+
+
+@pytest.fixture
+def repo():
+    repo = MagicMock()
+    repo.get_labels.return_value = [_label("bug"), _label("NoDraft")]
+    repo.create_label.side_effect = lambda name, color, description: _label(name)
+    return repo
+
+
+def test_label_cache_is_loaded_once(repo):
+    cache = LabelCache()
+    assert cache.get(repo, "bug").name == "bug"
+    assert cache.get(repo, "nodraft").name == "NoDraft"
+    assert cache.get(repo, "automerge") is None
+    repo.get_labels.assert_called_once()
+
+
+def test_label_cache_is_evicted_after_ttl(repo):
+    cache = LabelCache(ttl=0.0)
+    cache.get(repo, "bug")
+    time.sleep(0.001)
+    cache.get(repo, "bug")
+    assert repo.get_labels.call_count == 2
+
+
+def test_get_or_create_label_uses_label_cache(github, repo):
+    github.get_repo.return_value = repo
+    gh = GithubHelper(github, "owner/repo")
+
+    for _ in range(20):
+        assert gh._get_or_create_label("bug").name == "bug"
+        assert gh._get_or_create_label("automerge").name == "automerge"
+
+    repo.get_labels.assert_called_once()
+    repo.get_label.assert_not_called()
+    repo.create_label.assert_called_once_with(
+        name="automerge", color="ff66cc", description="Created by FastGitHub"
+    )
+
+
+def test_get_or_create_label_fetch_label_created_concurrently(github, repo):
+    github.get_repo.return_value = repo
+    repo.create_label.side_effect = GithubException(422, {}, {})
+    repo.get_label.return_value = _label("automerge")
+
+    gh = GithubHelper(github, "owner/repo")
+    assert gh._get_or_create_label("automerge").name == "automerge"
+    assert gh.label_cache.get(repo, "automerge").name == "automerge"
+
+
+def test_update_label_cache_from_label_events(github, repo):
+    github.get_repo.return_value = repo
+    gh = GithubHelper(github, "owner/repo")
+    gh.label_cache.load(repo)
+
+    gh.update_label_cache({"action": "created", "label": {"name": "automerge"}})
+    assert gh.label_cache.get(repo, "automerge") is not None
+
+    gh.update_label_cache({
+        "action": "edited",
+        "label": {"name": "defect"},
+        "changes": {"name": {"from": "bug"}},
+    })
+    assert gh.label_cache.get(repo, "bug") is None
+    assert gh.label_cache.get(repo, "defect") is not None
+
+    gh.update_label_cache({"action": "deleted", "label": {"name": "defect"}})
+    assert gh.label_cache.get(repo, "defect") is None
+    repo.get_labels.assert_called_once()
+
+
+@pytest.mark.parametrize("pattern", ["fast", "#fast!", "#fast ", "#Fast"])
+def test_label_matcher_validates_config(pattern):
+    with pytest.raises(ValueError):
+        LabelMatcher({pattern: []})
+
+
+def test_label_matcher_returns_union_of_matched_labels():
+    matcher = LabelMatcher(LABEL_CONFIG)
+    labels = matcher.match("Fix a bug #fast\n\nAlso #release it")
+    assert set(labels) == {"nodraft", "automerge", "autoapprove", "autorelease"}
+    assert matcher.match("Nothing to see here") == {}
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("#fast", {"nodraft", "automerge", "autoapprove"}),
+        ("(#fast)", {"nodraft", "automerge", "autoapprove"}),
+        ("#fast#nodraft", {"nodraft", "automerge", "autoapprove"}),
+        ("#faster", set()),
+        ("#fast-track", set()),
+        ("fast", set()),
+    ],
+)
+def test_label_matcher_matches_whole_tags(message, expected):
+    assert set(LabelMatcher(LABEL_CONFIG).match(message)) == expected
+
+
+def test_extract_labels_from_pr_scans_each_commit_once(github, repo):
+    github.get_repo.return_value = repo
+    pr = MagicMock()
+    pr.get_commits.return_value = [
+        MagicMock(commit=MagicMock(message="feat: foo #furious")) for _ in range(20)
+    ]
+
+    gh = GithubHelper(github, "owner/repo")
+    labels = gh.extract_labels_from_pr(pr, LabelMatcher(LABEL_CONFIG))
+
+    # the existing label keeps its name from the repository
+    assert labels == {"NoDraft", "automerge", "autoapprove", "autorelease"}
+    repo.get_labels.assert_called_once()
+    assert repo.create_label.call_count == 3  # nodraft already exists
+
+
+def test_default_branch_and_head_commit_are_read_from_payload(github, repo):
+    github.get_repo.return_value = repo
+    payload = {
+        "ref": "refs/heads/feature",
+        "head_commit": {"message": "feat: foo"},
+        "repository": {"full_name": "owner/repo", "default_branch": "main"},
+    }
+
+    gh = GithubHelper(github, "owner/repo")
+    assert gh.get_default_branch(payload) == "main"
+    assert gh.get_head_commit_message(payload["ref"], payload) == "feat: foo"
+    repo.get_commits.assert_not_called()
+
+
+def test_default_branch_and_head_commit_fallback_to_api(github, repo):
+    github.get_repo.return_value = repo
+    repo.default_branch = "develop"
+    repo.get_commits.return_value = [MagicMock(commit=MagicMock(message="fix: bar"))]
+    payload = {"ref": "refs/heads/feature", "head_commit": None, "repository": {}}
+
+    gh = GithubHelper(github, "owner/repo")
+    assert gh.get_default_branch(payload) == "develop"
+    assert gh.get_head_commit_message(payload["ref"], payload) == "fix: bar"
+    repo.get_commits.assert_called_once_with(sha="refs/heads/feature")
+
+
+def _pull(number: int, branch: str, repo_fullname: str = "owner/repo"):
+    return MagicMock(
+        number=number, head=MagicMock(ref=branch, repo=MagicMock(full_name=repo_fullname))
+    )
+
+
+def _pull_request_event(action: str, number: int, branch: str, head_repo: str = "owner/repo"):
+    return {
+        "action": action,
+        "number": number,
+        "pull_request": {
+            "number": number,
+            "head": {"ref": branch, "repo": {"full_name": head_repo}},
+        },
+        "repository": {"full_name": "owner/repo"},
+    }
+
+
+def test_pull_request_index_is_seeded_once_and_ignores_forks(github, repo):
+    github.get_repo.return_value = repo
+    repo.full_name = "owner/repo"
+    repo.get_pulls.return_value = [_pull(1, "feature"), _pull(2, "main", "fork/repo")]
+
+    gh = GithubHelper(github, "owner/repo")
+    assert gh.get_open_pull_request("feature") == 1
+    assert gh.get_open_pull_request("main") is None
+    repo.get_pulls.assert_called_once_with(state="open")
+
+
+def test_pull_request_index_is_updated_from_events(github, repo):
+    github.get_repo.return_value = repo
+    repo.full_name = "owner/repo"
+    repo.get_pulls.return_value = []
+    gh = GithubHelper(github, "owner/repo")
+    gh.pull_request_index.load(repo)
+
+    gh.update_pull_request_index(_pull_request_event("opened", 3, "feature"))
+    gh.update_pull_request_index(_pull_request_event("opened", 4, "other", "fork/repo"))
+    assert gh.get_open_pull_request("feature") == 3
+    assert gh.get_open_pull_request("other") is None
+
+    gh.update_pull_request_index(_pull_request_event("closed", 3, "feature"))
+    assert gh.get_open_pull_request("feature") is None
+
+    gh.update_pull_request_index(_pull_request_event("reopened", 3, "feature"))
+    assert gh.get_open_pull_request("feature") == 3
+    repo.get_pulls.assert_called_once()
+
+
+def test_open_pull_request_is_refreshed_in_the_index(github, repo):
+    github.get_repo.return_value = repo
+    repo.full_name = "owner/repo"
+    repo.get_pulls.return_value = []
+    gh = GithubHelper(github, "owner/repo")
+    assert gh.get_open_pull_request("feature") is None
+
+    repo.get_pulls.return_value = [_pull(5, "feature")]
+    assert gh.refresh_open_pull_request("feature") == 5
+    repo.get_pulls.assert_called_with(state="open", head="owner:feature")
+    assert gh.get_open_pull_request("feature") == 5
+
+    repo.get_pulls.return_value = []
+    assert gh.refresh_open_pull_request("feature") is None
+    assert gh.get_open_pull_request("feature") is None
+
+
+def test_helper_registry_reuses_helpers_by_repository(github):
+    registry = GithubHelperRegistry(github, maxsize=2, labels_ttl=10.0)
+    helper = registry.get("owner/repo")
+    assert registry.get("owner/repo") is helper
+    assert helper.label_cache.ttl == 10.0
+    github.get_repo.assert_called_once_with("owner/repo", lazy=True)
+
+    registry.get("owner/other")
+    registry.get("owner/repo")  # the least recently used is now `owner/other`
+    registry.get("owner/third")
+    assert "owner/repo" in registry
+    assert "owner/other" not in registry
+    assert len(registry) == 2
+
+
+def test_helper_registry_is_collected_with_its_client():
+    client = Github()
+    registry = GithubHelperRegistry.shared(client)
+    registry.get("owner/repo")
+    client_ref = weakref.ref(client)
+    del client, registry
+    gc.collect()
+    # the shared registry, its helpers and their caches don't keep the client alive
+    assert client_ref() is None
+
+
+def test_helper_registry_is_shared_by_client(github):
+    assert GithubHelperRegistry.shared(github) is GithubHelperRegistry.shared(github)
+    assert GithubHelperRegistry.shared(github) is not GithubHelperRegistry.shared(MagicMock())
+
+
+def _graphql_page(commits, labels=None, commits_cursor=None, labels_cursor=None):
+    repository = {
+        "pullRequest": {
+            "id": "PR_1",
+            "commits": {
+                "nodes": [{"commit": {"message": message}} for message in commits],
+                "pageInfo": {
+                    "hasNextPage": commits_cursor is not None,
+                    "endCursor": commits_cursor,
+                },
+            },
+        }
+    }
+    if labels is not None:
+        repository["labels"] = {
+            "nodes": [{"id": f"LA_{name}", "name": name} for name in labels],
+            "pageInfo": {"hasNextPage": labels_cursor is not None, "endCursor": labels_cursor},
+        }
+        repository["pullRequest"]["labels"] = {"nodes": [{"name": "nodraft"}]}
+    return {}, {"data": {"repository": repository}}
+
+
+def test_pull_request_labels_are_fetched_with_paginated_graphql_queries(github):
+    pages = iter([
+        _graphql_page(["#fast"] * 100, ["nodraft"], commits_cursor="c1", labels_cursor="l1"),
+        _graphql_page(["#nodraft"] * 100, ["AutoMerge"], commits_cursor="c2"),
+        _graphql_page(["#release"] * 50),
+    ])
+    variables = []
+
+    def graphql_query(query, query_variables):
+        variables.append(dict(query_variables))
+        return next(pages)
+
+    github.requester.graphql_query.side_effect = graphql_query
+    gh = GithubHelper(github, "owner/repo")
+    pr_labels = gh.get_pull_request_labels(1)
+
+    assert pr_labels.id == "PR_1"
+    assert pr_labels.labels == {"nodraft"}
+    assert len(pr_labels.commit_messages) == 250
+    assert pr_labels.repo_labels == {
+        "nodraft": ("nodraft", "LA_nodraft"),
+        "automerge": ("AutoMerge", "LA_AutoMerge"),
+    }
+    assert [(v["withLabels"], v["withCommits"]) for v in variables] == [
+        (True, True),
+        (True, True),
+        (False, True),
+    ]
+    assert variables[2]["commitsCursor"] == "c2"
+
+
+def test_labels_are_resolved_from_repository_labels(github):
+    gh = GithubHelper(github, "owner/repo")
+    gh.repo.get_labels.return_value = []
+
+    def create_label(name, color, description):
+        label = MagicMock(node_id=f"LA_{name}")
+        label.name = name
+        return label
+
+    gh.repo.create_label.side_effect = create_label
+    labels = gh.extract_labels_from_messages(
+        ["#fast"], LabelMatcher(LABEL_CONFIG), {"automerge": ("AutoMerge", "LA_AutoMerge")}
+    )
+    assert labels == {
+        "nodraft": "LA_nodraft",
+        "AutoMerge": "LA_AutoMerge",
+        "autoapprove": "LA_autoapprove",
+    }
+    assert gh.repo.create_label.call_count == 2
+    gh.repo.get_labels.assert_not_called()
+
+    gh.add_labels_to_labelable("PR_1", list(labels.values()))
+    _, variables = github.requester.graphql_query.call_args.args
+    assert variables == {"labelableId": "PR_1", "labelIds": list(labels.values())}
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from fastgithub.helpers.response_cache import (
+    CachedResponse,
+    MemoryResponseCache,
+    SQLiteResponseCache,
+    cache_identity,
+    cache_key,
+)
+
+
+def _response(body: bytes = b"{}", etag: str = '"abc"') -> CachedResponse:
+    response = CachedResponse.from_response(200, {"ETag": etag, "Date": "today"}, body)
+    assert response is not None
+    return response
+
+
+def test_only_successful_responses_with_validators_are_cached():
+    assert CachedResponse.from_response(200, {"Content-Type": "application/json"}, b"") is None
+    assert CachedResponse.from_response(404, {"ETag": '"abc"'}, b"") is None
+    response = _response()
+    assert response.headers == {"etag": '"abc"'}
+    assert response.conditional_headers() == {"If-None-Match": '"abc"'}
+
+
+def test_cache_key_depends_on_credentials_and_media_type():
+    url = "https://api.github.com/repos/owner/repo"
+    key = cache_key(url, {"Authorization": "token a", "Accept": "application/json"})
+    assert key == cache_key(url, {"authorization": "token a", "accept": "application/json"})
+    assert key != cache_key(url, {"Authorization": "token b", "Accept": "application/json"})
+    assert key != cache_key(url, {"Authorization": "token a", "Accept": "application/raw"})
+    assert "token a" not in key
+
+
+def test_cache_key_of_an_installation_outlives_its_tokens():
+    url = "https://api.github.com/repos/owner/repo"
+    identity = cache_identity(SimpleNamespace(installation_id=42))
+    key = cache_key(url, {"Authorization": "token a"}, identity)
+    assert key == cache_key(url, {"Authorization": "token b"}, identity)
+    assert key != cache_key(url, {"Authorization": "token a"}, cache_identity(None))
+    assert key != cache_key(url, {"Authorization": "token a"}, "installation:43")
+
+
+def test_memory_cache_evicts_least_recently_used_beyond_maxsize():
+    size = _response(b"x" * 100).size
+    cache = MemoryResponseCache(maxsize=2 * size)
+    cache.set("a", _response(b"x" * 100))
+    cache.set("b", _response(b"y" * 100))
+    assert cache.get("a") is not None
+    cache.set("c", _response(b"z" * 100))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size == 2 * size
+    cache.set("big", _response(b"x" * 1000))
+    assert cache.get("big") is None
+
+
+def test_sqlite_cache_is_kept_across_instances(tmp_path):
+    cache = SQLiteResponseCache(tmp_path / "responses.db", maxsize=2)
+    for key in "abc":
+        cache.set(key, _response(key.encode()))
+    assert len(cache) == 2
+    cache.close()
+
+    cache = SQLiteResponseCache(tmp_path / "responses.db")
+    assert cache.get("a") is None
+    assert cache.get("c") == _response(b"c")
+    cache.discard("c")
+    assert cache.get("c") is None
+    cache.close()
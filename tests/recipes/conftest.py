@@ -23,6 +23,7 @@ def mock_github_helper():
     helper = MagicMock()
     helper.repo = MagicMock()
     helper.raise_for_rate_excess = MagicMock()
+    helper.get_open_pull_request.return_value = None
     return helper
 
 
@@ -92,6 +93,21 @@ def sample_pull_request_payload():
     }
 
 
+@pytest.fixture
+def sample_push_payload():
+    return {
+        "ref": "refs/heads/feature-branch",
+        "deleted": False,
+        "head_commit": {"message": "Test commit"},
+        "repository": {
+            "full_name": "owner/repo",
+            "name": "repo",
+            "default_branch": "main",
+            "owner": {"login": "owner"},
+        },
+    }
+
+
 @pytest.fixture
 def custom_labels_config():
     return {
@@ -4,50 +4,54 @@ import pytest
 from github.GithubException import GithubException
 
 
+@pytest.fixture
+def branch_push_payload(push_payload):
+    """A push payload of a feature branch."""
+    return {**push_payload, "ref": "refs/heads/feature-branch", "deleted": False}
+
+
 def test_autocreate_pr_events_property(autocreate_pr_recipe):
     events = autocreate_pr_recipe.events
     assert "push" in events
     assert events["push"] == autocreate_pr_recipe._process_push
+    for action in ["opened", "reopened", "closed"]:
+        assert events[f"pull_request.{action}"] == autocreate_pr_recipe._process_pull_request
 
 
-@patch("fastgithub.recipes.github.autocreate_pr.GithubHelper")
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
 def test_autocreate_pr_successful_creation(
-    mock_github_helper_class, autocreate_pr_recipe, push_payload, mock_github_helper
+    mock_helper, autocreate_pr_recipe, branch_push_payload, mock_github_helper
 ):
-    mock_github_helper_class.return_value = mock_github_helper
-    mock_github_helper.repo.default_branch = "main"
-    mock_github_helper.repo.get_commits.return_value = [
-        MagicMock(commit=MagicMock(message="Test commit"))
-    ]
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+    mock_github_helper.get_head_commit_message.return_value = "Test commit"
     mock_github_helper.repo.create_pull.return_value = MagicMock()
 
-    autocreate_pr_recipe._process_push(push_payload)
+    autocreate_pr_recipe._process_push(branch_push_payload)
 
-    mock_github_helper_class.assert_called_once_with(
-        autocreate_pr_recipe.github, repo_fullname=push_payload["repository"]["full_name"]
-    )
+    mock_helper.assert_called_once_with(branch_push_payload)
     mock_github_helper.raise_for_rate_excess.assert_called_once()
     mock_github_helper.repo.create_pull.assert_called_once_with(
         base="main",
-        head=push_payload["ref"],
+        head=branch_push_payload["ref"],
         title="Test commit",
         body="Created by FastGitHub",
         draft=True,
     )
 
 
-@patch("fastgithub.recipes.github.autocreate_pr.GithubHelper")
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
 def test_autocreate_pr_with_custom_parameters(
-    mock_github_helper_class, autocreate_pr_recipe, push_payload, mock_github_helper
+    mock_helper, autocreate_pr_recipe, branch_push_payload, mock_github_helper
 ):
     """Test PR creation with custom parameters."""
     # Setup mocks
-    mock_github_helper_class.return_value = mock_github_helper
+    mock_helper.return_value = mock_github_helper
     mock_github_helper.repo.create_pull.return_value = MagicMock()
 
     # Call with custom parameters
     autocreate_pr_recipe._process_push(
-        push_payload,
+        branch_push_payload,
         base_branch="develop",
         title="Custom Title",
         body="Custom body",
@@ -57,106 +61,168 @@ def test_autocreate_pr_with_custom_parameters(
     # Verify PR creation with custom parameters
     mock_github_helper.repo.create_pull.assert_called_once_with(
         base="develop",
-        head=push_payload["ref"],
+        head=branch_push_payload["ref"],
         title="Custom Title",
         body="Custom body",
         draft=False,
     )
 
 
-@patch("fastgithub.recipes.github.autocreate_pr.GithubHelper")
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
 def test_autocreate_pr_github_exception_422_ignored(
-    mock_github_helper_class, autocreate_pr_recipe, push_payload, mock_github_helper
+    mock_helper, autocreate_pr_recipe, branch_push_payload, mock_github_helper
 ):
     """Test that GithubException with status 422 is ignored (PR already exists)."""
     # Setup mocks
-    mock_github_helper_class.return_value = mock_github_helper
-    mock_github_helper.repo.default_branch = "main"
-    mock_github_helper.repo.get_commits.return_value = [
-        MagicMock(commit=MagicMock(message="Test commit"))
-    ]
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+    mock_github_helper.get_head_commit_message.return_value = "Test commit"
 
     # Mock GithubException with status 422
     mock_github_helper.repo.create_pull.side_effect = GithubException(422, {}, {})
 
     # Should not raise an exception
-    autocreate_pr_recipe._process_push(push_payload)
+    autocreate_pr_recipe._process_push(branch_push_payload)
 
-    # Verify create_pull was called
+    # Verify create_pull was called and the stale index refreshed
     mock_github_helper.repo.create_pull.assert_called_once()
+    mock_github_helper.refresh_open_pull_request.assert_called_once_with("feature-branch")
+    mock_github_helper.pull_request_index.add.assert_not_called()
 
 
-@patch("fastgithub.recipes.github.autocreate_pr.GithubHelper")
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
 def test_autocreate_pr_github_exception_other_status_raised(
-    mock_github_helper_class, autocreate_pr_recipe, push_payload, mock_github_helper
+    mock_helper, autocreate_pr_recipe, branch_push_payload, mock_github_helper
 ):
     """Test that GithubException with status other than 422 is raised."""
     # Setup mocks
-    mock_github_helper_class.return_value = mock_github_helper
-    mock_github_helper.repo.default_branch = "main"
-    mock_github_helper.repo.get_commits.return_value = [
-        MagicMock(commit=MagicMock(message="Test commit"))
-    ]
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+    mock_github_helper.get_head_commit_message.return_value = "Test commit"
 
     # Mock GithubException with status 500
     mock_github_helper.repo.create_pull.side_effect = GithubException(500, {}, {})
 
     # Should raise the exception
     with pytest.raises(GithubException) as exc_info:
-        autocreate_pr_recipe._process_push(push_payload)
+        autocreate_pr_recipe._process_push(branch_push_payload)
 
     assert exc_info.value.status == 500
 
 
-@patch("fastgithub.recipes.github.autocreate_pr.GithubHelper")
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
 def test_autocreate_pr_uses_commit_message_as_title_when_no_title_provided(
-    mock_github_helper_class, autocreate_pr_recipe, push_payload, mock_github_helper
+    mock_helper, autocreate_pr_recipe, branch_push_payload, mock_github_helper
 ):
     """Test that commit message is used as title when no title is provided."""
     # Setup mocks
-    mock_github_helper_class.return_value = mock_github_helper
-    mock_github_helper.repo.default_branch = "main"
-    mock_commit = MagicMock(commit=MagicMock(message="Amazing feature commit"))
-    mock_github_helper.repo.get_commits.return_value = [mock_commit]
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+    mock_github_helper.get_head_commit_message.return_value = "Amazing feature commit"
     mock_github_helper.repo.create_pull.return_value = MagicMock()
 
     # Call without title parameter
-    autocreate_pr_recipe._process_push(push_payload)
+    autocreate_pr_recipe._process_push(branch_push_payload)
 
-    # Verify get_commits was called to get the commit message
-    mock_github_helper.repo.get_commits.assert_called_once_with(sha=push_payload["ref"])
+    # Verify the head commit message was resolved from the payload first
+    mock_github_helper.get_head_commit_message.assert_called_once_with(
+        branch_push_payload["ref"], branch_push_payload
+    )
 
     # Verify PR creation uses commit message as title
     mock_github_helper.repo.create_pull.assert_called_once_with(
         base="main",
-        head=push_payload["ref"],
+        head=branch_push_payload["ref"],
         title="Amazing feature commit",
         body="Created by FastGitHub",
         draft=True,
     )
 
 
-@patch("fastgithub.recipes.github.autocreate_pr.GithubHelper")
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
 def test_autocreate_pr_uses_custom_base_branch(
-    mock_github_helper_class, autocreate_pr_recipe, push_payload, mock_github_helper
+    mock_helper, autocreate_pr_recipe, branch_push_payload, mock_github_helper
 ):
     """Test that custom base_branch is used instead of default branch."""
     # Setup mocks
-    mock_github_helper_class.return_value = mock_github_helper
-    mock_github_helper.repo.default_branch = "main"
-    mock_github_helper.repo.get_commits.return_value = [
-        MagicMock(commit=MagicMock(message="Test commit"))
-    ]
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+    mock_github_helper.get_head_commit_message.return_value = "Test commit"
     mock_github_helper.repo.create_pull.return_value = MagicMock()
 
     # Call with custom base_branch
-    autocreate_pr_recipe._process_push(push_payload, base_branch="custom-branch")
+    autocreate_pr_recipe._process_push(branch_push_payload, base_branch="custom-branch")
 
     # Verify PR creation uses custom base branch
     mock_github_helper.repo.create_pull.assert_called_once_with(
         base="custom-branch",
-        head=push_payload["ref"],
+        head=branch_push_payload["ref"],
         title="Test commit",
         body="Created by FastGitHub",
         draft=True,
     )
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"ref": "refs/tags/v1.0.0"},
+        {"ref": "refs/heads/main"},
+        {"deleted": True},
+    ],
+)
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
+def test_autocreate_pr_skips_pushes_that_cannot_be_a_pr_head(
+    mock_helper,
+    autocreate_pr_recipe,
+    sample_push_payload,
+    mock_github_helper,
+    changes,
+):
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+
+    autocreate_pr_recipe._process_push({**sample_push_payload, **changes})
+
+    mock_github_helper.raise_for_rate_excess.assert_not_called()
+    mock_github_helper.repo.create_pull.assert_not_called()
+
+
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
+def test_autocreate_pr_skips_branches_with_an_open_pr(
+    mock_helper, autocreate_pr_recipe, sample_push_payload, mock_github_helper
+):
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+    mock_github_helper.get_open_pull_request.return_value = 42
+
+    autocreate_pr_recipe._process_push(sample_push_payload)
+
+    mock_github_helper.get_open_pull_request.assert_called_once_with("feature-branch")
+    mock_github_helper.repo.create_pull.assert_not_called()
+
+
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
+def test_autocreate_pr_indexes_created_pr(
+    mock_helper, autocreate_pr_recipe, sample_push_payload, mock_github_helper
+):
+    mock_helper.return_value = mock_github_helper
+    mock_github_helper.get_default_branch.return_value = "main"
+    mock_github_helper.repo.create_pull.return_value = MagicMock(number=7)
+
+    autocreate_pr_recipe._process_push(sample_push_payload)
+
+    mock_github_helper.pull_request_index.add.assert_called_once_with("feature-branch", 7)
+
+
+@patch("fastgithub.recipes.github.autocreate_pr.AutoCreatePullRequest.helper")
+def test_autocreate_pr_updates_index_on_pull_request_events(
+    mock_helper, autocreate_pr_recipe, sample_pull_request_payload, mock_github_helper
+):
+    mock_helper.return_value = mock_github_helper
+
+    autocreate_pr_recipe._process_pull_request(sample_pull_request_payload)
+
+    mock_github_helper.update_pull_request_index.assert_called_once_with(
+        sample_pull_request_payload
+    )
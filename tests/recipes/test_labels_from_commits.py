@@ -2,6 +2,8 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from fastgithub.helpers.github import PullRequestLabels
+from fastgithub.recipes.github.autocreate_pr import AutoCreatePullRequest
 from fastgithub.recipes.github.labels_from_commits import LabelsFromCommits
 
 
@@ -14,8 +16,10 @@ def labels_from_commits_recipe(mock_github, custom_labels_config):
 def test_labels_from_commits_events_property(labels_from_commits_recipe):
     """Test that the recipe exposes the correct events."""
     events = labels_from_commits_recipe.events
-    assert "pull_request" in events
-    assert events["pull_request"] == labels_from_commits_recipe._process_push
+    for action in ["opened", "reopened", "synchronize"]:
+        assert events[f"pull_request.{action}"] == labels_from_commits_recipe._process_push
+    assert "pull_request" not in events
+    assert events["label"] == labels_from_commits_recipe._process_label
 
 
 def test_labels_from_commits_initialization_with_custom_config(mock_github, custom_labels_config):
@@ -29,16 +33,22 @@ def test_labels_from_commits_initialization_with_default_config(mock_github):
     recipe = LabelsFromCommits(mock_github)
     # Should use the default LABEL_CONFIG from _config.py
     assert recipe.labels_config is not None
+    assert recipe.label_matcher.labels_config is recipe.labels_config
 
 
-@patch("fastgithub.recipes.github.labels_from_commits.GithubHelper")
+def test_labels_from_commits_validates_config_at_initialization(mock_github):
+    with pytest.raises(ValueError):
+        LabelsFromCommits(mock_github, {"#Invalid": []})
+
+
+@patch("fastgithub.recipes.github.labels_from_commits.LabelsFromCommits.helper")
 def test_labels_from_commits_successful_label_extraction(
-    mock_github_helper_class,
+    mock_helper,
     labels_from_commits_recipe,
     sample_pull_request_payload,
     mock_github_helper,
 ):
-    mock_github_helper_class.return_value = mock_github_helper
+    mock_helper.return_value = mock_github_helper
     mock_pr = MagicMock()
     mock_github_helper.repo.get_pull.return_value = mock_pr
     mock_github_helper.extract_labels_from_pr.return_value = {"bug", "feature"}
@@ -46,25 +56,23 @@ def test_labels_from_commits_successful_label_extraction(
 
     labels_from_commits_recipe._process_push(sample_pull_request_payload)
 
-    mock_github_helper_class.assert_called_once_with(
-        labels_from_commits_recipe.github, sample_pull_request_payload["repository"]["full_name"]
-    )
+    mock_helper.assert_called_once_with(sample_pull_request_payload)
     mock_github_helper.raise_for_rate_excess.assert_called_once()
     mock_github_helper.repo.get_pull.assert_called_once_with(sample_pull_request_payload["number"])
     mock_github_helper.extract_labels_from_pr.assert_called_once_with(
-        mock_pr, labels_from_commits_recipe.labels_config
+        mock_pr, labels_from_commits_recipe.label_matcher
     )
     mock_github_helper.add_labels_to_pr.assert_called_once_with(mock_pr, {"bug", "feature"})
 
 
-@patch("fastgithub.recipes.github.labels_from_commits.GithubHelper")
+@patch("fastgithub.recipes.github.labels_from_commits.LabelsFromCommits.helper")
 def test_labels_from_commits_no_labels_extracted(
-    mock_github_helper_class,
+    mock_helper,
     labels_from_commits_recipe,
     sample_pull_request_payload,
     mock_github_helper,
 ):
-    mock_github_helper_class.return_value = mock_github_helper
+    mock_helper.return_value = mock_github_helper
     mock_pr = MagicMock()
     mock_github_helper.repo.get_pull.return_value = mock_pr
     mock_github_helper.extract_labels_from_pr.return_value = set()
@@ -76,12 +84,12 @@ def test_labels_from_commits_no_labels_extracted(
     mock_github_helper.add_labels_to_pr.assert_not_called()
 
 
-@patch("fastgithub.recipes.github.labels_from_commits.GithubHelper")
+@patch("fastgithub.recipes.github.labels_from_commits.LabelsFromCommits.helper")
 def test_labels_from_commits_with_default_config(
-    mock_github_helper_class, mock_github, sample_pull_request_payload, mock_github_helper
+    mock_helper, mock_github, sample_pull_request_payload, mock_github_helper
 ):
     recipe = LabelsFromCommits(mock_github)
-    mock_github_helper_class.return_value = mock_github_helper
+    mock_helper.return_value = mock_github_helper
     mock_pr = MagicMock()
     mock_github_helper.repo.get_pull.return_value = mock_pr
     mock_github_helper.extract_labels_from_pr.return_value = {"nodraft"}
@@ -90,11 +98,11 @@ def test_labels_from_commits_with_default_config(
     recipe._process_push(sample_pull_request_payload)
 
     mock_github_helper.extract_labels_from_pr.assert_called_once_with(
-        mock_pr, recipe.labels_config
+        mock_pr, recipe.label_matcher
     )
 
 
-@patch("fastgithub.recipes.github.labels_from_commits.GithubHelper")
+@patch("fastgithub.recipes.github.labels_from_commits.LabelsFromCommits.helper")
 @pytest.mark.parametrize(
     "action",
     [
@@ -115,10 +123,10 @@ def test_labels_from_commits_with_default_config(
     ],
 )
 def test_labels_from_commits_with_pull_request_action(
-    mock_github_helper_class, mock_github, all_pull_request_payloads, mock_github_helper, action
+    mock_helper, mock_github, all_pull_request_payloads, mock_github_helper, action
 ):
     recipe = LabelsFromCommits(mock_github)
-    mock_github_helper_class.return_value = mock_github_helper
+    mock_helper.return_value = mock_github_helper
     mock_pr = MagicMock()
     mock_github_helper.repo.get_pull.return_value = mock_pr
     mock_github_helper.extract_labels_from_pr.return_value = {"bug"}
@@ -127,12 +135,64 @@ def test_labels_from_commits_with_pull_request_action(
     payload = all_pull_request_payloads[action]
     recipe._process_push(payload)
 
-    mock_github_helper_class.assert_called_once_with(
-        recipe.github, payload["repository"]["full_name"]
-    )
+    mock_helper.assert_called_once_with(payload)
     mock_github_helper.raise_for_rate_excess.assert_called_once()
     mock_github_helper.repo.get_pull.assert_called_once_with(payload["number"])
     mock_github_helper.extract_labels_from_pr.assert_called_once_with(
-        mock_pr, recipe.labels_config
+        mock_pr, recipe.label_matcher
     )
     mock_github_helper.add_labels_to_pr.assert_called_once_with(mock_pr, {"bug"})
+
+
+@patch("fastgithub.recipes.github.labels_from_commits.LabelsFromCommits.helper")
+def test_labels_from_commits_with_graphql(
+    mock_helper, mock_github, custom_labels_config, sample_pull_request_payload, mock_github_helper
+):
+    recipe = LabelsFromCommits(mock_github, custom_labels_config, use_graphql=True)
+    mock_helper.return_value = mock_github_helper
+    pr_labels = PullRequestLabels("PR_1", frozenset({"bug"}), ["#bug #feature"], {})
+    mock_github_helper.get_pull_request_labels.return_value = pr_labels
+    mock_github_helper.extract_labels_from_messages.return_value = {
+        "bug": "LA_bug",
+        "feature": "LA_feature",
+    }
+
+    recipe._process_push(sample_pull_request_payload)
+
+    mock_github_helper.get_pull_request_labels.assert_called_once_with(
+        sample_pull_request_payload["number"]
+    )
+    mock_github_helper.extract_labels_from_messages.assert_called_once_with(
+        ["#bug #feature"], recipe.label_matcher, {}
+    )
+    mock_github_helper.add_labels_to_labelable.assert_called_once_with("PR_1", ["LA_feature"])
+    mock_github_helper.repo.get_pull.assert_not_called()
+
+
+@patch("fastgithub.recipes.github.labels_from_commits.LabelsFromCommits.helper")
+def test_labels_from_commits_updates_label_cache_on_label_event(
+    mock_helper, labels_from_commits_recipe, mock_github_helper
+):
+    mock_helper.return_value = mock_github_helper
+    payload = {
+        "action": "created",
+        "label": {"name": "bug", "color": "d73a4a", "description": None},
+        "repository": {"full_name": "owner/repo"},
+    }
+
+    labels_from_commits_recipe._process_label(payload)
+
+    mock_github_helper.update_label_cache.assert_called_once_with(payload)
+    mock_github_helper.raise_for_rate_excess.assert_not_called()
+
+
+def test_labels_from_commits_shares_helpers_with_other_recipes(
+    labels_from_commits_recipe, mock_github, sample_pull_request_payload
+):
+    other_recipe = AutoCreatePullRequest(mock_github)
+    helper = labels_from_commits_recipe.helper(sample_pull_request_payload)
+    assert other_recipe.helper(sample_pull_request_payload) is helper
+    assert (
+        helper.label_cache
+        is labels_from_commits_recipe.helper(sample_pull_request_payload).label_cache
+    )
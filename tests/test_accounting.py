@@ -0,0 +1,83 @@
+import logging
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastgithub import AsyncGithubClient, GithubWebhookHandler, Recipe, webhook_router
+from fastgithub.accounting import ApiBudgetExceededError
+from fastgithub.types import Payload
+from fastgithub.webhook.results import RecipeStatus
+
+
+def respond(request: httpx.Request) -> httpx.Response:
+    headers = {"X-RateLimit-Resource": "graphql" if request.url.path == "/graphql" else "core"}
+    return httpx.Response(200, json={}, headers=headers)
+
+
+class Labeler(Recipe):
+    api_budget = 10
+
+    def __init__(self, calls: int) -> None:
+        self.calls = calls
+
+    @property
+    def events(self):
+        return {"pull_request": self.__call__}
+
+    async def __call__(self, payload: Payload) -> None:
+        async with AsyncGithubClient(
+            "token", base_url="https://api.github.test", transport=httpx.MockTransport(respond)
+        ) as client:
+            for _ in range(self.calls):
+                await client.get("/repos/owner/repo/labels/bug")
+            await client.post("/graphql", json={})
+
+
+PAYLOAD = {
+    "action": "synchronize",
+    "number": 123,
+    "pull_request": {"number": 123, "head": {"ref": "feature"}},
+    "repository": {"full_name": "owner/repo"},
+}
+
+
+def test_calls_are_logged_per_recipe_and_delivery(caplog):
+    webhook_handler = GithubWebhookHandler(signature_verification=None)
+    webhook_handler.plan([Labeler(calls=3)])
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    with caplog.at_level(logging.INFO, logger="fastgithub.accounting"), TestClient(app) as client:
+        headers = {"X-GitHub-Event": "pull_request", "X-GitHub-Delivery": "delivery-1"}
+        assert client.post("/postreceive", json=PAYLOAD, headers=headers).is_success
+
+    (record,) = caplog.records
+    assert record.api_calls == {  # type: ignore
+        "recipe": "Labeler",
+        "delivery_id": "delivery-1",
+        "event": "pull_request",
+        "target": "owner/repo#123",
+        "calls": 4,
+        "duration": record.api_calls["duration"],  # type: ignore
+        "quota": 4,
+        "endpoints": {"GET /repos/owner/repo/labels/bug": 3, "POST /graphql": 1},
+    }
+
+
+async def test_budget_aborts_the_recipe():
+    webhook_handler = GithubWebhookHandler(signature_verification=None, api_budget=100)
+    webhook_handler.plan([Labeler(calls=20)])
+
+    (result,) = await webhook_handler.run_recipes("pull_request", PAYLOAD)
+    assert result.status == RecipeStatus.FAILURE
+    assert isinstance(result.error, ApiBudgetExceededError)
+    assert result.api_calls == Labeler.api_budget
+
+    unbounded = Labeler(calls=20)
+    unbounded.api_budget = None  # the budget of the handler applies
+    webhook_handler = GithubWebhookHandler(signature_verification=None, api_budget=100)
+    webhook_handler.plan([unbounded])
+    (result,) = await webhook_handler.run_recipes("pull_request", PAYLOAD)
+    assert result.status == RecipeStatus.SUCCESS
+    assert result.api_calls == 21
@@ -0,0 +1,290 @@
+import asyncio
+import collections
+import socketserver
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastgithub import (
+    GithubWebhookHandler,
+    MemoryBroker,
+    MemoryDeliveryStore,
+    RedisBroker,
+    RedisDeliveryStore,
+    SQLiteEventJournal,
+    webhook_router,
+)
+from fastgithub.types import Payload
+from fastgithub.webhook import handler
+from fastgithub.webhook.broker import Broker, BrokerError
+from fastgithub.webhook.delivery import Delivery
+
+
+class RedisStandIn(socketserver.StreamRequestHandler):
+    """A local stand-in of a Redis server, with the commands used by fastgithub."""
+
+    lists: dict[bytes, collections.deque] = collections.defaultdict(collections.deque)
+    keys: dict[bytes, tuple[bytes, float]] = {}
+    errors: dict[str, str] = {}
+    condition = threading.Condition()
+
+    def handle(self):
+        while line := self.rfile.readline():
+            args = [self._read_bulk() for _ in range(int(line[1:]))]
+            try:
+                reply = self._execute(args[0].upper().decode(), *args[1:])
+            except Exception as ex:
+                self.wfile.write(b"-%s\r\n" % str(ex).encode())
+                continue
+            self.wfile.write(self._encode(reply))
+
+    def _read_bulk(self) -> bytes:
+        length = int(self.rfile.readline()[1:])
+        return self.rfile.read(length + 2)[:-2]
+
+    def _encode(self, reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return b"+%s\r\n" % reply.encode()
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    def _execute(self, command: str, *args: bytes):
+        if command in self.errors:
+            raise ValueError(self.errors[command])
+        with self.condition:
+            if command in ("PING", "SELECT"):
+                return "OK"
+            if command == "LPUSH":
+                self.lists[args[0]].extendleft(args[1:])
+                self.condition.notify_all()
+                return len(self.lists[args[0]])
+            if command == "LLEN":
+                return len(self.lists[args[0]])
+            if command == "LREM":
+                items = self.lists[args[0]]
+                if args[2] in items:
+                    items.remove(args[2])
+                    return 1
+                return 0
+            if command in ("LMOVE", "BLMOVE"):
+                source, destination, where_from, where_to = args[:4]
+                deadline = time.monotonic() + (float(args[4]) if command == "BLMOVE" else 0)
+                while not self.lists[source]:
+                    if not self.condition.wait(deadline - time.monotonic()):
+                        return None
+                items = self.lists[source]
+                item = items.pop() if where_from == b"RIGHT" else items.popleft()
+                if where_to == b"RIGHT":
+                    self.lists[destination].append(item)
+                else:
+                    self.lists[destination].appendleft(item)
+                return item
+            if command == "SET":
+                key, value, *options = args
+                if b"NX" in options and self.keys.get(key, (b"", 0))[1] > time.time():
+                    return None
+                ttl = int(options[options.index(b"PX") + 1]) / 1000
+                self.keys[key] = (value, time.time() + ttl)
+                return "OK"
+            if command == "DEL":
+                return int(self.keys.pop(args[0], None) is not None)
+        raise ValueError(f"ERR unknown command '{command}'")
+
+
+@pytest.fixture
+def redis_url():
+    RedisStandIn.lists.clear()
+    RedisStandIn.keys.clear()
+    RedisStandIn.errors.clear()
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RedisStandIn)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    # the stand-in speaks RESP2 only
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0?protocol=2"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def broker(request, redis_url) -> Broker:
+    if request.param == "memory":
+        return MemoryBroker()
+    return RedisBroker(redis_url, consumer="worker")
+
+
+@pytest.mark.asyncio
+async def test_deliveries_are_consumed_in_order(broker: Broker):
+    await broker.start()
+    for i in range(3):
+        await broker.publish(Delivery("push", {"number": i}, f"delivery-{i}"))
+    assert await broker.size() == 3
+
+    for i in range(3):
+        message = await broker.consume(timeout=1)
+        assert message is not None
+        assert message.delivery.payload == {"number": i}
+        assert message.delivery.delivery_id == f"delivery-{i}"
+        await broker.ack(message)
+
+    assert await broker.consume(timeout=0.05) is None
+    await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_deliveries_are_recovered(redis_url):
+    broker = RedisBroker(redis_url, consumer="worker")
+    await broker.start()
+    await broker.publish(Delivery("push", {"number": 1}))
+    await broker.publish(Delivery("push", {"number": 2}))
+    assert (await broker.consume(timeout=1)).delivery.payload == {"number": 1}  # type: ignore
+    await broker.close()  # the worker crashes before the acknowledgement
+
+    broker = RedisBroker(redis_url, consumer="worker")
+    await broker.start()
+    message = await broker.consume(timeout=1)
+    assert message.delivery.payload == {"number": 1}  # type: ignore
+    await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_full_broker_rejects_deliveries(redis_url):
+    broker = RedisBroker(redis_url, maxsize=1)
+    await broker.publish(Delivery("push", {}))
+    with pytest.raises(asyncio.QueueFull):
+        await broker.publish(Delivery("push", {}))
+    assert await broker.size() == 1
+    await broker.close()
+
+
+async def test_redis_errors_are_raised_as_broker_errors(redis_url):
+    broker = RedisBroker(redis_url)
+    RedisStandIn.errors["LPUSH"] = "OOM command not allowed when used memory > 'maxmemory'"
+    with pytest.raises(BrokerError):
+        await broker.publish(Delivery("push", {}))
+    RedisStandIn.errors["BLMOVE"] = "READONLY You can't write against a read only replica."
+    with pytest.raises(BrokerError):
+        await broker.consume(timeout=0.05)
+    await broker.close()
+
+
+class UnavailableBroker(MemoryBroker):
+    """A broker failing to publish the first `failures` deliveries."""
+
+    def __init__(self, failures: int) -> None:
+        super().__init__()
+        self.failures = failures
+
+    async def publish(self, delivery: Delivery) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise BrokerError("READONLY You can't write against a read only replica.")
+        await super().publish(delivery)
+
+
+def test_failed_publication_can_be_redelivered(tmp_path):
+    journal = SQLiteEventJournal(tmp_path / "journal.db")
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None,
+        deduplication=MemoryDeliveryStore(),
+        journal=journal,
+        broker=UnavailableBroker(failures=1),
+        broker_workers=0,
+    )
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    headers = {"X-GitHub-Event": "push", "X-GitHub-Delivery": "delivery"}
+
+    with TestClient(app) as client:
+        assert client.post("/postreceive", json={}, headers=headers).status_code == 503
+        # the redelivery is not a duplicate
+        assert client.post("/postreceive", json={}, headers=headers).status_code == 202
+
+    # the failed publication stays unfinished, to be replayed on the next startup
+    assert len(journal) == 1
+    journal.close()
+
+
+def test_replay_waits_for_the_broker(tmp_path, monkeypatch):
+    monkeypatch.setattr(handler, "REPLAY_RETRY_INTERVAL", 0.01)
+    path = tmp_path / "journal.db"
+    journal = SQLiteEventJournal(path)
+
+    async def crash() -> None:
+        await journal.start()
+        await journal.append(Delivery("push", {"ref": "refs/heads/main"}, "lost"))
+        await journal.stop()
+
+    asyncio.run(crash())
+    journal.close()
+
+    journal = SQLiteEventJournal(path)
+    broker = UnavailableBroker(failures=2)
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, journal=journal, broker=broker, broker_workers=0
+    )
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    with TestClient(app):
+        deadline = time.time() + 5
+        while not broker._queue.qsize() and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert broker.failures == 0
+    assert broker._queue.get_nowait().delivery_id == "lost"
+    journal.close()
+
+
+async def test_redis_delivery_store_is_shared(redis_url):
+    foo = RedisDeliveryStore(redis_url)
+    bar = RedisDeliveryStore(redis_url)
+    assert await foo.is_duplicate("delivery") is False
+    assert await bar.is_duplicate("delivery") is True
+    await bar.discard("delivery")
+    assert await foo.is_duplicate("delivery") is False
+    await foo.close()
+    await bar.close()
+
+
+def test_handler_requires_a_single_backend():
+    with pytest.raises(ValueError):
+        GithubWebhookHandler(None, queue=object(), broker=MemoryBroker())  # type: ignore
+
+
+def test_front_end_and_workers_share_the_broker(redis_url):
+    front_end = GithubWebhookHandler(
+        signature_verification=None, broker=RedisBroker(redis_url), broker_workers=0
+    )
+    worker = GithubWebhookHandler(
+        signature_verification=None, broker=RedisBroker(redis_url, consumer="worker")
+    )
+    calls = []
+
+    @worker.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append(payload["after"])
+
+    front_end_app = FastAPI()
+    front_end_app.include_router(webhook_router(handler=front_end, path="/postreceive"))
+    worker_app = FastAPI()
+    worker_app.include_router(webhook_router(handler=worker, path="/postreceive"))
+
+    with TestClient(front_end_app) as client, TestClient(worker_app):
+        for after in ("a", "b"):
+            response = client.post(
+                "/postreceive", json={"after": after}, headers={"X-GitHub-Event": "push"}
+            )
+            assert response.status_code == 202
+
+        deadline = time.time() + 5
+        while len(calls) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert calls == ["a", "b"]
+    assert RedisStandIn.lists[b"fastgithub:processing:worker"] == collections.deque()
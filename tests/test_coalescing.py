@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastgithub import EventCoalescer, GithubWebhookHandler, webhook_router
+from fastgithub.types import Payload
+from fastgithub.webhook.delivery import Delivery
+
+
+def push(ref: str, after: str, repo: str = "owner/repo") -> Payload:
+    return {"ref": ref, "after": after, "repository": {"full_name": repo}}
+
+
+def synchronize(number: int, head_repo: str, after: str) -> Payload:
+    return {
+        "action": "synchronize",
+        "after": after,
+        "pull_request": {
+            "number": number,
+            "head": {"ref": "feature", "repo": {"full_name": head_repo}},
+        },
+        "repository": {"full_name": "owner/repo"},
+    }
+
+
+def test_delivery_target():
+    assert (
+        Delivery("push", push("refs/heads/feature", "a")).target == "owner/repo:refs/heads/feature"
+    )
+    assert Delivery("create", push("feature", "a")).target == "owner/repo:refs/heads/feature"
+    assert Delivery("pull_request", synchronize(1, "owner/repo", "a")).target == (
+        "owner/repo:refs/heads/feature"
+    )
+    assert Delivery("pull_request", synchronize(1, "fork/repo", "a")).target == "owner/repo#1"
+    assert Delivery("ping", {"zen": "Keep it simple."}).target is None
+
+
+def test_only_superseded_events_are_coalesced():
+    coalescer = EventCoalescer()
+    assert coalescer.default_key(Delivery("push", push("refs/heads/feature", "a"))) is not None
+    assert coalescer.default_key(Delivery("pull_request", synchronize(1, "owner/repo", "a")))
+    opened = {**synchronize(1, "owner/repo", "a"), "action": "opened"}
+    assert coalescer.default_key(Delivery("pull_request", opened)) is None
+    assert coalescer.default_key(Delivery("push", {})) is None
+
+
+@pytest.mark.asyncio
+async def test_latest_delivery_of_a_window_is_dispatched():
+    coalescer = EventCoalescer(window=0.05)
+    dispatched = []
+
+    async def dispatch(delivery: Delivery) -> bool:
+        dispatched.append(delivery.payload["after"])
+        return True
+
+    await coalescer.start(dispatch)
+    for after in "abc":
+        assert coalescer.submit(Delivery("push", push("refs/heads/feature", after))) is True
+    assert coalescer.submit(Delivery("push", push("refs/heads/other", "d"))) is True
+    assert coalescer.submit(Delivery("ping", {})) is False
+    assert len(coalescer) == 2
+
+    await asyncio.sleep(0.1)
+    assert sorted(dispatched) == ["c", "d"]
+    stats = coalescer.stats()
+    assert (stats.pending, stats.submitted, stats.dispatched, stats.coalesced) == (0, 4, 2, 2)
+
+
+@pytest.mark.asyncio
+async def test_stop_dispatches_pending_deliveries():
+    coalescer = EventCoalescer(window=60)
+    dispatched = []
+
+    async def dispatch(delivery: Delivery) -> bool:
+        dispatched.append(delivery.payload["after"])
+        return True
+
+    assert coalescer.submit(Delivery("push", push("refs/heads/feature", "a"))) is False
+    await coalescer.start(dispatch)
+    coalescer.submit(Delivery("push", push("refs/heads/feature", "b")))
+    await coalescer.stop()
+    assert dispatched == ["b"]
+    assert coalescer.running is False
+
+
+def test_handler_runs_recipes_once_per_burst():
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, coalescer=EventCoalescer(window=60)
+    )
+    processed = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        processed.append(payload["after"])
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+
+    with TestClient(app) as client:
+        for after in "abc":
+            response = client.post(
+                "/postreceive",
+                json=push("refs/heads/feature", after),
+                headers={"X-GitHub-Event": "push"},
+            )
+            assert response.status_code == 202
+            assert response.json() == {"status": "accepted"}
+        assert processed == []
+
+    # the lifespan flushed the coalescer on shutdown
+    assert processed == ["c"]
@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastgithub import (
+    DeliveryQueue,
+    GithubWebhookHandler,
+    MemoryDeliveryStore,
+    SQLiteDeliveryStore,
+    webhook_router,
+)
+from fastgithub.types import Payload
+from fastgithub.webhook.deduplication import DeliveryStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def delivery_store(request, tmp_path) -> DeliveryStore:
+    if request.param == "memory":
+        return MemoryDeliveryStore()
+    return SQLiteDeliveryStore(tmp_path / "deliveries.db")
+
+
+async def test_duplicates_are_detected(delivery_store: DeliveryStore):
+    assert await delivery_store.is_duplicate("foo") is False
+    assert await delivery_store.is_duplicate("bar") is False
+    assert await delivery_store.is_duplicate("foo") is True
+    assert delivery_store.duplicates == 1
+
+
+async def test_discarded_deliveries_are_not_duplicates(delivery_store: DeliveryStore):
+    await delivery_store.is_duplicate("foo")
+    await delivery_store.discard("foo")
+    assert await delivery_store.is_duplicate("foo") is False
+
+
+async def test_deliveries_expire_after_ttl(delivery_store: DeliveryStore):
+    delivery_store.ttl = 0.01
+    await delivery_store.is_duplicate("foo")
+    await asyncio.sleep(0.02)
+    assert await delivery_store.is_duplicate("foo") is False
+    assert len(delivery_store) == 1  # type: ignore
+
+
+async def test_memory_store_is_bounded():
+    delivery_store = MemoryDeliveryStore(maxsize=2)
+    for delivery_id in ["foo", "bar", "baz"]:
+        await delivery_store.is_duplicate(delivery_id)
+    assert len(delivery_store) == 2
+    assert await delivery_store.is_duplicate("foo") is False
+
+
+async def test_sqlite_store_is_shared_between_instances(tmp_path):
+    assert await SQLiteDeliveryStore(tmp_path / "deliveries.db").is_duplicate("foo") is False
+    assert await SQLiteDeliveryStore(tmp_path / "deliveries.db").is_duplicate("foo") is True
+
+
+@pytest.mark.parametrize("queue", [None, DeliveryQueue()])
+def test_handler_acknowledges_duplicates_without_dispatch(queue: DeliveryQueue | None):
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, queue=queue, deduplication=MemoryDeliveryStore()
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append(payload)
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    headers = {"X-GitHub-Event": "push", "X-GitHub-Delivery": "72d3162e"}
+
+    with TestClient(app) as client:
+        assert client.post("/postreceive", json={}, headers=headers).status_code in (200, 202)
+        response = client.post("/postreceive", json={}, headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"status": "duplicate"}
+
+    assert len(calls) == 1
+    assert webhook_handler.deduplication.duplicates == 1  # type: ignore
+
+
+def test_handler_processes_redelivery_of_failed_delivery():
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, deduplication=MemoryDeliveryStore()
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    headers = {"X-GitHub-Event": "push", "X-GitHub-Delivery": "72d3162e"}
+
+    with TestClient(app) as client:
+        assert client.post("/postreceive", json={}, headers=headers).status_code == 400
+        assert client.post("/postreceive", json={}, headers=headers).status_code == 200
+
+    assert len(calls) == 2
+
+
+async def test_sqlite_store_waits_for_locks_off_the_event_loop(tmp_path):
+    delivery_store = SQLiteDeliveryStore(tmp_path / "deliveries.db")
+    other_worker = sqlite3.connect(tmp_path / "deliveries.db", isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+
+    task = asyncio.create_task(delivery_store.is_duplicate("foo"))
+    await asyncio.sleep(0.05)
+    assert not task.done()
+    other_worker.execute("COMMIT")
+    assert await task is False
+    other_worker.close()
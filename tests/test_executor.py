@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from fastgithub import GithubWebhookHandler, RateLimitScheduler, RecipeExecutor
+from fastgithub.types import Payload
+
+
+@pytest.fixture
+def executor():
+    executor = RecipeExecutor(max_workers=4, max_concurrency=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_pool_and_max_workers_are_exclusive():
+    with pytest.raises(ValueError):
+        RecipeExecutor(pool=ThreadPoolExecutor(), max_workers=2)
+
+
+def test_max_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        RecipeExecutor(max_concurrency=0)
+
+
+@pytest.mark.asyncio
+async def test_sync_recipe_runs_off_the_event_loop(executor: RecipeExecutor):
+    def foo(payload: Payload) -> str:
+        return threading.current_thread().name
+
+    thread_name = await executor.run(foo, {})
+    assert thread_name != threading.current_thread().name
+    assert thread_name.startswith("fastgithub")
+
+
+@pytest.mark.asyncio
+async def test_async_recipe_is_awaited_on_the_event_loop(executor: RecipeExecutor):
+    async def foo(payload: Payload) -> str:
+        return threading.current_thread().name
+
+    assert await executor.run(foo, {}) == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_slow_sync_recipes_do_not_block_each_other(executor: RecipeExecutor):
+    webhook_handler = GithubWebhookHandler(signature_verification=None, executor=executor)
+    barrier = threading.Barrier(2, timeout=5)
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        barrier.wait()
+
+    statuses = await asyncio.gather(
+        webhook_handler.process_event("push", {}),
+        webhook_handler.process_event("push", {}),
+    )
+    assert statuses == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency_limits_concurrent_deliveries(executor: RecipeExecutor):
+    webhook_handler = GithubWebhookHandler(signature_verification=None, executor=executor)
+    running = 0
+    peak = 0
+
+    @webhook_handler.listen("push")
+    async def foo(payload: Payload) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await asyncio.gather(*(webhook_handler.process_event("push", {}) for _ in range(6)))
+    assert peak == executor.max_concurrency
+
+
+@pytest.mark.asyncio
+async def test_async_recipe_is_awaited_without_executor():
+    webhook_handler = GithubWebhookHandler(signature_verification=None)
+    calls = []
+
+    @webhook_handler.listen("push")
+    async def foo(payload: Payload) -> None:
+        calls.append(payload)
+
+    assert await webhook_handler.process_event("push", {"foo": "bar"}) is True
+    assert calls == [{"foo": "bar"}]
+
+
+@pytest.mark.asyncio
+async def test_slot_is_kept_until_a_timed_out_worker_finishes():
+    executor = RecipeExecutor(max_workers=2, max_concurrency=1)
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, executor=executor, recipe_timeout=0.01
+    )
+    release = threading.Event()
+    workers = 0
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        nonlocal workers
+        workers += 1
+        release.wait(5)
+
+    assert await webhook_handler.process_event("push", {}) is False
+    second = asyncio.create_task(webhook_handler.process_event("push", {}))
+    await asyncio.sleep(0.05)
+    assert workers == 1  # the first worker still holds the slot
+
+    release.set()
+    await second
+    assert workers == 2
+    executor.shutdown()
+
+
+def test_process_pool_rejects_the_context_dependent_features():
+    executor = RecipeExecutor(pool=ProcessPoolExecutor(max_workers=1))
+    assert executor.propagates_context is False
+    with pytest.raises(ValueError):
+        GithubWebhookHandler(signature_verification=None, executor=executor, api_budget=10)
+    with pytest.raises(ValueError):
+        GithubWebhookHandler(
+            signature_verification=None, executor=executor, scheduler=RateLimitScheduler()
+        )
+    executor.pool.shutdown()
@@ -1,8 +1,10 @@
+import asyncio
+import time
 from collections.abc import Callable
 
 import pytest
 
-from fastgithub import GithubWebhookHandler, Recipe, SignatureVerificationSHA256
+from fastgithub import GithubWebhookHandler, Recipe, RecipeStatus, SignatureVerificationSHA256
 from fastgithub.types import Payload
 
 
@@ -190,3 +192,73 @@ async def test_process_event_filtering_match_correct_events_with_plan_method(
     assert len(all_recipes) == 1
     assert all_recipes[0].__name__ == Baz.__call__.__name__
     assert isinstance(all_recipes[0].__self__, Baz)
+
+
+@pytest.mark.asyncio
+async def test_process_event_dispatch_on_payload_action(webhook_handler: GithubWebhookHandler):
+    calls = []
+
+    @webhook_handler.listen("pull_request.opened")
+    def foo(payload: Payload) -> None:
+        calls.append(payload["action"])
+
+    assert await webhook_handler.process_event("pull_request", {"action": "labeled"}) is True
+    assert await webhook_handler.process_event("pull_request", {"action": "opened"}) is True
+    assert calls == ["opened"]
+
+
+@pytest.mark.asyncio
+async def test_recipes_run_concurrently_and_isolated(webhook_handler: GithubWebhookHandler):
+    calls = []
+
+    @webhook_handler.listen("push")
+    async def slow(payload: Payload) -> None:
+        await asyncio.sleep(0.1)
+        calls.append("slow")
+
+    @webhook_handler.listen("push")
+    async def broken(payload: Payload) -> None:
+        raise ValueError("bug")
+
+    @webhook_handler.listen("push")
+    async def other_slow(payload: Payload) -> None:
+        await asyncio.sleep(0.1)
+        calls.append("other_slow")
+
+    start = time.perf_counter()
+    results = await webhook_handler.run_recipes("push", {})
+    assert time.perf_counter() - start < 0.19
+    assert [result.status for result in results] == [
+        RecipeStatus.SUCCESS,
+        RecipeStatus.FAILURE,
+        RecipeStatus.SUCCESS,
+    ]
+    assert isinstance(results[1].error, ValueError)
+    assert sorted(calls) == ["other_slow", "slow"]
+    assert await webhook_handler.process_event("push", {}) is False
+
+
+@pytest.mark.asyncio
+async def test_recipes_time_out():
+    webhook_handler = GithubWebhookHandler(signature_verification=None, recipe_timeout=0.05)
+
+    class Patient(Recipe):
+        timeout = 1.0
+
+        @property
+        def events(self) -> dict[str, Callable]:
+            return {"push": self.__call__}
+
+        async def __call__(self, payload: Payload) -> None:
+            await asyncio.sleep(0.1)
+
+    @webhook_handler.listen("push")
+    async def stuck(payload: Payload) -> None:
+        await asyncio.sleep(10)
+
+    webhook_handler.plan([Patient()])
+
+    results = await webhook_handler.run_recipes("push", {})
+    assert [result.status for result in results] == [RecipeStatus.TIMEOUT, RecipeStatus.SUCCESS]
+    assert results[0].duration < 1
+    assert await webhook_handler.process_event("push", {}) is False
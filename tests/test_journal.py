@@ -0,0 +1,190 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastgithub import (
+    DeliveryQueue,
+    EventCoalescer,
+    GithubWebhookHandler,
+    MemoryDeliveryStore,
+    RetryPolicy,
+    SQLiteEventJournal,
+    webhook_router,
+)
+from fastgithub.types import Payload
+from fastgithub.webhook.delivery import Delivery
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = SQLiteEventJournal(tmp_path / "journal.db")
+    yield journal
+    journal.close()
+
+
+def test_append_requires_a_started_journal(journal: SQLiteEventJournal):
+    with pytest.raises(RuntimeError):
+        asyncio.run(journal.append(Delivery("push", {})))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_are_grouped_in_commits(journal: SQLiteEventJournal):
+    await journal.start()
+    deliveries = [Delivery("push", {"number": i}, f"delivery-{i}") for i in range(500)]
+    journal_ids = await asyncio.gather(*(journal.append(delivery) for delivery in deliveries))
+    await journal.stop()
+
+    assert journal_ids == sorted(set(journal_ids))
+    assert [delivery.journal_id for delivery in deliveries] == journal_ids
+    stats = journal.stats()
+    assert stats.appended == 500
+    assert stats.commits < 50
+    assert stats.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_unfinished_deliveries_survive_a_restart(tmp_path, journal: SQLiteEventJournal):
+    await journal.start()
+    done = Delivery("push", {"number": 1}, "done")
+    in_flight = Delivery("pull_request", {"action": "opened"}, "in-flight")
+    await journal.append(done)
+    await journal.append(in_flight, b'{"action": "opened"}')
+    journal.complete(done)
+    await journal.stop()
+    journal.close()
+
+    journal = SQLiteEventJournal(tmp_path / "journal.db")
+    (delivery,) = journal.unfinished()
+    assert delivery.event == "pull_request"
+    assert delivery.payload == {"action": "opened"}
+    assert delivery.delivery_id == "in-flight"
+    assert delivery.journal_id == in_flight.journal_id
+
+    assert journal.compact() == 1
+    assert len(journal) == 1
+    journal.complete(delivery)
+    assert len(journal) == 0
+    journal.close()
+
+
+def test_handler_replays_unfinished_deliveries(tmp_path):
+    path = tmp_path / "journal.db"
+    journal = SQLiteEventJournal(path)
+
+    async def crash() -> None:
+        await journal.start()
+        await journal.append(Delivery("push", {"ref": "refs/heads/main"}, "lost"))
+        await journal.stop()
+
+    asyncio.run(crash())
+    journal.close()
+
+    journal = SQLiteEventJournal(path)
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, journal=journal, queue=DeliveryQueue()
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    async def foo(payload: Payload) -> None:
+        calls.append(payload["ref"])
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    with TestClient(app) as client:
+        response = client.post(
+            "/postreceive", json={"ref": "refs/heads/dev"}, headers={"X-GitHub-Event": "push"}
+        )
+        assert response.status_code == 202
+
+    assert sorted(calls) == ["refs/heads/dev", "refs/heads/main"]
+    assert len(journal) == 0
+    assert journal.stats().appended == 1
+    journal.close()
+
+
+def test_coalesced_deliveries_are_completed(tmp_path, journal: SQLiteEventJournal):
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, journal=journal, coalescer=EventCoalescer(window=0.05)
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append(payload["after"])
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    payload = {"ref": "refs/heads/main", "repository": {"full_name": "owner/repo"}}
+    with TestClient(app) as client:
+        for after in ("a", "b", "c"):
+            client.post(
+                "/postreceive",
+                json={**payload, "after": after},
+                headers={"X-GitHub-Event": "push"},
+            )
+
+    assert calls == ["c"]
+    assert len(journal) == 0
+
+
+def test_failed_append_forgets_the_delivery(journal: SQLiteEventJournal):
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, journal=journal, deduplication=MemoryDeliveryStore()
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append(payload["after"])
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    headers = {"X-GitHub-Event": "push", "X-GitHub-Delivery": "delivery"}
+    # the journal is not started, so the append fails
+    client = TestClient(app, raise_server_exceptions=False)
+    response = client.post("/postreceive", json={"after": "a"}, headers=headers)
+    assert response.status_code == 500
+
+    with TestClient(app) as client:
+        response = client.post("/postreceive", json={"after": "a"}, headers=headers)
+        assert response.json() == {"status": "success"}
+
+    assert calls == ["a"]
+
+
+@pytest.mark.parametrize("delay", [0.0, 60.0])
+def test_deferred_recipes_keep_their_delivery_unfinished(
+    journal: SQLiteEventJournal, delay: float
+):
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None,
+        journal=journal,
+        retry_policy=RetryPolicy(base_delay=delay, jitter=0),
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append(payload["after"])
+        if len(calls) == 1:
+            raise ConnectionError
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    with TestClient(app) as client:
+        response = client.post(
+            "/postreceive", json={"after": "a"}, headers={"X-GitHub-Event": "push"}
+        )
+        assert response.status_code == 200
+        if not delay:
+            deadline = time.time() + 2
+            while len(calls) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+
+    # the retry cancelled by the shutdown is replayed on the next startup
+    assert len(calls) == (1 if delay else 2)
+    assert len(journal) == (1 if delay else 0)
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from fastgithub import LaneScheduler
+from fastgithub.webhook.delivery import Delivery
+
+
+def pull_request(number: int, sha: str) -> Delivery:
+    return Delivery(
+        "pull_request",
+        {
+            "action": "synchronize",
+            "number": number,
+            "pull_request": {"number": number, "head": {"ref": f"feature-{number}", "sha": sha}},
+            "repository": {"full_name": "owner/repo"},
+        },
+    )
+
+
+def test_deliveries_of_a_pull_request_share_a_lane():
+    scheduler = LaneScheduler(lanes=8)
+    assert scheduler.lane(pull_request(1, "a")) == scheduler.lane(pull_request(1, "b"))
+    push = Delivery(
+        "push",
+        {"ref": "refs/heads/main", "repository": {"full_name": "owner/repo"}},
+    )
+    same_branch = Delivery(
+        "pull_request",
+        {
+            "pull_request": {
+                "number": 2,
+                "head": {"ref": "main", "repo": {"full_name": "owner/repo"}},
+            },
+            "repository": {"full_name": "owner/repo"},
+        },
+    )
+    assert scheduler.lane(push) == scheduler.lane(same_branch)
+    assert len({scheduler.lane(pull_request(i, "a")) for i in range(64)}) == 8
+
+
+@pytest.mark.asyncio
+async def test_lanes_are_ordered_and_concurrent():
+    scheduler = LaneScheduler(lanes=4)
+    running: dict[int, int] = {}
+    peak = 0
+    processed = []
+
+    async def process(delivery: Delivery) -> bool:
+        nonlocal peak
+        number = delivery.payload["number"]
+        running[number] = running.get(number, 0) + 1
+        assert running[number] == 1, "deliveries of the same pull request raced"
+        peak = max(peak, sum(running.values()))
+        await asyncio.sleep(0.01)
+        processed.append((number, delivery.payload["pull_request"]["head"]["sha"]))
+        running[number] -= 1
+        return True
+
+    await scheduler.start(process)
+    for sha in "abc":
+        for number in range(8):
+            scheduler.put(pull_request(number, sha))
+    stats = scheduler.stats()
+    assert sum(stats.lane_depths) == stats.depth == len(scheduler)
+    await scheduler.stop()
+
+    assert peak > 1
+    for number in range(8):
+        assert [sha for n, sha in processed if n == number] == ["a", "b", "c"]
+    assert scheduler.stats().processed == 24
+
+
+@pytest.mark.asyncio
+async def test_scheduler_is_bounded():
+    scheduler = LaneScheduler(lanes=2, maxsize=2)
+    await scheduler.start(lambda delivery: asyncio.Event().wait())  # type: ignore
+    scheduler.put(pull_request(1, "a"))
+    await asyncio.sleep(0)  # the consumer of the lane takes the first delivery
+    scheduler.put(pull_request(1, "b"))
+    scheduler.put(pull_request(1, "c"))
+    with pytest.raises(asyncio.QueueFull):
+        scheduler.put(pull_request(1, "d"))
+    assert scheduler.stats().rejected == 1
+    scheduler.drain_timeout = 0.01
+    await scheduler.stop()
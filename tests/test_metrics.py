@@ -0,0 +1,186 @@
+import asyncio
+from typing import Any
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry
+
+from fastgithub import (
+    AsyncGithubClient,
+    GithubWebhookHandler,
+    LaneScheduler,
+    RateLimitScheduler,
+    Recipe,
+    RecipeExecutor,
+    SQLiteEventJournal,
+    WebhookMetrics,
+    webhook_router,
+)
+from fastgithub.accounting import record_api_call
+from fastgithub.helpers.github import RateStatus
+from fastgithub.types import Payload
+from fastgithub.webhook.delivery import Delivery
+
+
+def sample(metrics: WebhookMetrics, name: str, **labels: Any) -> float:
+    value = metrics.registry.get_sample_value(name, {k: str(v) for k, v in labels.items()})
+    return value or 0
+
+
+def test_label_values_are_escaped():
+    registry = CollectorRegistry()
+    metrics = WebhookMetrics(registry)
+    metrics.deliveries.labels(event='push "main"', action="").inc()
+    assert 'fastgithub_deliveries_total{action="",event="push \\"main\\""} 1.0' in (
+        metrics.render().splitlines()
+    )
+    assert metrics.registry is registry
+
+
+def test_metrics_path_requires_metrics():
+    with pytest.raises(ValueError):
+        webhook_router(GithubWebhookHandler(None), path="/postreceive", metrics_path="/metrics")
+
+
+def test_pipeline_is_instrumented():
+    metrics = WebhookMetrics()
+    executor = RecipeExecutor(max_workers=2)
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, executor=executor, metrics=metrics
+    )
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"login": "foo"})
+
+    class AsyncRecipe(Recipe):
+        @property
+        def events(self):
+            return {"pull_request": self.__call__}
+
+        async def __call__(self, payload: Payload) -> None:
+            async with AsyncGithubClient(
+                "token", base_url="https://api.github.test", transport=httpx.MockTransport(respond)
+            ) as client:
+                await client.get("/users/foo")
+                await client.get("/users/bar")
+
+    @webhook_handler.listen("pull_request")
+    def sync_recipe(payload: Payload) -> None:
+        # sent by a `Github` client from a worker thread
+        record_api_call("GET", "https://api.github.test/users/foo", 304, 0.01, {})
+
+    @webhook_handler.listen("push")
+    def broken(payload: Payload) -> None:
+        raise ValueError("bug")
+
+    webhook_handler.plan([AsyncRecipe()])
+    record_api_call("GET", "https://api.github.test/users/foo", 200, 0.01, {})  # not counted
+
+    app = FastAPI()
+    app.include_router(
+        webhook_router(handler=webhook_handler, path="/postreceive", metrics_path="/metrics")
+    )
+    with TestClient(app) as client:
+        headers = {"X-GitHub-Event": "pull_request"}
+        assert client.post("/postreceive", json={"action": "opened"}, headers=headers).is_success
+        client.post("/postreceive", json={}, headers={"X-GitHub-Event": "push"})
+        response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'fastgithub_deliveries_total{action="opened",event="pull_request"} 1.0' in (
+        response.text
+    )
+    assert sample(metrics, "fastgithub_deliveries_total", event="push", action="") == 1
+    assert sample(metrics, "fastgithub_payload_decode_seconds_count") == 2
+    assert sample(metrics, "fastgithub_routing_seconds_count") == 2
+    assert sample(metrics, "fastgithub_signature_verification_seconds_count") == 0
+    recipe_runs = "fastgithub_recipe_duration_seconds_count"
+    assert sample(metrics, recipe_runs, recipe="AsyncRecipe", status="success") == 1
+    assert sample(metrics, recipe_runs, recipe="broken", status="failure") == 1
+    errors = "fastgithub_recipe_errors_total"
+    assert sample(metrics, errors, recipe="broken", error="ValueError") == 1
+    api_calls = "fastgithub_github_api_calls_total"
+    assert sample(metrics, api_calls, recipe="AsyncRecipe", status=200) == 2
+    assert sample(metrics, api_calls, recipe="sync_recipe", status=304) == 1
+    assert (
+        sum(
+            sample.value
+            for sample in metrics.api_calls.collect()[0].samples
+            if sample.name == api_calls
+        )
+        == 3
+    )
+    api_call_seconds = "fastgithub_github_api_call_duration_seconds_count"
+    assert sample(metrics, api_call_seconds, recipe="AsyncRecipe") == 2
+    quota = "fastgithub_github_api_quota_used_total"
+    assert sample(metrics, quota, recipe="AsyncRecipe", resource="core") == 2
+    assert sample(metrics, quota, recipe="sync_recipe", resource="core") == 0
+
+
+def test_rate_limit_remaining_is_collected_from_rate_status():
+    github = MagicMock()
+    github.requester.rate_limiting = (4200, 5000)
+    github.requester.rate_limiting_resettime = 2**31
+    github.requester.auth.installation_id = 42
+    RateStatus.shared(github)
+
+    metrics = WebhookMetrics()
+    assert 'fastgithub_github_rate_limit_remaining{client="42"} 4200.0' in metrics.render()
+    assert sample(metrics, "fastgithub_github_rate_limit_remaining", client=42) == 4200
+
+
+def test_forged_events_are_bounded():
+    metrics = WebhookMetrics()
+    metrics.record_delivery("pull_request", "opened")
+    metrics.record_delivery("forged-event", "forged-action")
+    metrics.record_delivery("another-forged-event", None)
+
+    deliveries = "fastgithub_deliveries_total"
+    assert sample(metrics, deliveries, event="pull_request", action="opened") == 1
+    assert sample(metrics, deliveries, event="other", action="") == 2
+    for i in range(300):
+        metrics.record_delivery("issues", f"action-{i}")
+    samples = metrics.deliveries.collect()[0].samples
+    assert len([sample for sample in samples if sample.name == deliveries]) == 258
+    assert sample(metrics, deliveries, event="issues", action="other") == 45
+
+
+async def test_components_are_collected_at_scrape_time(tmp_path):
+    metrics = WebhookMetrics()
+    queue = LaneScheduler(lanes=2)
+    scheduler = RateLimitScheduler()
+    journal = SQLiteEventJournal(tmp_path / "journal.db")
+    GithubWebhookHandler(None, queue=queue, scheduler=scheduler, journal=journal, metrics=metrics)
+    assert "fastgithub_queue_depth 0.0" in metrics.render()
+
+    released = asyncio.Event()
+
+    async def process(delivery: Delivery) -> bool:
+        await released.wait()
+        return True
+
+    await queue.start(process)
+    delivery = Delivery("push", {"repository": {"full_name": "owner/repo"}})
+    queue.put(delivery)
+    queue.put(delivery)
+    await asyncio.sleep(0.01)
+    # a scheduler which isn't running drops the recipes
+    scheduler.park(print, {}, ValueError())
+
+    lines = metrics.render().splitlines()
+    assert "fastgithub_queue_depth 1.0" in lines
+    assert any(line.startswith("fastgithub_queue_lag_seconds ") for line in lines)
+    assert f'fastgithub_lane_depth{{lane="{queue.lane(delivery)}"}} 1.0' in lines
+    assert "fastgithub_scheduler_parked_recipes 0.0" in lines
+    assert "fastgithub_scheduler_dropped_recipes_total 1.0" in lines
+    assert "fastgithub_journal_pending_writes 0.0" in lines
+    released.set()
+    await queue.stop()
+    journal.close()
+
+
+def test_untracked_components_are_not_collected():
+    assert "fastgithub_queue_depth" not in WebhookMetrics().render()
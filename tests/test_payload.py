@@ -0,0 +1,54 @@
+import hmac
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastgithub import GithubWebhookHandler, SignatureVerificationSHA256, webhook_router
+from fastgithub.types import Payload
+from fastgithub.webhook.payload import decode_payload
+
+
+def test_decode_payload():
+    assert decode_payload(b'{"ref": "refs/heads/main"}') == {"ref": "refs/heads/main"}
+
+
+@pytest.mark.parametrize("body", [b"", b"{", b"[1, 2]"])
+def test_decode_payload_raise_for_invalid_payload(body: bytes):
+    with pytest.raises(ValueError):
+        decode_payload(body)
+
+
+def test_handler_verifies_and_decodes_the_same_body(signature_secret: str):
+    webhook_handler = GithubWebhookHandler(SignatureVerificationSHA256(signature_secret))
+    received = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        received.append(payload)
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    client = TestClient(app)
+
+    body = json.dumps({"ref": "refs/heads/main"}).encode()
+    digest = hmac.new(signature_secret.encode(), body, "sha256").hexdigest()
+    headers = {"X-GitHub-Event": "push", "X-Hub-Signature-256": f"sha256={digest}"}
+
+    response = client.post("/postreceive", content=body, headers=headers)
+    assert response.status_code == 200
+    assert received == [{"ref": "refs/heads/main"}]
+
+    response = client.post("/postreceive", content=body + b" ", headers=headers)
+    assert response.status_code == 403
+
+
+def test_handler_returns_400_for_invalid_payload():
+    webhook_handler = GithubWebhookHandler(signature_verification=None)
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    client = TestClient(app)
+
+    response = client.post("/postreceive", content=b"{", headers={"X-GitHub-Event": "push"})
+    assert response.status_code == 400
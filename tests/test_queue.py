@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastgithub import DeliveryQueue, GithubWebhookHandler, webhook_router
+from fastgithub.types import Payload
+from fastgithub.webhook.delivery import Delivery
+
+
+def test_queue_size_must_be_positive():
+    with pytest.raises(ValueError):
+        DeliveryQueue(maxsize=0)
+
+
+def test_put_is_rejected_when_queue_is_not_started():
+    queue = DeliveryQueue()
+    with pytest.raises(asyncio.QueueFull):
+        queue.put(Delivery("push", {}))
+    assert queue.stats().rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_put_is_rejected_when_queue_is_full():
+    queue = DeliveryQueue(maxsize=1, workers=1)
+    release = asyncio.Event()
+
+    async def process(delivery: Delivery) -> bool:
+        await release.wait()
+        return True
+
+    await queue.start(process)
+    queue.put(Delivery("push", {}))
+    await asyncio.sleep(0)  # the consumer takes the first delivery
+    queue.put(Delivery("push", {}))
+    with pytest.raises(asyncio.QueueFull):
+        queue.put(Delivery("push", {}))
+
+    release.set()
+    await queue.stop()
+    stats = queue.stats()
+    assert stats.enqueued == 2
+    assert stats.processed == 2
+    assert stats.rejected == 1
+    assert stats.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_pending_deliveries():
+    queue = DeliveryQueue(workers=2)
+    processed = []
+
+    async def process(delivery: Delivery) -> bool:
+        await asyncio.sleep(0.01)
+        processed.append(delivery.event)
+        return delivery.event != "fail"
+
+    await queue.start(process)
+    for event in ["push", "pull_request", "fail"]:
+        queue.put(Delivery(event, {}))
+    await queue.stop()
+
+    assert sorted(processed) == ["fail", "pull_request", "push"]
+    assert queue.stats().failed == 1
+    assert queue.running is False
+
+
+def test_handler_acknowledges_then_processes_deliveries():
+    webhook_handler = GithubWebhookHandler(signature_verification=None, queue=DeliveryQueue())
+    processed = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        processed.append(payload)
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/postreceive", json={"foo": "bar"}, headers={"X-GitHub-Event": "push"}
+        )
+        assert response.status_code == 202
+        assert response.json() == {"status": "accepted"}
+
+    # the lifespan drained the queue on shutdown
+    assert processed == [{"foo": "bar"}]
+    assert webhook_handler.queue.stats().processed == 1  # type: ignore
+
+
+def test_handler_returns_503_when_queue_rejects_deliveries():
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, queue=DeliveryQueue(maxsize=1)
+    )
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+
+    # without lifespan, the queue is not started and doesn't accept deliveries
+    client = TestClient(app)
+    response = client.post("/postreceive", json={}, headers={"X-GitHub-Event": "push"})
+    assert response.status_code == 503
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+import requests
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from github import GithubException, RateLimitExceededException
+
+from fastgithub import (
+    DeliveryQueue,
+    GithubWebhookHandler,
+    Recipe,
+    RetryPolicy,
+    webhook_router,
+)
+from fastgithub.helpers.github import rate_limit_exception
+from fastgithub.types import Payload
+from fastgithub.webhook.delivery import Delivery
+from fastgithub.webhook.retry import recipe_retry_policy
+
+
+@pytest.mark.parametrize(
+    ("exception", "retryable"),
+    [
+        (GithubException(502, {"message": "Bad Gateway"}, {}), True),
+        (GithubException(403, {"message": "You have exceeded a secondary rate limit"}, {}), True),
+        (GithubException(403, {"message": "Forbidden"}, {"Retry-After": "10"}), True),
+        (RateLimitExceededException(403, {}, {"x-ratelimit-remaining": "0"}), True),
+        (requests.ConnectionError("Connection reset by peer"), True),
+        (GithubException(403, {"message": "Resource not accessible"}, {}), False),
+        (GithubException(422, {"message": "Validation Failed"}, {}), False),
+        (ValueError("bug"), False),
+    ],
+)
+def test_retryable_errors(exception: Exception, retryable: bool):
+    assert RetryPolicy().is_retryable(exception) is retryable
+
+
+def test_delay_is_exponential_with_jitter():
+    policy = RetryPolicy(base_delay=1, multiplier=2, max_delay=5, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+    policy = RetryPolicy(base_delay=1, multiplier=2, jitter=0.5)
+    assert all(2 <= policy.delay(3) <= 4 for _ in range(100))
+
+
+def test_delay_respects_retry_after_and_rate_limit_reset():
+    policy = RetryPolicy(base_delay=1, jitter=0)
+    assert policy.delay(1, GithubException(403, {}, {"Retry-After": "30"})) == 30
+    reset = time.time() + 60
+    exception = RateLimitExceededException(
+        403, {}, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(reset)}
+    )
+    assert 59 <= policy.delay(1, exception) <= 60
+    # raised below the threshold of a helper, with requests left
+    assert 59 <= policy.delay(1, rate_limit_exception(4000, 5000, int(reset))) <= 60
+
+
+def test_should_retry_until_max_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    exception = GithubException(503, {}, {})
+    assert [policy.should_retry(exception, attempt) for attempt in (1, 2, 3)] == [
+        True,
+        True,
+        False,
+    ]
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+def test_recipe_retry_policy_overrides_the_default():
+    class Patient(Recipe):
+        retry_policy = RetryPolicy(max_attempts=10)
+
+        def __call__(self, payload: Payload) -> None:
+            pass
+
+    default = RetryPolicy()
+    assert recipe_retry_policy(Patient().__call__, default) is Patient.retry_policy
+    assert recipe_retry_policy(print, default) is default
+
+
+def test_handler_retries_transient_failures_in_background():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, jitter=0)
+    webhook_handler = GithubWebhookHandler(signature_verification=None, retry_policy=policy)
+    calls = {"transient": 0, "permanent": 0}
+
+    @webhook_handler.listen("push")
+    def transient(payload: Payload) -> None:
+        calls["transient"] += 1
+        if calls["transient"] < 3:
+            raise GithubException(502, {"message": "Bad Gateway"}, {})
+
+    @webhook_handler.listen("issues")
+    def permanent(payload: Payload) -> None:
+        calls["permanent"] += 1
+        raise GithubException(422, {"message": "Validation Failed"}, {})
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+
+    with TestClient(app) as client:
+        response = client.post("/postreceive", json={}, headers={"X-GitHub-Event": "push"})
+        assert response.status_code == 200
+        response = client.post("/postreceive", json={}, headers={"X-GitHub-Event": "issues"})
+        assert response.status_code == 400
+
+        deadline = time.time() + 2
+        while calls["transient"] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert calls == {"transient": 3, "permanent": 1}
+    assert webhook_handler.pending_retries == 0
+
+
+async def test_retries_scheduled_while_draining_are_cancelled_on_shutdown():
+    policy = RetryPolicy(max_attempts=3, base_delay=60, jitter=0)
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, queue=DeliveryQueue(), retry_policy=policy
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    async def transient(payload: Payload) -> None:
+        calls.append(payload)
+        raise GithubException(502, {"message": "Bad Gateway"}, {})
+
+    await webhook_handler.startup()
+    webhook_handler.queue.put(Delivery("push", {}))  # type: ignore
+    await webhook_handler.shutdown()
+
+    assert len(calls) == 1
+    assert webhook_handler.pending_retries == 0
@@ -0,0 +1,72 @@
+from fastgithub.types import Payload
+from fastgithub.webhook.routing import EventRouter
+
+
+def foo(payload: Payload) -> None:
+    pass
+
+
+def bar(payload: Payload) -> None:
+    pass
+
+
+def baz(payload: Payload) -> None:
+    pass
+
+
+def test_exact_and_wildcard_patterns_are_matched_in_registration_order():
+    router = EventRouter()
+    router.add("*", [baz])
+    router.add("push", [foo])
+    router.add("pull_request*", [bar])
+
+    assert router.match("push") == (baz, foo)
+    assert router.match("pull_request") == (baz, bar)
+    assert router.match("pull_request_review") == (baz, bar)
+    assert router.match("issues") == (baz,)
+
+
+def test_match_is_memoized_until_new_recipes_are_registered():
+    router = EventRouter()
+    router.add("push", [foo])
+
+    recipes = router.match("push")
+    assert router.match("push") is recipes
+
+    router.add("p?sh", [bar])
+    assert router.match("push") == (foo, bar)
+
+
+def test_memo_is_bounded():
+    router = EventRouter(maxsize=2)
+    router.add("*", [foo])
+    for event in ["push", "pull_request", "issues"]:
+        router.match(event)
+    assert len(router._cache) <= 2
+
+
+def test_unknown_event_has_no_recipes():
+    router = EventRouter()
+    router.add("push", [foo])
+    assert router.match("pull_request") == ()
+
+
+def test_action_patterns_only_match_their_action():
+    router = EventRouter()
+    router.add("pull_request", [foo])
+    router.add("pull_request.opened", [bar])
+    router.add("*", [baz])
+
+    assert router.match("pull_request", "opened") == (foo, bar, baz)
+    assert router.match("pull_request", "labeled") == (foo, baz)
+    assert router.match("pull_request") == (foo, baz)
+
+
+def test_action_wildcard_patterns():
+    router = EventRouter()
+    router.add("pull_request.*", [foo])
+    router.add("*.closed", [bar])
+
+    assert router.match("pull_request", "closed") == (foo, bar)
+    assert router.match("issues", "closed") == (bar,)
+    assert router.match("pull_request") == ()
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from github import RateLimitExceededException
+
+from fastgithub import GithubWebhookHandler, RateLimitScheduler, Recipe, webhook_router
+from fastgithub.accounting import current_delivery
+from fastgithub.helpers.github import rate_limit_admitted, rate_limit_exception
+from fastgithub.types import Payload
+from fastgithub.webhook.scheduler import rate_limit_reset, recipe_priority
+
+
+def _rate_limit_exception(reset: float) -> RateLimitExceededException:
+    return RateLimitExceededException(403, {}, {"X-RateLimit-Reset": str(reset)})
+
+
+def test_rate_limit_reset_from_headers():
+    now = time.time()
+    assert rate_limit_reset({"x-ratelimit-reset": "2000000000"}, 60) == 2_000_000_000
+    assert rate_limit_reset({"Retry-After": "30", "x-ratelimit-reset": "1"}, 60) >= now + 30
+    assert now + 60 <= rate_limit_reset(None, 60) <= time.time() + 60
+
+
+def test_recipe_priority():
+    class Important(Recipe):
+        priority = 10
+
+        def __call__(self, payload: Payload) -> None:
+            pass
+
+    def recipe(payload: Payload) -> None:
+        pass
+
+    assert recipe_priority(Important().__call__) == 10
+    assert recipe_priority(recipe) == 0
+
+
+def test_park_is_refused_when_not_running():
+    scheduler = RateLimitScheduler()
+    assert scheduler.park(print, {}, _rate_limit_exception(time.time())) is False
+    assert scheduler.stats().dropped == 1
+
+
+async def test_parked_recipes_are_resumed_by_priority_after_reset():
+    scheduler = RateLimitScheduler(resume_interval=0)
+    resumed = []
+
+    async def resume(recipe, payload: Payload) -> None:
+        resumed.append(payload["name"])
+
+    def low(payload: Payload) -> None:
+        pass
+
+    def high(payload: Payload) -> None:
+        pass
+
+    high.priority = 1  # type: ignore
+
+    await scheduler.start(resume)
+    reset = time.time() + 0.05
+    assert scheduler.park(low, {"name": "low"}, _rate_limit_exception(reset))
+    assert scheduler.park(high, {"name": "high"}, _rate_limit_exception(reset))
+    assert scheduler.park(low, {"name": "later"}, _rate_limit_exception(reset + 0.05))
+    assert len(scheduler) == 3
+
+    await asyncio.sleep(0.02)
+    assert resumed == []
+    await asyncio.sleep(0.2)
+    assert resumed == ["high", "low", "later"]
+    assert scheduler.stats().resumed == 3
+    await scheduler.stop()
+
+
+async def test_parked_recipes_are_paced_by_the_remaining_quota():
+    scheduler = RateLimitScheduler()
+    resumed = []
+
+    async def resume(recipe, payload: Payload) -> SimpleNamespace:
+        resumed.append((time.time(), rate_limit_admitted.get()))
+        return SimpleNamespace(api_calls=payload["calls"])
+
+    await scheduler.start(resume)
+    # 100 requests left for the next second, 10ms per request
+    exception = rate_limit_exception(100, 5000, int(time.time()) + 1)
+    start = time.time()
+    for calls in (1, 10, 1):
+        assert scheduler.park(print, {"calls": calls}, exception)
+
+    await asyncio.sleep(0.3)
+    assert len(resumed) == 3
+    # the recipes are resumed within the quota, long before the reset
+    assert resumed[0][0] - start < 0.1
+    assert resumed[2][0] - resumed[1][0] > 5 * (resumed[1][0] - resumed[0][0])
+    assert all(admitted for _, admitted in resumed)
+    assert rate_limit_admitted.get() is False
+    await scheduler.stop()
+
+
+async def test_parked_recipes_wait_for_the_reset_when_the_quota_is_exhausted():
+    scheduler = RateLimitScheduler()
+    resumed = []
+
+    async def resume(recipe, payload: Payload) -> None:
+        resumed.append(time.time())
+
+    await scheduler.start(resume)
+    reset = time.time() + 0.1
+    assert scheduler.park(print, {}, rate_limit_exception(0, 5000, reset))  # type: ignore
+    await asyncio.sleep(0.05)
+    assert resumed == []
+    assert scheduler.stats().next_resume_at == pytest.approx(reset, abs=0.01)
+    await asyncio.sleep(0.1)
+    assert len(resumed) == 1
+    await scheduler.stop()
+
+
+@pytest.mark.parametrize("with_scheduler", [True, False])
+def test_handler_defers_rate_limited_recipes(with_scheduler: bool):
+    scheduler = RateLimitScheduler(resume_interval=0) if with_scheduler else None
+    webhook_handler = GithubWebhookHandler(signature_verification=None, scheduler=scheduler)
+    calls = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append(time.time())
+        if len(calls) == 1:
+            raise _rate_limit_exception(time.time() - 1)
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+
+    with TestClient(app) as client:
+        response = client.post("/postreceive", json={}, headers={"X-GitHub-Event": "push"})
+        if not with_scheduler:
+            assert response.status_code == 400
+            return
+        assert response.status_code == 200
+        deadline = time.time() + 2
+        while len(calls) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert len(calls) == 2
+    assert scheduler.stats().resumed == 1  # type: ignore
+
+
+def test_resumed_recipes_keep_their_delivery():
+    webhook_handler = GithubWebhookHandler(
+        signature_verification=None, scheduler=RateLimitScheduler()
+    )
+    calls = []
+
+    @webhook_handler.listen("push")
+    def foo(payload: Payload) -> None:
+        calls.append((current_delivery.get().delivery_id, rate_limit_admitted.get()))  # type: ignore
+        if len(calls) == 1:
+            raise rate_limit_exception(4000, 5000, int(time.time()) + 3600)
+
+    app = FastAPI()
+    app.include_router(webhook_router(handler=webhook_handler, path="/postreceive"))
+    with TestClient(app) as client:
+        response = client.post(
+            "/postreceive",
+            json={},
+            headers={"X-GitHub-Event": "push", "X-GitHub-Delivery": "delivery"},
+        )
+        assert response.status_code == 200
+        deadline = time.time() + 2
+        while len(calls) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert calls == [("delivery", False), ("delivery", True)]
@@ -13,3 +13,17 @@ def test_sha1_verification(signature_payload: bytes, signature_sha1: str, signat
     signature_checker = SignatureVerificationSHA1(signature_secret)
     status = signature_checker._verify_signature(signature_payload, signature_sha1)
     assert status is True
+
+
+def test_verification_fails_with_unknown_hash_algorithm(
+    signature_payload: bytes, signature_secret: str
+):
+    signature_checker = SignatureVerificationSHA256(signature_secret)
+    status = signature_checker._verify_signature(signature_payload, "foo=bar")
+    assert status is False
+
+
+def test_verification_fails_with_wrong_signature(signature_payload: bytes, signature_secret: str):
+    signature_checker = SignatureVerificationSHA256(signature_secret)
+    status = signature_checker._verify_signature(signature_payload, "sha256=bar")
+    assert status is False